@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+CPU cost of one chat broadcast to a 1,000-member room.
+
+Compares the old per-recipient handlers, which ran json.dumps once per
+consumer, with pre-encoded frames from debates.broadcast. Both go through a
+real InMemoryChannelLayer group_send and the consumer's receive side.
+Run from the backend directory:  python benchmarks/broadcast_benchmark.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlineDebatePlatform.settings')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from channels.layers import InMemoryChannelLayer
+from debates.broadcast import encode_frame, frame_event
+
+RECIPIENTS = 1000
+ROUNDS = 20
+GROUP = 'debate_bench'
+
+PAYLOAD = {
+    'type': 'message',
+    'message_id': '4f8e1c1a-7d0b-4e59-9a3c-2b6f0d1e9a77',
+    'message': 'I disagree with the premise of the motion. ' * 6,
+    'user_id': 42,
+    'username': 'speaker42',
+    'timestamp': '2026-10-16T10:00:00.000000+00:00',
+    'emoji_reactions': {'👍': 3, '🔥': 1},
+    'image_url': '',
+}
+
+
+def legacy_handler(event, sent):
+    # What DebateConsumer.debate_message did for every recipient
+    sent.append(json.dumps({
+        'type': 'message',
+        'message_id': event.get('message_id'),
+        'message': event['message'],
+        'user_id': event['user_id'],
+        'username': event['username'],
+        'timestamp': event.get('timestamp'),
+        'emoji_reactions': event.get('emoji_reactions', {}),
+        'image_url': event.get('image_url', ''),
+    }))
+
+
+def frame_handler(event, sent):
+    # What DebateConsumer.broadcast_frame does for every recipient
+    sent.append(event['text'])
+
+
+async def run(build_event, handler):
+    layer = InMemoryChannelLayer(capacity=ROUNDS + 1)
+    channels = [await layer.new_channel() for _ in range(RECIPIENTS)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+
+    sent = []
+    total = handlers = 0.0
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        await layer.group_send(GROUP, build_event())
+        events = [await layer.receive(channel) for channel in channels]
+        dispatched = time.process_time()
+        for event in events:
+            handler(event, sent)
+        end = time.process_time()
+        total += end - start
+        handlers += end - dispatched
+    assert len(sent) == RECIPIENTS * ROUNDS
+    return total / ROUNDS, handlers / ROUNDS
+
+
+def main():
+    results = [
+        ('per-recipient json.dumps', asyncio.run(run(lambda: dict(PAYLOAD, type='debate_message'), legacy_handler))),
+        ('serialize once', asyncio.run(run(lambda: frame_event(encode_frame(PAYLOAD)), frame_handler))),
+    ]
+    print(f"CPU per {RECIPIENTS}-recipient broadcast (mean of {ROUNDS})")
+    print(f"{'':26} {'end to end':>12} {'handlers':>12}")
+    for name, (total, handlers) in results:
+        print(f"{name:26} {total * 1000:9.2f} ms {handlers * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Join latency of the presence store versus the old cached participant list.
+
+Fills one room with N members and times the next joins and leaves.
+Run from the backend directory:  python benchmarks/presence_benchmark.py
+"""
+import os
+import sys
+import time
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlineDebatePlatform.settings')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.core.cache import cache
+from debates.presence import PresenceStore
+
+ROOM_SIZES = [10, 100, 1000, 10000]
+SAMPLES = 200
+
+
+def legacy_join(debate_id, user_id):
+    """The read-modify-write list previously used by DebateConsumer.add_participant."""
+    cache_key = f'debate_participants_{debate_id}'
+    participants = cache.get(cache_key, [])
+    participants = [p for p in participants if p['id'] != user_id]
+    participants.append({'id': user_id, 'username': f'user{user_id}', 'is_online': True})
+    cache.set(cache_key, participants, 3600)
+
+
+def legacy_leave(debate_id, user_id):
+    cache_key = f'debate_participants_{debate_id}'
+    participants = cache.get(cache_key, [])
+    participants = [p for p in participants if p['id'] != user_id]
+    cache.set(cache_key, participants, 3600)
+
+
+def time_legacy(size):
+    debate_id = f'bench{size}'
+    cache.delete(f'debate_participants_{debate_id}')
+    for user_id in range(size):
+        legacy_join(debate_id, user_id)
+    start = time.perf_counter()
+    for user_id in range(size, size + SAMPLES):
+        legacy_join(debate_id, user_id)
+        legacy_leave(debate_id, user_id)
+    elapsed = time.perf_counter() - start
+    cache.delete(f'debate_participants_{debate_id}')
+    return elapsed / SAMPLES
+
+
+def time_store(size):
+    store = PresenceStore()
+    for user_id in range(size):
+        store.add(1, user_id, f'user{user_id}')
+    start = time.perf_counter()
+    for user_id in range(size, size + SAMPLES):
+        store.add(1, user_id, f'user{user_id}')
+        store.remove(1, user_id)
+    elapsed = time.perf_counter() - start
+    return elapsed / SAMPLES
+
+
+def main():
+    print(f"{'members':>8} {'list join+leave':>18} {'store join+leave':>18}")
+    for size in ROOM_SIZES:
+        legacy = time_legacy(size)
+        store = time_store(size)
+        print(f"{size:>8} {legacy * 1e6:>15.1f} us {store * 1e6:>15.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Time to turn N rows into response bytes, DRF serializers versus the fast path.
+
+For messages, topics and sessions, compares ModelSerializer(many=True) plus
+the stock JSONRenderer with values() rows through the debates fast-path
+helpers plus core.renderers.FastJSONRenderer (orjson if installed). Both
+start from the queryset the viewset lists from, so query time is included.
+Rows are written to a throwaway test database.
+Run from the backend directory:  python benchmarks/serialization_benchmark.py
+"""
+import os
+import sys
+import time
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlineDebatePlatform.settings')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from core.renderers import FastJSONRenderer, orjson
+from debates.models import DebateSession, DebateTopic, Message, MessageReaction, Participation
+from debates.serializers import (
+    MESSAGE_VALUES, SESSION_VALUES, TOPIC_VALUES, DebateSessionSerializer, DebateTopicSerializer,
+    MessageSerializer, message_rows, session_rows, topic_rows,
+)
+from debates.views import related_count
+from users.models import User
+
+ROW_COUNTS = [1000, 10000, 100000]
+SPEAKERS = 12
+BATCH = 5000
+
+
+def populate(count):
+    """Top the database up to ``count`` messages, topics and sessions."""
+    users = list(User.objects.all()) or User.objects.bulk_create(
+        [User(username=f'speaker{n}', email=f'speaker{n}@example.com') for n in range(SPEAKERS)])
+    have = DebateTopic.objects.count()
+    for start in range(have, count, BATCH):
+        size = min(BATCH, count - start)
+        topics = DebateTopic.objects.bulk_create(
+            [DebateTopic(title=f'Topic {start + n}', description='Should it be regulated?') for n in range(size)])
+        sessions = DebateSession.objects.bulk_create(
+            [DebateSession(topic=topic, moderator=users[n % SPEAKERS]) for n, topic in enumerate(topics)])
+        Participation.objects.bulk_create(
+            [Participation(session=session, user=users[n % SPEAKERS]) for n, session in enumerate(sessions)])
+        messages = Message.objects.bulk_create([
+            Message(session=sessions[0], author=users[n % SPEAKERS], content='I disagree with the premise. ' * 4)
+            for n in range(size)
+        ])
+        MessageReaction.objects.bulk_create(
+            [MessageReaction(message=message, emoji='👍', count=3) for message in messages[::10]])
+
+
+def session_queryset():
+    return DebateSession.objects.select_related('topic', 'moderator').annotate(
+        participant_count=related_count(Participation),
+        message_count=related_count(Message),
+    )
+
+
+CASES = [
+    (
+        'messages',
+        lambda n: MessageSerializer(
+            Message.objects.select_related('author').prefetch_related('reactions')[:n], many=True).data,
+        lambda n: message_rows(list(Message.objects.values(*MESSAGE_VALUES)[:n])),
+    ),
+    (
+        'topics',
+        lambda n: DebateTopicSerializer(DebateTopic.objects.all()[:n], many=True).data,
+        lambda n: topic_rows(DebateTopic.objects.values(*TOPIC_VALUES)[:n]),
+    ),
+    (
+        'sessions',
+        lambda n: DebateSessionSerializer(session_queryset()[:n], many=True).data,
+        lambda n: session_rows(session_queryset().values(*SESSION_VALUES)[:n]),
+    ),
+]
+
+
+def timed(build, renderer, count):
+    start = time.perf_counter()
+    body = renderer.render(build(count))
+    return time.perf_counter() - start, body
+
+
+def main():
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"Encoder: {'orjson' if orjson else 'json (orjson not installed)'}")
+        print(f"{'':10} {'rows':>7} {'DRF':>10} {'fast path':>10} {'speedup':>8}")
+        for count in ROW_COUNTS:
+            populate(count)
+            for name, drf, fast in CASES:
+                drf_seconds, drf_body = timed(drf, JSONRenderer(), count)
+                fast_seconds, fast_body = timed(fast, FastJSONRenderer(), count)
+                assert len(drf_body) == len(fast_body), f'{name}: fast path output differs'
+                print(f"{name:10} {count:>7} {drf_seconds * 1000:7.0f} ms {fast_seconds * 1000:7.0f} ms "
+                      f"{drf_seconds / fast_seconds:7.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
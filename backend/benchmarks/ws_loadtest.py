@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+WebSocket load test against a running Daphne.
+
+Opens many authenticated connections spread over several debate rooms, drives
+a mix of chat messages, typing and reactions, and reports:
+
+- connect latency (TCP open to connection_established)
+- broadcast fan-out latency (send to receipt by each room member), p50/p99/p999
+- dropped frames (gaps in the per-room replay seq), rate-limited and slow-consumer closes
+- server CPU time over the run, summed over Daphne workers, read from /proc
+
+Load-test users and sessions are created in the database Daphne uses, so run
+it from the backend directory against a local server:
+
+    daphne -p 8001 onlineDebatePlatform.asgi:application
+    python benchmarks/ws_loadtest.py --connections 2000 --rooms 50 --duration 30
+
+Pass --max-* thresholds to gate on the results; the exit status is 1 if any
+of them is exceeded. Larger event rates need DEBATES['RATE_LIMITS'] raised.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import struct
+import sys
+import time
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlineDebatePlatform.settings')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from rest_framework_simplejwt.tokens import AccessToken
+from debates.models import DebateSession, DebateTopic
+from debates.outbound import SLOW_CONSUMER_CLOSE_CODE
+from users.models import User
+from test_websocket_clean import SimpleWebSocketClient
+
+USER_PREFIX = 'loadtest_'
+TOPIC_TITLE = 'Load test'
+MARKER = 'lt:'
+
+
+class AsyncWebSocketClient(SimpleWebSocketClient):
+    """SimpleWebSocketClient's handshake and framing over asyncio streams."""
+
+    reader = writer = None
+    close_code = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        key = self._generate_key()
+        self.writer.write(self._create_handshake(key))
+        response = await self.reader.readuntil(b'\r\n\r\n')
+        if not self._validate_handshake_response(response, key):
+            raise ConnectionError(response.split(b'\r\n', 1)[0].decode(errors='replace'))
+        self.connected = True
+
+    async def send_message(self, message):
+        self.writer.write(self._create_frame(json.dumps(message)))
+        await self.writer.drain()
+
+    async def receive_message(self):
+        """Next text frame, or None once the server closes the connection."""
+        while True:
+            header = await self.reader.readexactly(2)
+            length = header[1] & 0x7F
+            extended = b''
+            if length == 126:
+                extended = await self.reader.readexactly(2)
+                length = struct.unpack('>H', extended)[0]
+            elif length == 127:
+                extended = await self.reader.readexactly(8)
+                length = struct.unpack('>Q', extended)[0]
+            frame, _ = self._parse_frame(header + extended + await self.reader.readexactly(length))
+            if frame['opcode'] == 1:
+                return frame['payload'].decode('utf-8')
+            if frame['opcode'] == 8:
+                if len(frame['payload']) >= 2:
+                    self.close_code = struct.unpack('>H', frame['payload'][:2])[0]
+                self.connected = False
+                return None
+            if frame['opcode'] == 9:
+                # Daphne pings idle connections and closes them without a pong
+                self.writer.write(self._create_frame(frame['payload'], opcode=10))
+
+    async def close(self):
+        if self.writer is not None:
+            try:
+                self.writer.write(self._create_frame(b'', opcode=8))
+                self.writer.close()
+            except (ConnectionError, RuntimeError):
+                pass
+        self.connected = False
+
+
+class Results:
+
+    def __init__(self):
+        self.connect_latency = []
+        self.fanout_latency = []
+        self.connect_errors = 0
+        self.sent = {'message': 0, 'typing': 0, 'reaction': 0}
+        self.received = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.slow_disconnects = 0
+        self.closed_early = 0
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def prepare(connections, rooms):
+    """Create (or reuse) load-test users and sessions. Returns (tokens, session ids)."""
+    existing = User.objects.filter(username__startswith=USER_PREFIX).count()
+    User.objects.bulk_create([
+        User(username=f'{USER_PREFIX}{n}', password='!')
+        for n in range(existing, connections)
+    ])
+    users = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('id')[:connections])
+    topic, _ = DebateTopic.objects.get_or_create(title=TOPIC_TITLE, defaults={'description': TOPIC_TITLE})
+    sessions = list(DebateSession.objects.filter(topic=topic).order_by('id').values_list('id', flat=True)[:rooms])
+    for _ in range(rooms - len(sessions)):
+        sessions.append(DebateSession.objects.create(topic=topic, moderator=users[0]).id)
+    return [str(AccessToken.for_user(user)) for user in users], sessions
+
+
+def cpu_seconds(pids):
+    """Total utime + stime of some processes, or None if it can't be read."""
+    if not pids:
+        return None
+    total = 0
+    try:
+        for pid in pids:
+            with open(f'/proc/{pid}/stat') as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+    except (OSError, IndexError):
+        return None
+    return total / os.sysconf('SC_CLK_TCK')
+
+
+def find_daphne():
+    """Pids of every running Daphne process (all workers under `startws --workers N --affinity`)."""
+    pids = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as cmdline:
+                argv = cmdline.read().split(b'\0')
+        except OSError:
+            continue
+        if any(os.path.basename(arg) == b'daphne' for arg in argv[:2]):
+            pids.append(int(pid))
+    return pids
+
+
+class Connection:
+
+    error = None
+
+    def __init__(self, url, room, results):
+        self.client = AsyncWebSocketClient(url)
+        self.room = room
+        self.results = results
+        self.last_seq = None
+
+    async def open(self, semaphore):
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                await self.client.connect()
+                while True:
+                    frame = json.loads(await self.client.receive_message())
+                    if frame['type'] == 'connection_established':
+                        break
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, TypeError) as exc:
+                self.results.connect_errors += 1
+                self.error = exc
+                return False
+            self.results.connect_latency.append(time.monotonic() - started)
+            self.last_seq = frame.get('seq', 0)
+            return True
+
+    async def listen(self):
+        results = self.results
+        try:
+            while True:
+                text = await self.client.receive_message()
+                if text is None:
+                    break
+                received = time.monotonic()
+                results.received += 1
+                frame = json.loads(text)
+                seq = frame.get('seq')
+                if seq is not None:
+                    if seq > self.last_seq + 1:
+                        results.dropped += seq - self.last_seq - 1
+                    self.last_seq = max(self.last_seq, seq)
+                if frame['type'] == 'message':
+                    self.room['last_message_id'] = frame['message_id']
+                    if frame['message'].startswith(MARKER):
+                        results.fanout_latency.append(received - float(frame['message'][len(MARKER):]))
+                elif frame['type'] == 'error' and frame.get('code') == 'rate_limited':
+                    results.rate_limited += 1
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        if self.client.close_code == SLOW_CONSUMER_CLOSE_CODE:
+            results.slow_disconnects += 1
+        elif not self.room['done']:
+            results.closed_early += 1
+
+
+async def drive_room(room, rate, mix, results):
+    """Send events into one room at ``rate`` per second from random members."""
+    kinds, weights = zip(*mix.items())
+    while not room['done']:
+        await asyncio.sleep(random.expovariate(rate))
+        members = [c for c in room['connections'] if c.client.connected]
+        if not members:
+            continue
+        sender = random.choice(members)
+        kind = random.choices(kinds, weights)[0]
+        if kind == 'message':
+            event = {'type': 'message', 'message': f'{MARKER}{time.monotonic()}'}
+        elif kind == 'typing':
+            event = {'type': random.choice(('typing_start', 'typing_stop'))}
+        elif room.get('last_message_id'):
+            event = {'type': 'reaction', 'message_id': room['last_message_id'], 'emoji': random.choice('👍🔥👏')}
+        else:
+            continue
+        try:
+            await sender.client.send_message(event)
+            results.sent[kind] += 1
+        except ConnectionError:
+            pass
+
+
+async def run(args):
+    tokens, sessions = await asyncio.to_thread(prepare, args.connections, args.rooms)
+    results = Results()
+    rooms = {session_id: {'connections': [], 'done': False} for session_id in sessions}
+    connections = [
+        Connection(f"{args.url}/ws/debates/{sessions[n % len(sessions)]}/?token={token}",
+                   rooms[sessions[n % len(sessions)]], results)
+        for n, token in enumerate(tokens)
+    ]
+
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    connect_started = time.monotonic()
+    opened = await asyncio.gather(*(c.open(semaphore) for c in connections))
+    connect_time = time.monotonic() - connect_started
+    live = [c for c, ok in zip(connections, opened) if ok]
+    if not live:
+        print(f"No connections could be opened: {connections[0].error!r}")
+        return results, {}
+    for connection in live:
+        connection.room['connections'].append(connection)
+
+    server_pids = args.server_pid or find_daphne()
+    cpu_before = cpu_seconds(server_pids)
+    listeners = [asyncio.ensure_future(c.listen()) for c in live]
+    drivers = [asyncio.ensure_future(drive_room(room, args.room_rate, args.mix, results)) for room in rooms.values()]
+
+    started = time.monotonic()
+    await asyncio.sleep(args.duration)
+    for room in rooms.values():
+        room['done'] = True
+    await asyncio.gather(*drivers)
+    # Let in-flight broadcasts arrive before closing
+    await asyncio.sleep(args.drain)
+    elapsed = time.monotonic() - started
+    cpu_after = cpu_seconds(server_pids)
+
+    await asyncio.gather(*(c.client.close() for c in live))
+    for listener in listeners:
+        listener.cancel()
+
+    summary = {
+        'connections': len(live),
+        'rooms': len(rooms),
+        'connect_errors': results.connect_errors,
+        'connect_seconds': round(connect_time, 2),
+        'connect_p50_ms': percentile(results.connect_latency, 0.5) * 1000,
+        'connect_p99_ms': percentile(results.connect_latency, 0.99) * 1000,
+        'events_sent': dict(results.sent),
+        'frames_received': results.received,
+        'fanout_samples': len(results.fanout_latency),
+        'fanout_p50_ms': percentile(results.fanout_latency, 0.5) * 1000,
+        'fanout_p99_ms': percentile(results.fanout_latency, 0.99) * 1000,
+        'fanout_p999_ms': percentile(results.fanout_latency, 0.999) * 1000,
+        'dropped_frames': results.dropped,
+        'drop_rate': results.dropped / max(1, results.dropped + results.received),
+        'rate_limited': results.rate_limited,
+        'slow_disconnects': results.slow_disconnects,
+        'closed_early': results.closed_early,
+        'server_pids': server_pids,
+        'server_cpu_percent': (
+            (cpu_after - cpu_before) / elapsed * 100
+            if cpu_before is not None and cpu_after is not None else None
+        ),
+    }
+    return results, summary
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        kind, weight = part.split('=')
+        if kind not in ('message', 'typing', 'reaction'):
+            raise argparse.ArgumentTypeError(f"unknown event kind {kind!r}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def check_thresholds(summary, args):
+    """Return a list of threshold violations."""
+    limits = [
+        ('connect_p99_ms', args.max_connect_p99_ms),
+        ('fanout_p99_ms', args.max_p99_ms),
+        ('fanout_p999_ms', args.max_p999_ms),
+        ('drop_rate', args.max_drop_rate),
+        ('server_cpu_percent', args.max_cpu_percent),
+    ]
+    return [
+        f"{name} = {summary[name]:.3f} exceeds {limit}"
+        for name, limit in limits
+        if limit is not None and summary.get(name) is not None and not summary[name] <= limit
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default=f"ws://127.0.0.1:{os.getenv('DAPHNE_PORT', '8001')}")
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of traffic after everyone connected')
+    parser.add_argument('--drain', type=float, default=2, help='seconds to wait for in-flight frames')
+    parser.add_argument('--room-rate', type=float, default=2, help='events per second per room')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('message=1,typing=2,reaction=1'))
+    parser.add_argument('--connect-concurrency', type=int, default=200)
+    parser.add_argument('--server-pid', type=int, nargs='+',
+                        help='Daphne pids for CPU usage (default: every daphne process found)')
+    parser.add_argument('--json', help='also write the summary to this file')
+    parser.add_argument('--max-connect-p99-ms', type=float)
+    parser.add_argument('--max-p99-ms', type=float)
+    parser.add_argument('--max-p999-ms', type=float)
+    parser.add_argument('--max-drop-rate', type=float)
+    parser.add_argument('--max-cpu-percent', type=float)
+    args = parser.parse_args()
+
+    # One socket per connection, plus headroom
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < args.connections + 100:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, args.connections + 1024), hard))
+
+    _, summary = asyncio.run(run(args))
+    if not summary:
+        sys.exit(1)
+    for name, value in summary.items():
+        print(f"{name:<22}{value:.2f}" if isinstance(value, float) else f"{name:<22}{value}")
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(summary, output, indent=2)
+
+    violations = check_thresholds(summary, args)
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import asyncio
+import bisect
+import errno
+import hashlib
+import json
+import logging
+import os
+import re
+import socket
+import subprocess
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# A room's sockets, and the session API that reads the worker's in-memory
+# presence (e.g. participants), go to the same worker
+ROOM_PATH = re.compile(rb'^(?:GET /ws/debates/|[A-Z]+ /api/v1/debates/sessions/)(\d+)/')
+STATS_PATH = b'/affinity/stats'
+MAX_HEADER_SIZE = 64 * 1024
+UNIX_BACKLOG = 1024
+
+
+def room_for(request_line):
+    """Debate id addressed by a WebSocket or session API request line, or None."""
+    match = ROOM_PATH.match(request_line)
+    return match.group(1).decode() if match else None
+
+
+def one_request_only(headers):
+    """
+    Request headers rewritten so the worker closes the connection after
+    answering, for anything but a WebSocket upgrade. Later requests then
+    come back through the proxy and are routed on their own path.
+    """
+    lines = [line for line in headers.split(b'\r\n') if line]
+    if any(line.lower().startswith(b'upgrade:') for line in lines):
+        return headers
+    lines = [line for line in lines if not line.lower().startswith(b'connection:')]
+    return b'\r\n'.join(lines + [b'Connection: close']) + b'\r\n\r\n'
+
+
+async def open_unix_connection(path, attempts=20):
+    """
+    Like ``asyncio.open_unix_connection``, retrying while the listener's
+    backlog is full. A non-blocking AF_UNIX connect reports a full backlog as
+    EAGAIN, which asyncio would mistake for a connect in progress and hand
+    back a socket that was never connected.
+    """
+    for attempt in range(attempts):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            sock.connect(path)
+        except BlockingIOError:
+            sock.close()
+            await asyncio.sleep(0.01 * (attempt + 1))
+            continue
+        except OSError:
+            sock.close()
+            raise
+        return await asyncio.open_unix_connection(sock=sock)
+    raise OSError(errno.EAGAIN, f'Backlog of {path} stayed full')
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+
+    Each node owns ``replicas`` points on the ring, so adding or removing a
+    node only moves the keys that hash next to its points, about ``1/N`` of
+    them, and leaves every other key where it was.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def __len__(self):
+        return len(set(self._owners.values()))
+
+    def __contains__(self, node):
+        return node in self._owners.values()
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            point = self._hash(f'{node}#{replica}')
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node):
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+
+    def get(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def shares(self):
+        """Fraction of the hash space owned by each node."""
+        shares = Counter()
+        previous = self._points[-1] - 2 ** 64 if self._points else 0
+        for point in self._points:
+            shares[self._owners[point]] += point - previous
+            previous = point
+        return {node: share / 2 ** 64 for node, share in shares.items()}
+
+
+class AffinityProxy:
+    """
+    TCP front for a pool of Daphne workers that pins each debate room to one
+    worker by consistent hashing of its ``debate_id``.
+
+    Only the HTTP request head is parsed; after that bytes are piped both ways
+    untouched. Every member of a room lands on the same process, so group
+    fan-out stays in-process. The client address is passed on in
+    ``X-Forwarded-For`` for Daphne's ``--proxy-headers``.
+    """
+
+    def __init__(self, ring, sockets):
+        self.ring = ring
+        self.sockets = sockets
+        self.connections = Counter()
+        self.rooms = {}
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+            writer.close()
+            return
+        request_line, _, headers = head.partition(b'\r\n')
+        client = writer.get_extra_info('peername') or ('', 0)
+
+        if request_line.split(b' ')[1:2] == [STATS_PATH] and client[0] in ('127.0.0.1', '::1'):
+            body = json.dumps(self.stats()).encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: %d\r\nConnection: close\r\n\r\n%s' % (len(body), body))
+            await writer.drain()
+            writer.close()
+            return
+
+        room = room_for(request_line)
+        worker = self.ring.get(room or f'{client[0]}:{client[1]}')
+        try:
+            upstream_reader, upstream_writer = await open_unix_connection(self.sockets[worker])
+        except (KeyError, OSError):
+            logger.error(f"No worker available for room {room}")
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            writer.close()
+            return
+
+        upstream_writer.write(b'%s\r\nX-Forwarded-For: %s\r\n%s' % (
+            request_line, client[0].encode(), one_request_only(headers)))
+        self.connections[worker] += 1
+        if room is not None:
+            self.rooms.setdefault(room, Counter())[worker] += 1
+        try:
+            await asyncio.gather(self._pipe(reader, upstream_writer), self._pipe(upstream_reader, writer))
+        finally:
+            self.connections[worker] -= 1
+            if room is not None:
+                members = self.rooms[room]
+                members[worker] -= 1
+                if members[worker] <= 0:
+                    del members[worker]
+                if not members:
+                    del self.rooms[room]
+
+    @staticmethod
+    async def _pipe(reader, writer):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+    def stats(self):
+        """Room and connection distribution across workers."""
+        rooms = Counter()
+        split = 0
+        for members in self.rooms.values():
+            for worker in members:
+                rooms[worker] += 1
+            split += len(members) > 1
+        shares = self.ring.shares()
+        return {
+            'workers': {
+                worker: {
+                    'rooms': rooms[worker],
+                    'connections': self.connections[worker],
+                    'ring_share': round(shares.get(worker, 0), 4),
+                }
+                for worker in sorted(self.sockets)
+            },
+            'rooms': len(self.rooms),
+            # Rooms with members on more than one worker, e.g. after a rebalance
+            'split_rooms': split,
+        }
+
+
+class WorkerPool:
+    """
+    Daphne processes each listening on their own Unix socket, kept in the
+    proxy's hash ring while they are alive.
+
+    A worker that exits is taken out of the ring, so its rooms move to the
+    remaining workers, and is restarted and put back. ``grow`` and ``shrink``
+    change the pool size at runtime; each only moves the rooms that hash to
+    the added or removed worker.
+    """
+
+    def __init__(self, command, socket_dir, env, proxy):
+        self.command = command
+        self.socket_dir = socket_dir
+        self.env = env
+        self.proxy = proxy
+        self.processes = {}
+        self._next = 0
+
+    async def grow(self):
+        worker = f'worker-{self._next}'
+        self._next += 1
+        await self._start(worker)
+        return worker
+
+    async def shrink(self):
+        if len(self.processes) <= 1:
+            return None
+        worker = max(self.processes, key=lambda name: int(name.rsplit('-', 1)[1]))
+        self._retire(worker)
+        process = self.processes.pop(worker)
+        process.terminate()
+        await asyncio.to_thread(process.wait)
+        logger.info(f"Removed {worker}; its rooms moved to {len(self.processes)} remaining workers")
+        return worker
+
+    async def _start(self, worker):
+        path = os.path.join(self.socket_dir, f'{worker}.sock')
+        if os.path.exists(path):
+            os.unlink(path)
+        # Twisted's default listen backlog of 50 overflows when many clients of
+        # one worker's rooms connect at once
+        endpoint = f'unix:{path}:backlog={UNIX_BACKLOG}'
+        self.processes[worker] = subprocess.Popen(
+            self.command + ['-e', endpoint, 'onlineDebatePlatform.asgi:application'], env=self.env)
+        await self._wait_ready(path)
+        self.proxy.sockets[worker] = path
+        self.proxy.ring.add(worker)
+        logger.info(f"Added {worker} (pid {self.processes[worker].pid}) to the ring")
+
+    def _retire(self, worker):
+        self.proxy.ring.remove(worker)
+        self.proxy.sockets.pop(worker, None)
+
+    async def _wait_ready(self, path, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                _, writer = await asyncio.open_unix_connection(path)
+                writer.close()
+                return
+            except OSError:
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Worker socket {path} did not come up")
+
+    async def supervise(self, interval=1.0):
+        """Restart workers that exit."""
+        while True:
+            await asyncio.sleep(interval)
+            for worker, process in list(self.processes.items()):
+                if process.poll() is not None:
+                    logger.warning(f"{worker} exited with {process.returncode}, restarting")
+                    self._retire(worker)
+                    await self._start(worker)
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.wait()
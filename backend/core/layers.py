@@ -0,0 +1,318 @@
+import asyncio
+import atexit
+import logging
+import marshal
+import os
+import random
+import string
+import struct
+import tempfile
+import time
+from copy import deepcopy
+
+from channels.exceptions import ChannelFull
+from channels.layers import InMemoryChannelLayer
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Wire frames between workers: 4-byte big-endian length, then a marshalled tuple
+HEADER = struct.Struct('>I')
+
+PEER_FRAMES = registry.counter(
+    'channel_layer_peer_frames_total',
+    'Frames exchanged with other worker processes, by direction and type.',
+    labels=('direction', 'type'),
+)
+PEER_SEND_DROPS = registry.counter(
+    'channel_layer_peer_send_drops_total',
+    'Messages to another worker\'s channel that were dropped, by reason.',
+    labels=('reason',),
+)
+GROUP_SEND_SECONDS = registry.histogram(
+    'channel_layer_group_send_seconds',
+    'Time for group_send to deliver locally and hand the frame to peer workers.',
+)
+
+
+def encode(message):
+    body = marshal.dumps(message)
+    return HEADER.pack(len(body)) + body
+
+
+class UnixSocketChannelLayer(InMemoryChannelLayer):
+    """
+    Channel layer shared by the worker processes of one host, without a broker.
+
+    Each process keeps its own channels and group members in memory exactly
+    like ``InMemoryChannelLayer`` (same capacity, expiry and group expiry
+    handling) and listens on a Unix socket in ``path``; processes find each
+    other by listing that directory. Channel names embed the owning worker, so
+    ``send`` goes straight to that process. Workers tell their peers which
+    groups they have members in, so ``group_send`` crosses to each interested
+    process as a single frame and the fan-out to individual channels stays
+    local to the process that owns them.
+
+    A ``send`` to another worker waits at most ``send_timeout`` seconds for
+    it to accept the message; after that the message is dropped and counted.
+    If the socket can't be set up, the layer keeps working process-local.
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, path=None, send_timeout=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.send_timeout = send_timeout
+        self.path = path or os.path.join(tempfile.gettempdir(), 'channels-layer')
+        self.worker_id = 'w%d%s' % (os.getpid(), ''.join(random.choice(string.ascii_lowercase) for _ in range(4)))
+        self.socket_path = os.path.join(self.path, f'{self.worker_id}.sock')
+        self.local_only = False
+        self._loop = None
+        self._started = None
+        self._server = None
+        self._peers = {}
+        self._group_peers = {}
+        self._acks = {}
+        self._next_request = 0
+        self._readers = set()
+        atexit.register(self._unlink)
+
+    # Channel layer API
+
+    async def new_channel(self, prefix='specific.'):
+        return '%s.%s!%s' % (
+            prefix,
+            self.worker_id,
+            ''.join(random.choice(string.ascii_letters) for _ in range(12)),
+        )
+
+    async def send(self, channel, message):
+        owner = self._owner(channel)
+        if owner is None or owner == self.worker_id:
+            return await super().send(channel, message)
+
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        await self._ensure_started()
+        writer = self._peers.get(owner)
+        if writer is None:
+            # The owning process is gone; its channels no longer exist
+            PEER_SEND_DROPS.inc(reason='no_peer')
+            logger.warning(f"Dropped message for {channel}: worker {owner} is gone")
+            return
+        self._next_request += 1
+        request_id = self._next_request
+        accepted = self._acks[request_id] = self._loop.create_future()
+        writer.write(encode(('send', request_id, channel, message)))
+        PEER_FRAMES.inc(direction='out', type='send')
+        try:
+            if not await asyncio.wait_for(accepted, self.send_timeout):
+                raise ChannelFull(channel)
+        except asyncio.TimeoutError:
+            PEER_SEND_DROPS.inc(reason='timeout')
+            logger.warning(f"Dropped message for {channel}: worker {owner} did not accept it in {self.send_timeout}s")
+        finally:
+            self._acks.pop(request_id, None)
+
+    async def group_add(self, group, channel):
+        await super().group_add(group, channel)
+        await self._ensure_started()
+        if len(self.groups[group]) == 1:
+            self._announce(('join', group))
+
+    async def group_discard(self, group, channel):
+        await super().group_discard(group, channel)
+        await self._ensure_started()
+        if group not in self.groups:
+            self._announce(('leave', group))
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        await self._ensure_started()
+        with GROUP_SEND_SECONDS.time():
+            self._deliver_group(group, message)
+            workers = self._group_peers.get(group)
+            if workers:
+                # Encoded once for every interested process
+                frame = encode(('group', group, message))
+                writers = [self._peers[worker] for worker in list(workers) if worker in self._peers]
+                for writer in writers:
+                    writer.write(frame)
+                PEER_FRAMES.inc(len(writers), direction='out', type='group')
+                for writer in writers:
+                    try:
+                        await writer.drain()
+                    except ConnectionError:
+                        pass
+
+    async def flush(self):
+        for group in list(self.groups):
+            self._announce(('leave', group))
+        await super().flush()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._peers.values()):
+            writer.close()
+        readers = [task for task in self._readers if task is not asyncio.current_task()]
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        self._unlink()
+
+    # Local delivery
+
+    def _deliver_group(self, group, message):
+        """
+        Put a group message on every local member channel. Returns False if the
+        group has no members here.
+
+        Queues are filled synchronously, so all local members see group
+        messages in the same order.
+        """
+        self._clean_expired()
+        channels = self.groups.get(group)
+        if not channels:
+            return False
+        expires = time.time() + self.expiry
+        for channel in list(channels):
+            queue = self.channels.setdefault(channel, asyncio.Queue(maxsize=self.get_capacity(channel)))
+            try:
+                queue.put_nowait((expires, deepcopy(message)))
+            except asyncio.QueueFull:
+                pass
+        return True
+
+    def _owner(self, channel):
+        """Worker id embedded in a process-specific channel name, if any."""
+        if '!' not in channel:
+            return None
+        return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+
+    # Peers
+
+    async def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or the previous event loop has gone away (e.g. in tests)
+            self._loop = loop
+            self._peers.clear()
+            self._group_peers.clear()
+            self._readers.clear()
+            self._started = loop.create_task(self._start())
+        await self._started
+
+    async def _start(self):
+        if self.local_only:
+            return
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            self._server = await asyncio.start_unix_server(self._accept, self.socket_path)
+        except (OSError, AttributeError, NotImplementedError) as exc:
+            logger.warning(f"Channel layer socket unavailable ({exc}), running process-local")
+            self.local_only = True
+            return
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.endswith('.sock') and path != self.socket_path:
+                await self._connect(path)
+        logger.info(f"Channel layer worker {self.worker_id} listening, {len(self._peers)} peers")
+
+    async def _connect(self, path):
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Left behind by a process that exited without cleaning up
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return
+        writer.write(encode(('hello', self.worker_id, list(self.groups))))
+        peer = await self._read_hello(reader)
+        if peer is None:
+            writer.close()
+            return
+        self._add_peer(peer, writer)
+        self._loop.create_task(self._serve(peer, reader, writer))
+
+    async def _accept(self, reader, writer):
+        peer = await self._read_hello(reader)
+        if peer is None:
+            writer.close()
+            return
+        writer.write(encode(('hello', self.worker_id, list(self.groups))))
+        self._add_peer(peer, writer)
+        await self._serve(peer, reader, writer)
+
+    async def _read_hello(self, reader):
+        try:
+            kind, peer, groups = await self._read(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, EOFError):
+            return None
+        if kind != 'hello':
+            return None
+        for group in groups:
+            self._group_peers.setdefault(group, set()).add(peer)
+        return peer
+
+    def _add_peer(self, peer, writer):
+        self._peers[peer] = writer
+        logger.info(f"Channel layer worker {self.worker_id} connected to {peer}")
+
+    async def _read(self, reader):
+        header = await reader.readexactly(HEADER.size)
+        return marshal.loads(await reader.readexactly(HEADER.unpack(header)[0]))
+
+    async def _serve(self, peer, reader, writer):
+        task = asyncio.current_task()
+        self._readers.add(task)
+        try:
+            while True:
+                message = await self._read(reader)
+                kind = message[0]
+                PEER_FRAMES.inc(direction='in', type=kind)
+                if kind == 'group':
+                    if not self._deliver_group(message[1], message[2]):
+                        # Stale membership; stop the peer sending this group here
+                        writer.write(encode(('leave', message[1])))
+                elif kind == 'send':
+                    _, request_id, channel, payload = message
+                    try:
+                        await InMemoryChannelLayer.send(self, channel, payload)
+                        accepted = True
+                    except ChannelFull:
+                        accepted = False
+                    writer.write(encode(('ack', request_id, accepted)))
+                elif kind == 'ack':
+                    future = self._acks.get(message[1])
+                    if future is not None and not future.done():
+                        future.set_result(message[2])
+                elif kind == 'join':
+                    self._group_peers.setdefault(message[1], set()).add(peer)
+                elif kind == 'leave':
+                    self._group_peers.get(message[1], set()).discard(peer)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._readers.discard(task)
+            if self._peers.get(peer) is writer:
+                del self._peers[peer]
+                for workers in self._group_peers.values():
+                    workers.discard(peer)
+                logger.info(f"Channel layer worker {self.worker_id} lost peer {peer}")
+            writer.close()
+
+    def _announce(self, message):
+        frame = encode(message)
+        for writer in list(self._peers.values()):
+            writer.write(frame)
+
+    def _unlink(self):
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
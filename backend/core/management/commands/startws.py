@@ -1,8 +1,12 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from core.affinity import MAX_HEADER_SIZE, AffinityProxy, HashRing, WorkerPool
+import asyncio
 import os
+import signal
 import subprocess
 import sys
+import tempfile
 
 
 class Command(BaseCommand):
@@ -14,11 +18,29 @@ class Command(BaseCommand):
             action='store_true',
             help='Start server on localhost only (127.0.0.1)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of Daphne processes sharing the port (default: 1)',
+        )
+        parser.add_argument(
+            '--affinity',
+            action='store_true',
+            help='Pin each debate room to one worker by consistent hashing (needs --workers > 1)',
+        )
 
     def handle(self, *args, **options):
         # Get configuration from settings
         port = settings.DAPHNE_PORT
         host = '127.0.0.1' if options['localhost'] else settings.HOST
+        workers = options['workers']
+        if options['affinity'] and workers < 2:
+            raise CommandError('--affinity needs --workers 2 or more')
+        if workers > 1 and not options['affinity']:
+            # Presence, typing indicators and spectator relays live in each
+            # worker's memory, so a room has to stay on one worker
+            raise CommandError('--workers 2 or more needs --affinity')
         
         self.stdout.write(
             self.style.SUCCESS(f'🚀 Starting Daphne WebSocket server...')
@@ -33,16 +55,18 @@ class Command(BaseCommand):
                 self.style.HTTP_INFO(f'🌐 Network WebSocket URL: ws://{local_ip}:{port}')
             )
         
-        # Start Daphne server
-        cmd = [
-            'daphne',
-            '-b', host,
-            '-p', str(port),
-            'onlineDebatePlatform.asgi:application'
-        ]
-        
         try:
-            subprocess.run(cmd, check=True)
+            if options['affinity']:
+                asyncio.run(self.run_affinity(host, port, workers))
+            else:
+                # Start Daphne server
+                cmd = [
+                    'daphne',
+                    '-b', host,
+                    '-p', str(port),
+                    'onlineDebatePlatform.asgi:application'
+                ]
+                subprocess.run(cmd, check=True)
         except FileNotFoundError:
             self.stdout.write(
                 self.style.ERROR('❌ Daphne not found. Make sure it\'s installed in your virtual environment.')
@@ -55,3 +79,36 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS('✅ WebSocket server stopped.')
             )
+
+    async def run_affinity(self, host, port, workers):
+        """
+        Front the workers with a proxy that routes each debate room to one of
+        them. SIGUSR1 adds a worker and SIGUSR2 removes one; either way only
+        the rooms hashing to that worker move.
+        """
+        socket_dir = os.path.join(tempfile.gettempdir(), f'debates-workers-{port}')
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        proxy = AffinityProxy(HashRing(), {})
+        # Workers still share the channel layer for rooms split during a rebalance
+        pool = WorkerPool(['daphne', '--proxy-headers'], socket_dir, self.worker_env(port), proxy)
+        try:
+            for _ in range(workers):
+                await pool.grow()
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGUSR1, lambda: asyncio.ensure_future(pool.grow()))
+            loop.add_signal_handler(signal.SIGUSR2, lambda: asyncio.ensure_future(pool.shrink()))
+            server = await asyncio.start_server(proxy.handle, host, port, limit=MAX_HEADER_SIZE, backlog=1024)
+            self.stdout.write(
+                self.style.HTTP_INFO(f'🧭 Routing rooms across {workers} workers; stats at http://127.0.0.1:{port}/affinity/stats')
+            )
+            async with server:
+                await pool.supervise()
+        finally:
+            pool.stop()
+
+    def worker_env(self, port):
+        return dict(
+            os.environ,
+            CHANNEL_LAYER='unix',
+            CHANNEL_LAYER_PATH=os.path.join(tempfile.gettempdir(), f'debates-layer-{port}'),
+        )
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = registry.gauge(
+    'asgi_event_loop_lag_seconds',
+    'How late the event loop ran the monitor\'s last timer.',
+)
+LOOP_LAG_HISTORY = registry.histogram(
+    'asgi_event_loop_lag_seconds_distribution',
+    'Event loop scheduling lag per monitor tick.',
+)
+EXECUTOR_QUEUED = registry.gauge(
+    'asgi_executor_queued_calls',
+    'Sync calls waiting for a thread, by executor.',
+    labels=('executor',),
+)
+EXECUTOR_THREADS = registry.gauge(
+    'asgi_executor_threads',
+    'Threads started by each executor.',
+    labels=('executor',),
+)
+EXECUTOR_ACTIVE = registry.gauge(
+    'asgi_executor_active_threads',
+    'Threads busy running a sync call, by executor.',
+    labels=('executor',),
+)
+
+
+def executor_stats(executor):
+    """
+    Queue depth and thread usage of a ThreadPoolExecutor. Reads its private
+    state, which is the only place this is kept; returns None for other
+    executors.
+    """
+    if not isinstance(executor, ThreadPoolExecutor):
+        return None
+    threads = len(executor._threads)
+    idle = getattr(getattr(executor, '_idle_semaphore', None), '_value', 0)
+    return {
+        'queued': executor._work_queue.qsize(),
+        'threads': threads,
+        'active': max(threads - idle, 0),
+    }
+
+
+def monitored_executors(loop):
+    """
+    The executors sync code of this process runs in. Thread-sensitive calls,
+    including every ``database_sync_to_async`` from a consumer, share asgiref's
+    single thread; the rest use the loop's default executor.
+    """
+    executors = {'thread_sensitive': SyncToAsync.single_thread_executor}
+    default = getattr(loop, '_default_executor', None)
+    if default is not None:
+        executors['default'] = default
+    return executors
+
+
+class LoopMonitor:
+    """
+    Background task measuring event loop lag and executor saturation.
+
+    Every ``interval`` seconds it sleeps on the loop and records how late it
+    woke up, which is how long other callbacks held the loop, then samples the
+    executors' queue depth and busy threads. Values go to the metrics registry
+    and the log; crossing ``lag_warning`` seconds or ``queue_warning`` queued
+    calls logs a warning, at most once per ``warning_interval`` for each.
+    """
+
+    def __init__(self, interval=1.0, lag_warning=0.1, queue_warning=10, warning_interval=30.0, log_interval=60.0):
+        self.interval = interval
+        self.lag_warning = lag_warning
+        self.queue_warning = queue_warning
+        self.warning_interval = warning_interval
+        self.log_interval = log_interval
+        self.last = {}
+        self._task = None
+        self._warned = {}
+        self._logged = 0.0
+
+    def start(self):
+        """Start monitoring the running loop, unless already doing so."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        # Sizes only the default pool; thread-sensitive calls keep their one thread
+        threads = getattr(settings, 'ASGI_DEFAULT_EXECUTOR_THREADS', None)
+        if threads:
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi'))
+        self._task = loop.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.sample(max(loop.time() - started - self.interval, 0.0), loop)
+
+    def sample(self, lag, loop):
+        LOOP_LAG.set(lag)
+        LOOP_LAG_HISTORY.observe(lag)
+        self.last = {'lag': lag}
+        if lag > self.lag_warning:
+            self._warn('lag', f"Event loop lagging {lag * 1000:.0f}ms behind")
+
+        for name, executor in monitored_executors(loop).items():
+            stats = executor_stats(executor)
+            if stats is None:
+                continue
+            EXECUTOR_QUEUED.set(stats['queued'], executor=name)
+            EXECUTOR_THREADS.set(stats['threads'], executor=name)
+            EXECUTOR_ACTIVE.set(stats['active'], executor=name)
+            self.last[name] = stats
+            if stats['queued'] > self.queue_warning:
+                self._warn(name, f"{stats['queued']} sync calls waiting for the {name} executor "
+                                 f"({stats['active']}/{stats['threads']} threads busy)")
+
+        now = time.monotonic()
+        if now - self._logged >= self.log_interval:
+            self._logged = now
+            logger.info(f"ASGI loop: {self.last}")
+
+    def _warn(self, key, message):
+        now = time.monotonic()
+        if now - self._warned.get(key, -self.warning_interval) >= self.warning_interval:
+            self._warned[key] = now
+            logger.warning(message)
+
+
+loop_monitor = LoopMonitor(
+    interval=getattr(settings, 'ASGI_MONITOR_INTERVAL', 1.0),
+    lag_warning=getattr(settings, 'ASGI_LAG_WARNING', 0.1),
+    queue_warning=getattr(settings, 'ASGI_QUEUE_WARNING', 10),
+)
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware starting ``loop_monitor`` on the server's loop with the first connection."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        loop_monitor.start()
+        return await self.app(scope, receive, send)
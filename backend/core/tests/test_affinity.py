@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ..affinity import AffinityProxy, HashRing, one_request_only, room_for
+
+
+class HashRingTest(SimpleTestCase):
+
+    def setUp(self):
+        self.keys = [str(n) for n in range(2000)]
+
+    def assignments(self, ring):
+        return {key: ring.get(key) for key in self.keys}
+
+    def test_keys_spread_over_every_node(self):
+        ring = HashRing(['a', 'b', 'c'])
+        counts = {}
+        for node in self.assignments(ring).values():
+            counts[node] = counts.get(node, 0) + 1
+        self.assertEqual(set(counts), {'a', 'b', 'c'})
+        self.assertGreater(min(counts.values()), len(self.keys) / 6)
+        self.assertAlmostEqual(sum(ring.shares().values()), 1.0)
+
+    def test_adding_a_node_only_moves_keys_to_it(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = self.assignments(ring)
+        ring.add('d')
+        after = self.assignments(ring)
+        moved = [key for key in self.keys if before[key] != after[key]]
+        self.assertTrue(all(after[key] == 'd' for key in moved))
+        self.assertLess(len(moved), len(self.keys) / 2)
+
+    def test_removing_a_node_only_moves_its_keys(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = self.assignments(ring)
+        ring.remove('b')
+        after = self.assignments(ring)
+        self.assertNotIn('b', ring)
+        for key in self.keys:
+            if before[key] != 'b':
+                self.assertEqual(after[key], before[key])
+
+    def test_plain_requests_close_after_one_response(self):
+        self.assertEqual(one_request_only(b'Host: x\r\nConnection: keep-alive\r\n\r\n'),
+                         b'Host: x\r\nConnection: close\r\n\r\n')
+        upgrade = b'Host: x\r\nConnection: Upgrade\r\nUpgrade: websocket\r\n\r\n'
+        self.assertEqual(one_request_only(upgrade), upgrade)
+
+    def test_room_for(self):
+        self.assertEqual(room_for(b'GET /ws/debates/42/?token=abc HTTP/1.1'), '42')
+        self.assertEqual(room_for(b'GET /api/v1/debates/sessions/42/participants/ HTTP/1.1'), '42')
+        self.assertEqual(room_for(b'POST /api/v1/debates/sessions/42/join/ HTTP/1.1'), '42')
+        self.assertIsNone(room_for(b'GET /api/v1/debates/sessions/ HTTP/1.1'))
+        self.assertIsNone(room_for(b'GET /api/debates/42/ HTTP/1.1'))
+
+
+class AffinityProxyTest(SimpleTestCase):
+
+    async def start_worker(self, name):
+        async def handle(reader, writer):
+            head = await reader.readuntil(b'\r\n\r\n')
+            writer.write(json.dumps({'worker': name, 'head': head.decode()}).encode())
+            await writer.drain()
+            await reader.read()
+            writer.close()
+        path = os.path.join(self.tmp.name, f'{name}.sock')
+        self.servers.append(await asyncio.start_unix_server(handle, path))
+        return path
+
+    async def request(self, port, path):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        data = await reader.read(65536)
+        return reader, writer, data
+
+    async def test_rooms_are_pinned_to_their_worker(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.servers = []
+        sockets = {name: await self.start_worker(name) for name in ('worker-0', 'worker-1')}
+        proxy = AffinityProxy(HashRing(sockets), sockets)
+        server = await asyncio.start_server(proxy.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        open_connections = []
+        for room in ('1', '2', '3', '1'):
+            reader, writer, data = await self.request(port, f'/ws/debates/{room}/?token=x')
+            response = json.loads(data)
+            self.assertEqual(response['worker'], proxy.ring.get(room))
+            self.assertIn('X-Forwarded-For: 127.0.0.1\r\n', response['head'])
+            open_connections.append(writer)
+
+        _, writer, data = await self.request(port, '/affinity/stats')
+        stats = json.loads(data.split(b'\r\n\r\n', 1)[1])
+        self.assertEqual(stats['rooms'], 3)
+        self.assertEqual(stats['split_rooms'], 0)
+        self.assertEqual(sum(w['connections'] for w in stats['workers'].values()), 4)
+
+        for writer in open_connections:
+            writer.close()
+        await asyncio.sleep(0.05)
+        self.assertEqual(proxy.rooms, {})
+        server.close()
+        for worker in self.servers:
+            worker.close()
+        self.tmp.cleanup()
@@ -0,0 +1,111 @@
+import asyncio
+import tempfile
+
+from channels.exceptions import ChannelFull
+from django.test import SimpleTestCase
+
+from ..layers import PEER_SEND_DROPS, UnixSocketChannelLayer
+
+
+class UnixSocketChannelLayerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.first = UnixSocketChannelLayer(path=self.tmp.name, capacity=2)
+        self.second = UnixSocketChannelLayer(path=self.tmp.name, capacity=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def start_both(self):
+        await self.first._ensure_started()
+        await self.second._ensure_started()
+
+    async def settle(self):
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    async def close_both(self):
+        await self.first.close()
+        await self.second.close()
+
+    async def test_send_reaches_the_owning_process(self):
+        await self.start_both()
+        channel = await self.second.new_channel()
+        await self.first.send(channel, {'type': 'hello'})
+        self.assertEqual(await self.second.receive(channel), {'type': 'hello'})
+        await self.close_both()
+
+    async def test_send_to_full_remote_channel_raises(self):
+        await self.start_both()
+        channel = await self.second.new_channel()
+        await self.first.send(channel, {'type': 'one'})
+        await self.first.send(channel, {'type': 'two'})
+        with self.assertRaises(ChannelFull):
+            await self.first.send(channel, {'type': 'three'})
+        await self.close_both()
+
+    async def test_send_to_unresponsive_peer_is_dropped_quickly(self):
+        class SilentWriter:
+            def write(self, data):
+                pass
+
+        layer = UnixSocketChannelLayer(path=self.tmp.name, send_timeout=0.05)
+        await layer._ensure_started()
+        layer._peers['wsilent'] = SilentWriter()
+        timeouts, missing = PEER_SEND_DROPS.value(reason='timeout'), PEER_SEND_DROPS.value(reason='no_peer')
+        await asyncio.wait_for(layer.send('specific.wsilent!abc', {'type': 'hello'}), 1)
+        await layer.send('specific.wgone!abc', {'type': 'hello'})
+        self.assertEqual(PEER_SEND_DROPS.value(reason='timeout'), timeouts + 1)
+        self.assertEqual(PEER_SEND_DROPS.value(reason='no_peer'), missing + 1)
+        layer._peers.clear()
+        await layer.close()
+
+    async def test_group_send_fans_out_across_processes(self):
+        await self.start_both()
+        local = await self.first.new_channel()
+        remote = [await self.second.new_channel() for _ in range(2)]
+        await self.first.group_add('room', local)
+        for channel in remote:
+            await self.second.group_add('room', channel)
+        await self.settle()
+
+        await self.first.group_send('room', {'type': 'chat', 'text': 'hi'})
+        self.assertEqual(await self.first.receive(local), {'type': 'chat', 'text': 'hi'})
+        for channel in remote:
+            self.assertEqual(await self.second.receive(channel), {'type': 'chat', 'text': 'hi'})
+        await self.close_both()
+
+    async def test_group_discard_stops_remote_delivery(self):
+        await self.start_both()
+        channel = await self.second.new_channel()
+        await self.second.group_add('room', channel)
+        await self.settle()
+        self.assertIn('room', self.first._group_peers)
+
+        await self.second.group_discard('room', channel)
+        await self.settle()
+        self.assertFalse(self.first._group_peers['room'])
+        await self.first.group_send('room', {'type': 'chat'})
+        await self.settle()
+        self.assertNotIn(channel, self.second.channels)
+        await self.close_both()
+
+    async def test_peer_exit_is_forgotten(self):
+        await self.start_both()
+        channel = await self.second.new_channel()
+        await self.second.group_add('room', channel)
+        await self.settle()
+        await self.second.close()
+        await self.settle()
+        self.assertEqual(self.first._peers, {})
+        self.assertFalse(self.first._group_peers['room'])
+        await self.first.close()
+
+    async def test_falls_back_to_process_local(self):
+        layer = UnixSocketChannelLayer(path='/proc/no-such-dir')
+        channel = await layer.new_channel()
+        await layer.group_add('room', channel)
+        await layer.group_send('room', {'type': 'chat'})
+        self.assertTrue(layer.local_only)
+        self.assertEqual(await layer.receive(channel), {'type': 'chat'})
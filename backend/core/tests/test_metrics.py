@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..metrics import MetricsRegistry
+
+
+class MetricsRegistryTest(SimpleTestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        requests = self.registry.counter('requests_total', 'Requests.', labels=('method',))
+        requests.inc(method='GET')
+        requests.inc(2, method='GET')
+        requests.inc(method='POST')
+        depth = self.registry.gauge('depth', 'Queue depth.')
+        depth.set(5)
+        depth.dec()
+
+        self.assertEqual(self.registry.render(), '\n'.join([
+            '# HELP depth Queue depth.',
+            '# TYPE depth gauge',
+            'depth 4',
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{method="GET"} 3',
+            'requests_total{method="POST"} 1',
+        ]) + '\n')
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value)
+
+        lines = self.registry.render().splitlines()
+        self.assertEqual(lines[2:], [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 4.05',
+            'latency_seconds_count 4',
+        ])
+
+    def test_labels_are_checked_and_escaped(self):
+        errors = self.registry.counter('errors_total', 'Errors.', labels=('reason',))
+        with self.assertRaises(ValueError):
+            errors.inc(code=500)
+        errors.inc(reason='say "hi"\n')
+        self.assertIn('errors_total{reason="say \\"hi\\"\\n"} 1', self.registry.render())
+
+    def test_reregistering_returns_the_same_metric(self):
+        counter = self.registry.counter('events_total', 'Events.')
+        self.assertIs(self.registry.counter('events_total', 'Events.'), counter)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('events_total', 'Events.')
+
+    def test_collectors_run_at_scrape_time(self):
+        state = {'rooms': {}}
+        self.registry.register_collector(lambda: [
+            ('sockets', 'gauge', 'Sockets per room.', [({'room': room}, n) for room, n in state['rooms'].items()]),
+        ])
+        state['rooms'] = {'7': 3}
+        self.assertIn('sockets{room="7"} 3', self.registry.render())
+
+
+class MetricsEndpointTest(TestCase):
+
+    def test_scrape_includes_request_metrics(self):
+        self.client.get(reverse('metrics'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="metrics",method="GET",status="200"}', body)
+        self.assertIn('# TYPE debates_room_sockets gauge', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=('10.0.0.1',))
+    def test_only_allowed_clients_can_scrape(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from django.test import SimpleTestCase, override_settings
+
+from ..monitor import LOOP_LAG_HISTORY, LoopMonitor, executor_stats, monitored_executors
+
+
+class ExecutorStatsTest(SimpleTestCase):
+
+    def test_counts_busy_threads_and_queued_calls(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        release = threading.Event()
+        futures = [executor.submit(release.wait) for _ in range(5)]
+        time.sleep(0.05)
+        self.assertEqual(executor_stats(executor), {'queued': 3, 'threads': 2, 'active': 2})
+        release.set()
+        for future in futures:
+            future.result()
+        time.sleep(0.05)
+        self.assertEqual(executor_stats(executor), {'queued': 0, 'threads': 2, 'active': 0})
+        executor.shutdown()
+
+    def test_ignores_other_executors(self):
+        self.assertIsNone(executor_stats(object()))
+
+
+class LoopMonitorTest(SimpleTestCase):
+
+    def test_reports_and_warns_about_a_blocked_loop(self):
+        monitor = LoopMonitor(interval=0.02, lag_warning=0.05)
+
+        async def block_loop():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            time.sleep(0.2)
+            await asyncio.sleep(0.1)
+            monitor.stop()
+
+        with self.assertLogs('core.monitor', 'WARNING') as logs:
+            asyncio.run(block_loop())
+        self.assertIn('Event loop lagging', logs.output[0])
+        self.assertEqual(len([line for line in logs.output if 'lagging' in line]), 1)
+        self.assertIn('thread_sensitive', monitor.last)
+        self.assertGreater(LOOP_LAG_HISTORY.count(), 0)
+
+    @override_settings(ASGI_DEFAULT_EXECUTOR_THREADS=3)
+    def test_setting_sizes_only_the_default_executor(self):
+        monitor = LoopMonitor()
+
+        async def start():
+            monitor.start()
+            monitor.stop()
+            return monitored_executors(asyncio.get_running_loop())
+
+        executors = asyncio.run(start())
+        self.assertEqual(executors['default']._max_workers, 3)
+        self.assertIs(executors['thread_sensitive'], SyncToAsync.single_thread_executor)
@@ -0,0 +1,44 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from ..renderers import FastJSONRenderer
+
+DATA = {
+    'id': 1,
+    'uuid': uuid.UUID('4f8e1c1a-7d0b-4e59-9a3c-2b6f0d1e9a77'),
+    'when': datetime.datetime(2026, 10, 16, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc),
+    'local': timezone.make_aware(datetime.datetime(2026, 10, 16, 12, 0), datetime.timezone(datetime.timedelta(hours=2))),
+    'price': Decimal('1.50'),
+    'detail': gettext_lazy('Not found.'),
+    'users': {7: {'username': 'ana'}},
+    'text': 'line\u2028separator 👍',
+    'nested': [None, True, 1.5],
+}
+
+
+class FastJSONRendererTest(SimpleTestCase):
+
+    def test_matches_stock_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(DATA), JSONRenderer().render(DATA))
+
+    def test_floats_keep_their_value(self):
+        data = {'score': [1e-06, -3.2e-07, 1e22, 0.1, 123456789.123]}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), data)
+
+    def test_without_orjson(self):
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(DATA), JSONRenderer().render(DATA))
+
+    def test_indent_and_empty(self):
+        renderer = FastJSONRenderer()
+        self.assertEqual(renderer.render(None), b'')
+        indented = renderer.render({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(indented, b'{\n  "a": 1\n}')
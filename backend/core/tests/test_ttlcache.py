@@ -0,0 +1,29 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from ..ttlcache import TTLCache
+
+
+class TTLCacheTest(SimpleTestCase):
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('missing'))
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        with mock.patch('core.ttlcache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with mock.patch('core.ttlcache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
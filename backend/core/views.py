@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from .metrics import registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics(request):
+    """This process's metrics in the Prometheus text format, for local scrapers only."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')):
+        raise Http404
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,15 +1,24 @@
 from django.contrib import admin
 from .models import DebateTopic, DebateSession, Message
+from .search import search_backend
 
-class DebateTopicAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Admin search through debates.search instead of LIKE scans over search_fields."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_backend().search(queryset, search_term), False
+
+class DebateTopicAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'created_at', 'updated_at')
-    search_fields = ('title',)
+    search_fields = ('title', 'description')
 
 class DebateSessionAdmin(admin.ModelAdmin):
     list_display = ('topic', 'moderator', 'start_time', 'end_time')
     list_filter = ('start_time', 'end_time')
 
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('session', 'author', 'content', 'timestamp')
     search_fields = ('content',)
 
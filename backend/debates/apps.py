@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class DebatesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'debates'
\ No newline at end of file
+    name = 'debates'
+
+    def ready(self):
+        from core.metrics import registry
+        from . import metrics, signals  # noqa: F401
+        registry.register_collector(metrics.collect)
@@ -0,0 +1,77 @@
+import json
+import uuid
+
+from core.metrics import registry
+
+GROUP_SEND_SECONDS = registry.histogram(
+    'debates_group_send_seconds',
+    'Time for the channel layer to accept a room broadcast, by frame kind.',
+    labels=('kind',),
+)
+
+
+def room_group_name(debate_id):
+    return f'debate_{debate_id}'
+
+
+def spectator_group_name(debate_id):
+    return f'debate_{debate_id}_spectators'
+
+
+# Outbound queue kind per frame type; anything not listed is a 'message'
+FRAME_KINDS = {
+    'typing_status': 'typing',
+    'user_joined': 'presence',
+    'user_left': 'presence',
+    'participant_list': 'snapshot',
+}
+
+
+def frame_kind(payload):
+    return FRAME_KINDS.get(payload.get('type'), 'message')
+
+
+def encode_frame(payload):
+    """Encode a WebSocket frame exactly as it is sent to clients."""
+    return json.dumps(payload)
+
+
+def frame_event(text, kind='message', frame_id=None, typing_user_ids=None):
+    """
+    Build a channel layer event carrying a pre-encoded frame.
+
+    The payload is serialized once by the publisher instead of in every
+    recipient's handler, so a broadcast costs one ``json.dumps`` whatever the
+    room size. ``kind`` tells each connection's outbound queue how the frame
+    may be shed or coalesced under backpressure, and a ``frame_id`` marks a
+    frame for the replay log, to be stamped on delivery. ``typing_user_ids``
+    travels next to the encoded text and lists the users who must get a copy
+    of a ``typing_status`` frame without themselves in it.
+    """
+    event = {
+        'type': 'broadcast.frame',
+        'text': text,
+        'kind': kind,
+    }
+    if frame_id is not None:
+        event['frame_id'] = frame_id
+    if typing_user_ids:
+        event['typing_user_ids'] = typing_user_ids
+    return event
+
+
+async def publish(channel_layer, debate_id, payload, replay=False, **routing):
+    """
+    Encode ``payload`` once and fan it out to everyone in a debate room.
+
+    With ``replay=True`` the frame gets a ``frame_id``; receiving consumers
+    stamp it with the room's next ``seq`` and keep it in the replay ring so
+    reconnecting clients can catch up on it.
+    """
+    frame_id = uuid.uuid4().hex if replay else None
+    kind = frame_kind(payload)
+    with GROUP_SEND_SECONDS.time(kind=kind):
+        await channel_layer.group_send(
+            room_group_name(debate_id),
+            frame_event(encode_frame(payload), kind, frame_id, **routing),
+        )
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RoomTicker:
+    """
+    Coalesces per-room work onto a fixed tick.
+
+    ``mark(room_id)`` asks for ``callback(room_id)`` to run after ``interval``
+    seconds; further marks before it fires are absorbed, so the callback runs
+    at most once per tick per room however many events arrive. A longer
+    ``delay`` can be passed to come back later, e.g. when state will expire;
+    a normal mark in the meantime still fires on the next tick.
+    """
+
+    def __init__(self, interval, callback):
+        self.interval = interval
+        self.callback = callback
+        self._scheduled = {}
+
+    def mark(self, room_id, delay=None):
+        loop = asyncio.get_running_loop()
+        when = loop.time() + (self.interval if delay is None else delay)
+        scheduled = self._scheduled.get(room_id)
+        if scheduled is not None and scheduled[0] is loop:
+            if scheduled[1].when() <= when:
+                return
+            scheduled[1].cancel()
+        self._scheduled[room_id] = (loop, loop.call_at(when, self._fire, room_id))
+
+    def _fire(self, room_id):
+        self._scheduled.pop(room_id, None)
+        task = asyncio.ensure_future(self.callback(room_id))
+        task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Room tick failed", exc_info=task.exception())
@@ -0,0 +1,57 @@
+from django.conf import settings
+
+# Defaults for the real-time debate subsystem. Override any of these through
+# the ``DEBATES`` dict in settings.py.
+DEFAULTS = {
+    # Write-behind buffer for chat messages received over WebSockets
+    'MESSAGE_BUFFER_SIZE': 100,
+    'MESSAGE_FLUSH_INTERVAL': 1.0,
+    # Seconds without activity before a participant is considered stale
+    'PRESENCE_TIMEOUT': 3600,
+    # Debate sessions cached for WebSocket connects
+    'SESSION_CACHE_SIZE': 1000,
+    'SESSION_CACHE_TTL': 300,
+    # Seconds between checks of a room's moderation version, for mutes and
+    # removals made by another process (the REST server) on its own layer
+    'MODERATION_CHECK_INTERVAL': 1.0,
+    # Typing indicators: at most one typing_status frame per room per tick,
+    # and a user stops "typing" this many seconds after their last typing_start
+    'TYPING_TICK': 0.5,
+    'TYPING_TTL': 6.0,
+    # Reactions are written and broadcast as aggregated counts once per tick
+    'REACTION_TICK': 1.0,
+    # Seconds between batch frames sent to spectators
+    'SPECTATOR_TICK': 1.0,
+    # Frames kept per room for reconnect replay, and the most messages sent
+    # from history when a reconnect gap is older than that
+    'REPLAY_BUFFER_SIZE': 500,
+    'REPLAY_HISTORY_LIMIT': 100,
+    # Serve message, topic and session lists from values() rows instead of
+    # per-instance serializers (same output)
+    'FAST_READS': True,
+    # Dotted path of the debates.search backend; None picks SQLite FTS5 on
+    # SQLite and the portable LIKE-based backend elsewhere
+    'SEARCH_BACKEND': None,
+    # Most messages in one history page (?history=N on connect, get_history)
+    'HISTORY_PAGE_LIMIT': 100,
+    # Frames queued per connection before typing/presence frames are shed, and
+    # how far behind (seconds) a client may fall before it is disconnected
+    'OUTBOUND_QUEUE_SIZE': 256,
+    'OUTBOUND_MAX_LAG': 10.0,
+    # Inbound WebSocket event limits per connection, in DRF throttle rate
+    # format. 'room' is the budget shared by everyone in a room for events
+    # that fan out. Set an entry to None to disable it.
+    'RATE_LIMITS': {
+        'message': '20/min',
+        'reaction': '120/min',
+        'typing': '60/min',
+        'participants': '10/min',
+        'history': '30/min',
+        'room': '1200/min',
+    },
+}
+
+
+def debate_setting(name):
+    """Return a real-time setting, falling back to the defaults above."""
+    return getattr(settings, 'DEBATES', {}).get(name, DEFAULTS[name])
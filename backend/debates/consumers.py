@@ -1,19 +1,70 @@
 import json
 import asyncio
 import logging
-from datetime import datetime
-from channels.generic.websocket import AsyncWebsocketConsumer
+from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from .models import DebateSession
-from django.core.cache import cache
+from channels.generic.websocket import AsyncWebsocketConsumer
+from core.metrics import DB_CALL_SECONDS, registry
+from .conf import debate_setting
+from .broadcast import encode_frame, frame_kind, publish, room_group_name, spectator_group_name
+from .history import history_after, history_before
+from .moderation import REMOVED_CLOSE_CODE, load_muted_users, moderation_ticker, muted_users
+from .outbound import OutboundQueue
+from .persistence import message_buffer
+from .presence import presence
+from .ratelimit import ConnectionRateLimiter
+from .reactions import parse_reaction, reaction_accumulator, reaction_ticker
+from .replay import room_log
+from .session_cache import get_debate_session
+from .spectators import relay, room_counts, spectator_feed, spectator_ticker
+from .typing_state import typing_tracker, typing_ticker
 
-User = get_user_model()
 logger = logging.getLogger(__name__)
 
-class DebateConsumer(AsyncWebsocketConsumer):
+WS_CONNECTIONS = registry.counter(
+    'debates_ws_connections_total',
+    'WebSocket connection attempts, by consumer and outcome.',
+    labels=('consumer', 'outcome'),
+)
+WS_EVENTS = registry.counter(
+    'debates_ws_events_total',
+    'Inbound WebSocket events, by type and whether they were rate limited.',
+    labels=('type', 'limited'),
+)
+# Event types counted by name; anything else a client sends is counted as 'other'
+KNOWN_EVENTS = ('message', 'typing_start', 'typing_stop', 'get_participants', 'get_history', 'reaction')
+
+class RoomConsumer(AsyncWebsocketConsumer):
+    """Helpers shared by the connections to a debate room."""
+
+    def query_param(self, name, default=None):
+        values = self.query_params.get(name)
+        return values[0] if values else default
+
+    async def send_history(self, before=None, limit=None):
+        """Send a page of stored messages, the latest ones or those older than ``before``."""
+        max_limit = debate_setting('HISTORY_PAGE_LIMIT')
+        try:
+            limit = min(max(int(limit), 1), max_limit)
+        except (TypeError, ValueError):
+            limit = max_limit
+        try:
+            with DB_CALL_SECONDS.time(call='history_before'):
+                page = await database_sync_to_async(history_before)(self.debate_session.id, before, limit)
+        except ValueError:
+            await self.send_frame({'type': 'error', 'code': 'invalid_cursor', 'event': 'get_history'})
+            return
+        await self.send_frame({'type': 'history', **page})
+
+    async def send_frame(self, payload):
+        """Encode a frame for this client only and queue it."""
+        await self.outbound.put(encode_frame(payload), frame_kind(payload))
+
+    async def send_text(self, text):
+        await self.send(text_data=text)
+
+
+class DebateConsumer(RoomConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.typing_timeout = None
@@ -22,40 +73,32 @@ class DebateConsumer(AsyncWebsocketConsumer):
         logger.info(f"WebSocket connection attempt started")
         
         self.debate_id = self.scope['url_route']['kwargs']['debate_id']
-        self.room_group_name = f'debate_{self.debate_id}'
+        self.room_group_name = room_group_name(self.debate_id)
         
         logger.info(f"Debate ID: {self.debate_id}, Room: {self.room_group_name}")
         
-        # Get the token from query parameters
-        query_string = self.scope.get('query_string', b'').decode()
-        logger.info(f"Query string: {query_string}")
-        
-        token = None
-        for param in query_string.split('&'):
-            if param.startswith('token='):
-                token = param.split('=')[1]
-                break
-        
-        if not token:
-            logger.error(f"REJECT: No token in query: {query_string}")
+        # The user was resolved from the token by JWTAuthMiddleware
+        self.query_params = parse_qs(self.scope.get('query_string', b'').decode())
+        if 'token' not in self.query_params:
+            logger.error(f"REJECT: No token in query")
+            WS_CONNECTIONS.inc(consumer='debate', outcome='no_token')
             await self.close(code=4001)
             return
         
-        logger.info(f"Token found, authenticating user...")
-        
-        # Authenticate user
-        user = await self.get_user_from_token(token)
-        if not user:
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
             logger.error(f"REJECT: Invalid token or user not found")
+            WS_CONNECTIONS.inc(consumer='debate', outcome='invalid_token')
             await self.close(code=4002)
             return
         
         logger.info(f"User authenticated: {user.username} (ID: {user.id})")
         
         # Check if debate session exists
-        debate_session = await self.get_debate_session(self.debate_id)
+        debate_session = await get_debate_session(self.debate_id)
         if not debate_session:
             logger.error(f"REJECT: Debate session {self.debate_id} not found")
+            WS_CONNECTIONS.inc(consumer='debate', outcome='no_session')
             await self.close(code=4003)
             return
         
@@ -63,6 +106,13 @@ class DebateConsumer(AsyncWebsocketConsumer):
         
         self.user = user
         self.debate_session = debate_session
+        # Every frame to this client goes through its bounded outbound queue
+        self.outbound = OutboundQueue(self.send_text, self.close)
+        self.rate_limiter = ConnectionRateLimiter(self.debate_id)
+        
+        # Frames stamped from here on reach this connection, so this is where
+        # the client's replay position starts
+        replay_seq = room_log.last_seq(self.debate_id)
         
         logger.info(f"Joining room group: {self.room_group_name}")
         
@@ -72,71 +122,73 @@ class DebateConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )        
         
+        # Cache the room's muted users. Loading after joining the group means
+        # no moderation event can fall in between; the ticker catches changes
+        # from processes that can't reach the group.
+        await load_muted_users(self.debate_id)
+        moderation_ticker.mark(self.debate_id)
+        
         logger.info(f"Accepting WebSocket connection for user: {user.username}")
         await self.accept()
+        WS_CONNECTIONS.inc(consumer='debate', outcome='accepted')
         
         # Add user to participants and notify others
-        await self.add_participant()
+        presence_version = self.add_participant()
         
-        # Send connection confirmation with current participants
-        participants = await self.get_participants()
+        # Send connection confirmation with a snapshot of current participants.
+        # The snapshot is taken after our own join, so it already covers it.
+        version, participants = presence.snapshot(self.debate_id)
         logger.info(f"Sending connection confirmation to {user.username}")
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'connection_established',
             'message': f'Connected to debate session {self.debate_id}',
             'user_id': user.id,
-            'username': user.username,            'participants': participants
-        }))
+            'username': user.username,
+            'participants': participants,
+            'presence_version': version,
+            'epoch': room_log.epoch,
+            'seq': replay_seq
+        })
         
-        # Notify others that user joined
-        logger.info(f"Notifying room that {user.username} joined")
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
+        # Catch a reconnecting client up on what it missed, or send a new one
+        # the latest messages if it asked for them
+        if 'last_seq' in self.query_params:
+            await self.replay_missed_frames()
+        elif 'history' in self.query_params:
+            await self.send_history(limit=self.query_param('history'))
+        
+        # Notify others that user joined (not for extra tabs of a present user)
+        if presence_version is not None:
+            logger.info(f"Notifying room that {user.username} joined")
+            await self.broadcast({
                 'type': 'user_joined',
                 'user_id': self.user.id,
                 'username': self.user.username,
-                'participants': participants
-            }
-        )
-        
-        # Send participant list update to all users (including self)
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'participant_update',
-                'participants': participants
-            }
-        )
+                'presence_version': presence_version,
+                'count': presence.count(self.debate_id)
+            })
         logger.info(f"WebSocket connection completed successfully for user: {user.username}")
 
     async def disconnect(self, close_code):
         logger.info(f"WebSocket disconnect initiated with code: {close_code}")
         
+        if hasattr(self, 'outbound'):
+            self.outbound.close()
+        
         # Remove user from participants and notify others
         if hasattr(self, 'user'):
             logger.info(f"User {self.user.username} disconnecting")
-            await self.remove_participant()
-            participants = await self.get_participants()
+            presence_version = self.remove_participant()
             
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
+            if presence_version is not None:
+                self.stop_typing()
+                await self.broadcast({
                     'type': 'user_left',
                     'user_id': self.user.id,
                     'username': self.user.username,
-                    'participants': participants
-                }
-            )
-            
-            # Send participant list update to all remaining users
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'participant_update',
-                    'participants': participants
-                }
-            )
+                    'presence_version': presence_version,
+                    'count': presence.count(self.debate_id)
+                })
         else:
             logger.warning("Disconnect called but no user was set")
         
@@ -152,206 +204,223 @@ class DebateConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
+        presence.touch(self.debate_id, self.user.id)
         message_type = text_data_json.get('type', 'message')
         
+        # Reject floods before they reach the database or the channel layer
+        retry_after = self.rate_limiter.check(message_type)
+        WS_EVENTS.inc(type=message_type if message_type in KNOWN_EVENTS else 'other', limited=bool(retry_after))
+        if retry_after:
+            logger.warning(f"Rate limited {message_type} from {self.user.username}")
+            await self.send_frame({
+                'type': 'error',
+                'code': 'rate_limited',
+                'event': message_type,
+                'retry_after': round(retry_after, 2)
+            })
+            return
+        
         if message_type == 'message':
             message = text_data_json.get('message', '')
             emoji_reactions = text_data_json.get('emoji_reactions', {})
             image_url = text_data_json.get('image_url', '')
             
+            if not message and not image_url:
+                return
+            
+            await load_muted_users(self.debate_id)
+            if muted_users.is_muted(self.debate_id, self.user.id):
+                await self.send_frame({'type': 'error', 'code': 'muted', 'event': 'message'})
+                return
+            
+            # Sending a message ends the author's typing indicator
+            self.stop_typing()
+            
+            # Queue for persistence; the durable id is known before the write
+            saved = message_buffer.append(self.debate_session.id, self.user.id, message)
+            
             # Send message to room group
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'debate_message',
-                    'message': message,
-                    'user_id': self.user.id,
-                    'username': self.user.username,
-                    'timestamp': datetime.now().isoformat(),
-                    'emoji_reactions': emoji_reactions,
-                    'image_url': image_url
-                }
-            )
+            await self.broadcast(replay=True, payload={
+                'type': 'message',
+                'message_id': str(saved.uuid),
+                'message': message,
+                'user_id': self.user.id,
+                'username': self.user.username,
+                'timestamp': saved.timestamp.isoformat(),
+                'emoji_reactions': emoji_reactions,
+                'image_url': image_url
+            })
             
         elif message_type == 'typing_start':
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'typing_notification',
-                    'action': 'start',
-                    'user_id': self.user.id,
-                    'username': self.user.username
-                }
-            )
+            # Typing state is aggregated per room and sent as typing_status on the next tick
+            if typing_tracker.start(self.debate_id, self.user.id, self.user.username):
+                typing_ticker.mark(self.debate_id)
             
         elif message_type == 'typing_stop':
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'typing_notification',
-                    'action': 'stop',
-                    'user_id': self.user.id,
-                    'username': self.user.username
-                }
-            )
+            self.stop_typing()
             
-        elif message_type == 'reaction':
-            message_id = text_data_json.get('message_id')
-            emoji = text_data_json.get('emoji')
+        elif message_type == 'get_participants':
+            # Full snapshot for clients that detected a gap in presence versions
+            version, participants = presence.snapshot(self.debate_id)
+            await self.send_frame({
+                'type': 'participant_list',
+                'participants': participants,
+                'presence_version': version
+            })
             
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'message_reaction',
-                    'message_id': message_id,
-                    'emoji': emoji,
-                    'user_id': self.user.id,
-                    'username': self.user.username
-                }
-            )
-
-    async def debate_message(self, event):
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'message',
-            'message': event['message'],
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'timestamp': event.get('timestamp'),
-            'emoji_reactions': event.get('emoji_reactions', {}),
-            'image_url': event.get('image_url', '')
-        }))
-
-    async def user_joined(self, event):
-        # Send user joined notification
-        await self.send(text_data=json.dumps({
-            'type': 'user_joined',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'participants': event.get('participants', [])
-        }))
+        elif message_type == 'get_history':
+            # Older messages, paged back from the cursor of the last history frame
+            await self.send_history(text_data_json.get('before'), text_data_json.get('limit'))
+            
+        elif message_type == 'reaction':
+            # Counted in memory; written and broadcast as totals on the room's reaction tick
+            reaction = parse_reaction(text_data_json.get('message_id'), text_data_json.get('emoji'))
+            if reaction is None:
+                logger.warning(f"Ignoring invalid reaction from {self.user.username}")
+                return
+            reaction_accumulator.add(self.debate_id, *reaction)
+            reaction_ticker.mark(self.debate_id)
 
-    async def user_left(self, event):
-        # Send user left notification
-        await self.send(text_data=json.dumps({
-            'type': 'user_left',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'participants': event.get('participants', [])
-        }))
+    async def broadcast(self, payload, **routing):
+        """Publish a frame to everyone in this debate room."""
+        relay(self.debate_id, payload)
+        await publish(self.channel_layer, self.debate_id, payload, **routing)
 
-    async def typing_notification(self, event):
-        # Don't send typing notification back to the sender
-        if event['user_id'] != self.user.id:
-            await self.send(text_data=json.dumps({                'type': f"typing_{event['action']}",
-                'user_id': event['user_id'],
-                'username': event['username']
-            }))
+    async def replay_missed_frames(self):
+        """Resend frames after the client's ``last_seq``, from the replay ring or else the database."""
+        try:
+            last_seq = int(self.query_param('last_seq'))
+        except ValueError:
+            return
+        if last_seq < 0:
+            return
+        frames = room_log.since(self.debate_id, self.query_param('epoch'), last_seq)
+        if frames is not None:
+            logger.info(f"Replaying {len(frames)} frames to {self.user.username}")
+            for text in frames:
+                await self.outbound.put(text)
+            return
 
-    async def message_reaction(self, event):
-        # Send reaction notification
-        await self.send(text_data=json.dumps({
-            'type': 'reaction',
-            'message_id': event['message_id'],
-            'emoji': event['emoji'],
-            'user_id': event['user_id'],
-            'username': event['username']
-        }))
+        with DB_CALL_SECONDS.time(call='history_after'):
+            page = await database_sync_to_async(history_after)(
+                self.debate_session.id,
+                self.query_param('last_message_id'),
+                debate_setting('REPLAY_HISTORY_LIMIT'),
+            )
+        logger.info(f"Replay gap for {self.user.username} fell out of the ring, sent {len(page['messages'])} messages from history")
+        await self.send_frame({'type': 'history', **page})
 
-    async def participant_update(self, event):
-        # Send participant list update
-        await self.send(text_data=json.dumps({
-            'type': 'participant_update',
-            'participants': event.get('participants', [])
-        }))
+    async def broadcast_frame(self, event):
+        # Forward the pre-encoded frame. Replayable frames are stamped here so
+        # every local consumer sees the same order of sequence numbers.
+        text = event['text']
+        if 'frame_id' in event:
+            text = room_log.stamp(self.debate_id, event['frame_id'], text)
+        if self.user.id in event.get('typing_user_ids', ()):
+            # Don't show users their own typing indicator. Only typers pay for this re-encode.
+            payload = json.loads(text)
+            payload['typing_users'] = [u for u in payload['typing_users'] if u['user_id'] != self.user.id]
+            await self.send_frame(payload)
+            return
+        await self.outbound.put(text, event.get('kind', 'message'))
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        try:
-            logger.info(f"Attempting to validate token...")
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']
-            logger.info(f"Token valid, user_id: {user_id}")
-            user = User.objects.get(id=user_id)
-            logger.info(f"User found: {user.username}")
-            return user
-        except (InvalidToken, TokenError) as e:
-            logger.error(f"Token validation failed: {e}")
-            return None
-        except User.DoesNotExist:
-            logger.error(f"User with id {user_id} does not exist")
-            return None
-        except Exception as e:
-            logger.error(f"Unexpected error during token validation: {e}")
-            return None
+    async def moderation_update(self, event):
+        # Every member applies the change in case it is the first to see it on this process
+        muted_users.apply(self.debate_id, event['user_id'], event['action'])
+        if event['user_id'] != self.user.id:
+            return
+        frame = encode_frame({'type': 'moderation', 'action': event['action']})
+        if event['action'] == 'removed':
+            # Sent ahead of anything queued, as the socket is closed right after
+            await self.send_text(frame)
+            await self.close(code=REMOVED_CLOSE_CODE)
+            return
+        await self.outbound.put(frame)
 
-    @database_sync_to_async
-    def get_debate_session(self, debate_id):
-        try:
-            logger.info(f"Looking up debate session: {debate_id}")
-            session = DebateSession.objects.get(id=debate_id)
-            logger.info(f"Debate session found: {session.topic}")
-            return session
-        except DebateSession.DoesNotExist:
-            logger.error(f"Debate session {debate_id} does not exist")
-            return None
-        except Exception as e:
-            logger.error(f"Unexpected error looking up debate session: {e}")
-            return None
+    def stop_typing(self):
+        if typing_tracker.stop(self.debate_id, self.user.id):
+            typing_ticker.mark(self.debate_id)
 
-    @database_sync_to_async
     def add_participant(self):
-        # Add user to active participants list in cache
-        cache_key = f'debate_participants_{self.debate_id}'
-        participants = cache.get(cache_key, [])
-        
-        # Check if user is not already in the list
-        user_data = {
-            'id': self.user.id,
-            'username': self.user.username,
-            'is_online': True
-        }
-        
-        # Remove existing entry if present (to avoid duplicates)
-        participants = [p for p in participants if p['id'] != self.user.id]        # Add current user
-        participants.append(user_data)
-        
-        # Store back in cache (expire after 1 hour of inactivity)
-        cache.set(cache_key, participants, 3600)
-        logger.info(f"Added participant {self.user.username} to debate {self.debate_id}. Total: {len(participants)}")
+        # Register this connection; returns the presence version if the user joined
+        version = presence.add(self.debate_id, self.user.id, self.user.username)
+        logger.info(f"Added participant {self.user.username} to debate {self.debate_id}. Total: {presence.count(self.debate_id)}")
+        return version
 
-    @database_sync_to_async
     def remove_participant(self):
-        # Remove user from active participants list in cache
-        cache_key = f'debate_participants_{self.debate_id}'
-        participants = cache.get(cache_key, [])
-        
-        # Remove user from the list
-        participants = [p for p in participants if p['id'] != self.user.id]
-        
-        # Update cache
-        if participants:
-            cache.set(cache_key, participants, 3600)
-        else:
-            cache.delete(cache_key)
-        
-        logger.info(f"Removed participant {self.user.username} from debate {self.debate_id}. Remaining: {len(participants)}")
+        # Unregister this connection; the user stays listed while other tabs are open
+        version = presence.remove(self.debate_id, self.user.id)
+        logger.info(f"Removed participant {self.user.username} from debate {self.debate_id}. Remaining: {presence.count(self.debate_id)}")
+        return version
 
-    @database_sync_to_async
-    def get_participants(self):
-        # Get list of active participants from cache
-        cache_key = f'debate_participants_{self.debate_id}'
-        participants = cache.get(cache_key, [])
-        logger.info(f"Retrieved {len(participants)} participants for debate {self.debate_id}: {[p['username'] for p in participants]}")
-        return participants
-
-    @database_sync_to_async
     def cleanup_participants(self):
-        """Clean up stale participant entries (optional periodic cleanup)"""
-        cache_key = f'debate_participants_{self.debate_id}'
-        participants = cache.get(cache_key, [])
-        
-        # For now, just return the current list
-        # In the future, we could add logic to check for stale connections
+        """Drop participants that have been idle longer than PRESENCE_TIMEOUT"""
+        presence.expire(self.debate_id, debate_setting('PRESENCE_TIMEOUT'))
+        participants = presence.members(self.debate_id)
         logger.info(f"Participant cleanup for debate {self.debate_id}: {len(participants)} active")
-        return participants
\ No newline at end of file
+        return participants
+
+
+class SpectatorConsumer(RoomConsumer):
+    """Read-only audience connection, sent one ``batch`` frame per ``SPECTATOR_TICK``."""
+
+    async def connect(self):
+        self.debate_id = self.scope['url_route']['kwargs']['debate_id']
+        self.query_params = parse_qs(self.scope.get('query_string', b'').decode())
+        if 'token' not in self.query_params:
+            WS_CONNECTIONS.inc(consumer='spectator', outcome='no_token')
+            await self.close(code=4001)
+            return
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
+            WS_CONNECTIONS.inc(consumer='spectator', outcome='invalid_token')
+            await self.close(code=4002)
+            return
+        debate_session = await get_debate_session(self.debate_id)
+        if not debate_session:
+            WS_CONNECTIONS.inc(consumer='spectator', outcome='no_session')
+            await self.close(code=4003)
+            return
+
+        self.user = user
+        self.debate_session = debate_session
+        self.group_name = spectator_group_name(self.debate_id)
+        self.outbound = OutboundQueue(self.send_text, self.close)
+        self.rate_limiter = ConnectionRateLimiter(self.debate_id)
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        WS_CONNECTIONS.inc(consumer='spectator', outcome='accepted')
+        spectator_feed.join(self.debate_id)
+        spectator_ticker.mark(self.debate_id)
+        logger.info(f"{user.username} is spectating debate {self.debate_id}")
+
+        await self.send_frame({'type': 'spectating', **room_counts(self.debate_id)})
+        if 'history' in self.query_params:
+            await self.send_history(limit=self.query_param('history'))
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'group_name'):
+            return
+        self.outbound.close()
+        spectator_feed.leave(self.debate_id)
+        spectator_ticker.mark(self.debate_id)
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data):
+        text_data_json = json.loads(text_data)
+        if text_data_json.get('type') != 'get_history':
+            return
+        retry_after = self.rate_limiter.check('get_history')
+        if retry_after:
+            await self.send_frame({
+                'type': 'error',
+                'code': 'rate_limited',
+                'event': 'get_history',
+                'retry_after': round(retry_after, 2)
+            })
+            return
+        await self.send_history(text_data_json.get('before'), text_data_json.get('limit'))
+
+    async def broadcast_frame(self, event):
+        await self.outbound.put(event['text'], event.get('kind', 'message'))
@@ -0,0 +1,82 @@
+import uuid
+
+from .models import Message, MessageReaction
+from .pagination import after_position, before_position, decode_cursor, encode_cursor
+from .persistence import message_buffer
+
+MESSAGE_FIELDS = ('id', 'uuid', 'content', 'timestamp', 'author_id', 'author__username')
+
+
+def latest_rows(queryset, limit):
+    """
+    The newest ``limit`` rows of ``queryset`` on ``(timestamp, id)``, oldest
+    first, and whether older rows were left out.
+    """
+    rows = list(queryset.order_by('-timestamp', '-id').values(*MESSAGE_FIELDS)[:limit + 1])
+    return rows[:limit][::-1], len(rows) > limit
+
+
+def reaction_totals(message_ids):
+    """``{message_id: {emoji: count}}`` for some messages, in one query."""
+    reactions = {}
+    for message_id, emoji, count in MessageReaction.objects.filter(
+            message_id__in=message_ids).values_list('message_id', 'emoji', 'count'):
+        reactions.setdefault(message_id, {})[emoji] = count
+    return reactions
+
+
+def compact_page(rows, has_more):
+    """
+    A ``history`` frame body for stored messages. Authors are sent once in a
+    ``users`` side table instead of being repeated on every message; ``cursor``
+    pages further back from the oldest message included.
+    """
+    reactions = reaction_totals([row['id'] for row in rows])
+
+    users = {}
+    messages = []
+    for row in rows:
+        users[str(row['author_id'])] = row['author__username']
+        messages.append({
+            'message_id': str(row['uuid']),
+            'message': row['content'],
+            'user_id': row['author_id'],
+            'timestamp': row['timestamp'].isoformat(),
+            'emoji_reactions': reactions.get(row['id'], {}),
+        })
+    page = {'messages': messages, 'users': users, 'has_more': has_more}
+    if rows:
+        page['cursor'] = encode_cursor(rows[0]['timestamp'], rows[0]['id'])
+    return page
+
+
+def history_before(session_id, cursor=None, limit=50):
+    """The latest messages of a session, or the ones just older than ``cursor``."""
+    # Anything still in the write-behind buffer must be visible to the query
+    message_buffer.flush()
+
+    queryset = Message.objects.filter(session_id=session_id)
+    if cursor is not None:
+        queryset = queryset.filter(before_position(*decode_cursor(cursor)))
+    return compact_page(*latest_rows(queryset, limit))
+
+
+def history_after(session_id, after_message_id=None, limit=100):
+    """
+    Messages of a session newer than ``after_message_id`` (a message uuid), or
+    the latest ones if it is missing or unknown. At most ``limit`` messages;
+    ``has_more`` is True if older matching messages were left out, and the
+    client can page back to them from ``cursor``.
+    """
+    message_buffer.flush()
+
+    queryset = Message.objects.filter(session_id=session_id)
+    anchor = None
+    if after_message_id:
+        try:
+            anchor = queryset.filter(uuid=uuid.UUID(str(after_message_id))).values('timestamp', 'id').first()
+        except ValueError:
+            anchor = None
+    if anchor:
+        queryset = queryset.filter(after_position(anchor['timestamp'], anchor['id']))
+    return compact_page(*latest_rows(queryset, limit))
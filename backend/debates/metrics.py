@@ -0,0 +1,34 @@
+from .outbound import outbound_stats
+from .presence import presence
+from .spectators import spectator_feed
+
+OUTBOUND_OUTCOMES = ('sent', 'coalesced', 'dropped_typing', 'dropped_presence')
+
+
+def collect():
+    """Scrape-time view of the real-time state this process already tracks."""
+    yield (
+        'debates_room_sockets', 'gauge', 'Open participant WebSocket connections per debate room.',
+        [({'room': room}, count) for room, count in presence.connection_counts().items()],
+    )
+    yield (
+        'debates_room_spectators', 'gauge', 'Open spectator WebSocket connections per debate room.',
+        [({'room': room}, count) for room, count in spectator_feed.counts().items()],
+    )
+    stats = outbound_stats.snapshot()
+    yield (
+        'debates_outbound_frames_total', 'counter', 'Frames handled by outbound queues, by outcome.',
+        [({'outcome': outcome}, stats.get(outcome, 0)) for outcome in OUTBOUND_OUTCOMES],
+    )
+    yield (
+        'debates_slow_consumer_disconnects_total', 'counter', 'Connections closed for falling behind.',
+        [({}, stats.get('slow_disconnects', 0))],
+    )
+    yield (
+        'debates_outbound_queued_frames', 'gauge', 'Frames waiting in outbound queues.',
+        [({}, stats['queued'])],
+    )
+    yield (
+        'debates_outbound_max_depth', 'gauge', 'Deepest outbound queue.',
+        [({}, stats['max_depth'])],
+    )
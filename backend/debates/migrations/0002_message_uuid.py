@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-16 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+def populate_message_uuids(apps, schema_editor):
+    Message = apps.get_model('debates', 'Message')
+    for message in Message.objects.filter(uuid__isnull=True).only('pk'):
+        message.uuid = uuid.uuid4()
+        message.save(update_fields=['uuid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        # Existing rows need distinct values before the unique constraint is added
+        migrations.AddField(
+            model_name='message',
+            name='uuid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_message_uuids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='message',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-16 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debates', '0002_message_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageReaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emoji', models.CharField(max_length=32)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='debates.message')),
+            ],
+            options={
+                'unique_together': {('message', 'emoji')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debates', '0003_messagereaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['session', 'timestamp', 'id'], name='message_session_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def seed_versions(apps, schema_editor):
+    # Existing resources get a version, so they answer conditional GETs before their next change
+    DebateSession = apps.get_model('debates', 'DebateSession')
+    ResourceVersion = apps.get_model('debates', 'ResourceVersion')
+    keys = ['topics'] + [f'session:{pk}' for pk in DebateSession.objects.values_list('pk', flat=True)]
+    ResourceVersion.objects.bulk_create([ResourceVersion(key=key, version=1) for key in keys])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debates', '0004_message_session_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(seed_versions, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Participation(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -33,10 +35,42 @@ class Message(models.Model):
     session = models.ForeignKey(DebateSession, related_name='messages', on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Assigned when the message is accepted (not when it is written), so that
+    # WebSocket messages persisted in batches keep their original ordering.
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Durable id handed out before a buffered message reaches the database
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
 
     def __str__(self):
         return f'Message by {self.author.username} in {self.session.topic.title}'
 
     class Meta:
-        ordering = ['timestamp']
\ No newline at end of file
+        ordering = ['timestamp']
+        indexes = [
+            # Keyset pagination and history reads within a session
+            models.Index(fields=['session', 'timestamp', 'id'], name='message_session_keyset_idx'),
+        ]
+
+class MessageReaction(models.Model):
+    """Aggregated count of one emoji reaction on a message."""
+    message = models.ForeignKey(Message, related_name='reactions', on_delete=models.CASCADE)
+    emoji = models.CharField(max_length=32)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('message', 'emoji')
+
+    def __str__(self):
+        return f'{self.emoji} x{self.count} on message {self.message_id}'
+
+class ResourceVersion(models.Model):
+    """
+    Change counter behind the ETag and Last-Modified of an API resource, such
+    as ``session:<id>`` or ``topics``. See debates/versions.py.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.key} v{self.version}'
@@ -0,0 +1,147 @@
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from core.metrics import DB_CALL_SECONDS
+from core.ttlcache import TTLCache
+from .broadcast import room_group_name
+from .coalesce import RoomTicker
+from .conf import debate_setting
+from .models import Participation
+from .presence import presence
+from .versions import lookup, moderation_key
+
+logger = logging.getLogger(__name__)
+
+# Close code for a socket whose user was removed from the debate
+REMOVED_CLOSE_CODE = 4009
+
+
+class MuteRegistry:
+    """
+    In-process copy of each debate room's participants, as ``{user_id: is_muted}``,
+    tagged with the room's moderation version.
+
+    A room is loaded from ``Participation`` when a member joins or posts and it
+    isn't cached, so checking an inbound chat frame is a dict lookup instead
+    of a query. Changes are applied in place by the ``Participation`` signals
+    and by ``moderation.update`` events. Changes made in another process, such
+    as the REST server, move the version instead; ``check_moderation`` reloads
+    the room then and the difference tells it what this process missed.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self._rooms = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+
+    def loaded(self, room_id):
+        return self._rooms.get(str(room_id)) is not None
+
+    def version(self, room_id):
+        room = self._rooms.get(str(room_id))
+        return room[0] if room is not None else None
+
+    def load(self, room_id, version, participants):
+        """
+        Cache a room's ``{user_id: is_muted}`` as of ``version``. Returns
+        ``[(user_id, action)]`` for how it differs from the copy it replaces.
+        """
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            self._rooms.set(str(room_id), (version, dict(participants)))
+        if room is None:
+            return []
+        before = room[1]
+        changes = [(user_id, 'removed') for user_id in before if user_id not in participants]
+        changes += [(user_id, 'muted' if muted else 'unmuted')
+                    for user_id, muted in participants.items() if before.get(user_id, False) != muted]
+        return changes
+
+    def is_muted(self, room_id, user_id):
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            return room is not None and room[1].get(user_id, False)
+
+    def apply(self, room_id, user_id, action):
+        """Record a moderation ``action`` for a loaded room; unloaded rooms read it on load."""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                return
+            if action == 'removed':
+                room[1].pop(user_id, None)
+            else:
+                room[1][user_id] = action == 'muted'
+
+    def clear(self):
+        self._rooms.clear()
+
+
+muted_users = MuteRegistry(debate_setting('SESSION_CACHE_SIZE'), debate_setting('SESSION_CACHE_TTL'))
+
+
+def moderation_version(session_id):
+    key = moderation_key(session_id)
+    found = lookup(key).get(key)
+    return found[0] if found else None
+
+
+def room_participants(session_id):
+    return dict(Participation.objects.filter(session_id=session_id).values_list('user_id', 'is_muted'))
+
+
+def load_room(session_id):
+    # Version first: a change landing in between is picked up by the next check
+    version = moderation_version(session_id)
+    return muted_users.load(session_id, version, room_participants(session_id))
+
+
+async def load_muted_users(room_id):
+    """Make sure a room's muted set is cached."""
+    if not muted_users.loaded(room_id):
+        with DB_CALL_SECONDS.time(call='muted_user_ids'):
+            await database_sync_to_async(load_room)(room_id)
+
+
+def missed_moderation(session_id):
+    """Reload a cached room if its version moved; ``[(user_id, action)]`` that changed."""
+    if not muted_users.loaded(session_id) or muted_users.version(session_id) == moderation_version(session_id):
+        return []
+    return load_room(session_id)
+
+
+def moderation_event(user_id, action):
+    return {'type': 'moderation.update', 'user_id': user_id, 'action': action}
+
+
+def notify_moderation(session_id, user_id, action):
+    """
+    Tell every process sharing this one's channel layer that a moderator muted,
+    unmuted or removed a user in a debate room. ``action`` is ``muted``,
+    ``unmuted`` or ``removed``. Processes on another layer pick the change up
+    from the room's moderation version within ``MODERATION_CHECK_INTERVAL``.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(room_group_name(session_id), moderation_event(user_id, action))
+    logger.info(f"User {user_id} {action} in debate {session_id}")
+
+
+async def check_moderation(room_id):
+    """Deliver moderation done elsewhere to the room's members here, while it has any."""
+    if not presence.count(room_id):
+        return
+    with DB_CALL_SECONDS.time(call='moderation_version'):
+        changes = await database_sync_to_async(missed_moderation)(room_id)
+    channel_layer = get_channel_layer()
+    for user_id, action in changes:
+        logger.info(f"User {user_id} {action} in debate {room_id} by another process")
+        await channel_layer.group_send(room_group_name(room_id), moderation_event(user_id, action))
+    moderation_ticker.mark(room_id)
+
+
+moderation_ticker = RoomTicker(debate_setting('MODERATION_CHECK_INTERVAL'), check_moderation)
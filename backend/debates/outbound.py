@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import Counter, deque
+
+from .conf import debate_setting
+
+logger = logging.getLogger(__name__)
+
+# Frame kinds in the order they are shed when a connection's queue is full.
+# Anything else (chat messages, reaction totals, replies) is never dropped.
+DROPPABLE_KINDS = ('typing', 'presence')
+# Kinds where only the newest queued frame matters; a newer one replaces it in place
+COALESCED_KINDS = ('typing', 'snapshot')
+
+# Close code sent to clients that fall too far behind; they reconnect and replay
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+class OutboundStats:
+    """Process-wide counters for outbound queues, plus live depth across connections."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self._queues = weakref.WeakSet()
+
+    def register(self, queue):
+        self._queues.add(queue)
+
+    def snapshot(self):
+        depths = [len(queue) for queue in list(self._queues)]
+        return dict(
+            self.counters,
+            connections=len(depths),
+            queued=sum(depths),
+            max_depth=max(depths, default=0),
+        )
+
+
+outbound_stats = OutboundStats()
+
+
+class OutboundQueue:
+    """
+    Bounded send queue for one WebSocket connection.
+
+    Group handlers enqueue and return straight away; a writer task drains the
+    queue in order. When a client can't keep up, the queue sheds what is cheap
+    to lose before anything else: queued typing frames first, then presence
+    deltas (clients recover from the version gap with ``get_participants``).
+    Typing frames and participant snapshots are coalesced so only the newest
+    one is ever queued. A connection whose oldest queued frame is more than
+    ``max_lag`` seconds old, or whose queue is full of frames that can't be
+    dropped, is closed with ``SLOW_CONSUMER_CLOSE_CODE``.
+
+    ASGI gives the application no view of the socket: Daphne's ``send`` writes
+    to the transport buffer and returns at once, however slow the client. So
+    the queue bounds only the latency between a group handler and that hand
+    off, such as a writer starved by a busy event loop, not a slow network.
+    """
+
+    def __init__(self, send, close, maxsize=None, max_lag=None):
+        self._send = send
+        self._close = close
+        self.maxsize = maxsize or debate_setting('OUTBOUND_QUEUE_SIZE')
+        self.max_lag = max_lag or debate_setting('OUTBOUND_MAX_LAG')
+        self._frames = deque()
+        self._task = None
+        self.closed = False
+        outbound_stats.register(self)
+
+    def __len__(self):
+        return len(self._frames)
+
+    async def put(self, text, kind='message'):
+        """Queue an encoded frame. Returns False if it was dropped."""
+        if self.closed:
+            return False
+        now = time.monotonic()
+        if self._frames and now - self._frames[0][2] > self.max_lag:
+            await self._disconnect(f"{now - self._frames[0][2]:.1f}s behind")
+            return False
+
+        if kind in COALESCED_KINDS and self._replace(kind, text):
+            outbound_stats.counters['coalesced'] += 1
+            return True
+
+        if len(self._frames) >= self.maxsize and not self._shed(kind):
+            if kind in DROPPABLE_KINDS:
+                outbound_stats.counters[f'dropped_{kind}'] += 1
+                return False
+            await self._disconnect(f"queue full ({len(self._frames)} frames)")
+            return False
+
+        self._frames.append((kind, text, now))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+        return True
+
+    def _replace(self, kind, text):
+        for index, (queued_kind, _, enqueued_at) in enumerate(self._frames):
+            if queued_kind == kind:
+                self._frames[index] = (kind, text, enqueued_at)
+                return True
+        return False
+
+    def _shed(self, incoming_kind):
+        """Drop one queued frame that is less important than the incoming one."""
+        for kind in DROPPABLE_KINDS:
+            if kind == incoming_kind:
+                return False
+            for index, (queued_kind, _, _) in enumerate(self._frames):
+                if queued_kind == kind:
+                    del self._frames[index]
+                    outbound_stats.counters[f'dropped_{kind}'] += 1
+                    return True
+        return False
+
+    async def _drain(self):
+        try:
+            while self._frames:
+                lag = time.monotonic() - self._frames[0][2]
+                if lag > self.max_lag:
+                    # Not through close(), which would cancel this task mid-disconnect
+                    self._task = None
+                    await self._disconnect(f"{lag:.1f}s behind")
+                    return
+                _, text, _ = self._frames.popleft()
+                await self._send(text)
+                outbound_stats.counters['sent'] += 1
+        finally:
+            self._task = None
+
+    async def _disconnect(self, reason):
+        logger.warning(f"Closing slow WebSocket consumer: {reason}")
+        outbound_stats.counters['slow_disconnects'] += 1
+        self.close()
+        await self._close(SLOW_CONSUMER_CLOSE_CODE)
+
+    def close(self):
+        """Discard queued frames and stop the writer."""
+        self.closed = True
+        self._frames.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,149 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Position parameters; a request uses at most one of them
+POSITION_PARAMS = ('after', 'before', 'since')
+
+
+def encode_cursor(timestamp, message_id):
+    """Opaque, URL-safe keyset position of a message: its ``(timestamp, id)``."""
+    raw = f'{timestamp.isoformat()}|{message_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``. Raises ValueError for a malformed cursor."""
+    try:
+        cursor = str(cursor)
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, message_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except (TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError(f'Invalid message cursor {cursor!r}')
+
+
+def position_of(row):
+    """``(timestamp, id)`` of a message instance or ``values()`` row."""
+    if isinstance(row, dict):
+        return row['timestamp'], row['id']
+    return row.timestamp, row.id
+
+
+def before_position(timestamp, message_id):
+    return Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id)
+
+
+def after_position(timestamp, message_id):
+    return Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id)
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    Keyset pagination of messages on ``(timestamp, id)``.
+
+    Without a position the newest page is returned. ``after=<cursor>`` pages
+    forward and ``before=<cursor>`` backward from a message; ``since=<ISO
+    8601 time>`` starts after a point in time. Results are always oldest first.
+    Every page is one indexed range scan of ``limit + 1`` rows, however deep it
+    is. Works on model and ``values()`` querysets alike.
+
+    ``next`` is set on every response, pointing after the newest message
+    returned (or at the same position if there were none), so a client can
+    poll it for new messages. ``previous`` is only set if older messages exist.
+    """
+
+    page_size = 50
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        params = request.query_params
+        position = [name for name in POSITION_PARAMS if params.get(name)]
+        if len(position) > 1:
+            raise ValidationError({'detail': f'Use only one of {", ".join(POSITION_PARAMS)}.'})
+
+        self.cursor = None
+        if position == ['since']:
+            since = parse_datetime(params['since'])
+            if since is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 date and time.'})
+            queryset, forward = queryset.filter(timestamp__gt=since), True
+        elif position:
+            try:
+                self.cursor = decode_cursor(params[position[0]])
+            except ValueError:
+                raise ValidationError({position[0]: 'Invalid cursor.'})
+            if position == ['after']:
+                queryset, forward = queryset.filter(after_position(*self.cursor)), True
+            else:
+                queryset, forward = queryset.filter(before_position(*self.cursor)), False
+        else:
+            forward = False
+
+        ordering = ('timestamp', 'id') if forward else ('-timestamp', '-id')
+        rows = list(queryset.order_by(*ordering)[:self.limit + 1])
+        more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if not forward:
+            rows.reverse()
+
+        # Older rows exist if we stopped short going backward, or started from a position going forward
+        self.has_previous = more if not forward else bool(position)
+        self.page = rows
+        return rows
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(limit, 1), self.max_page_size)
+
+    def link(self, **position):
+        url = self.request.build_absolute_uri()
+        for name in POSITION_PARAMS:
+            url = remove_query_param(url, name)
+        for name, value in position.items():
+            url = replace_query_param(url, name, value)
+        return url
+
+    def get_next_link(self):
+        if self.page:
+            return self.link(after=encode_cursor(*position_of(self.page[-1])))
+        # Nothing newer yet: poll the same position again
+        params = self.request.query_params
+        if self.cursor is not None and params.get('after'):
+            return self.link(after=params['after'])
+        if params.get('since'):
+            return self.link(since=params['since'])
+        return self.link()
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.link(before=encode_cursor(*position_of(self.page[0])))
+
+    def get_paginated_response(self, data, **extra):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+            **extra,
+        })
+
+
+class SearchPagination(PageNumberPagination):
+    """Numbered pages of search results, most relevant first."""
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,137 @@
+import asyncio
+import atexit
+import logging
+import threading
+import uuid
+
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.utils import timezone
+
+from core.metrics import DB_CALL_SECONDS
+from .conf import debate_setting
+from .models import DebateSession, Message
+from .versions import bump, session_key
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+class MessageWriteBuffer:
+    """
+    Per-process write-behind buffer for chat messages received over WebSockets.
+
+    Consumers append messages without touching the database; every message gets
+    its durable ``uuid`` and ``timestamp`` immediately so they can be broadcast
+    right away. Pending messages are written with a single ``bulk_create`` once
+    ``batch_size`` messages are queued or ``flush_interval`` seconds have passed,
+    whichever comes first, and once more when the process exits.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or debate_setting('MESSAGE_BUFFER_SIZE')
+        self.flush_interval = flush_interval or debate_setting('MESSAGE_FLUSH_INTERVAL')
+        self._pending = []
+        self._lock = threading.Lock()
+        # Serializes flushes so a batch is never written twice or out of order
+        self._flush_lock = threading.Lock()
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def append(self, session_id, author_id, content):
+        """Queue a message for persistence and return the unsaved instance."""
+        message = Message(
+            uuid=uuid.uuid4(),
+            session_id=session_id,
+            author_id=author_id,
+            content=content,
+            timestamp=timezone.now(),
+        )
+        with self._lock:
+            self._pending.append(message)
+            full = len(self._pending) >= self.batch_size
+
+        self._ensure_flusher()
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+        return message
+
+    def flush(self):
+        """Write all pending messages. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            try:
+                try:
+                    Message.objects.bulk_create(batch, batch_size=self.batch_size)
+                except IntegrityError:
+                    # A session or author was deleted while its messages were queued.
+                    # Drop those rows rather than failing the whole batch forever.
+                    batch = self._without_orphans(batch)
+                    Message.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception:
+                logger.exception(f"Failed to persist {len(batch)} buffered messages, will retry")
+                with self._lock:
+                    self._pending[:0] = batch
+                raise
+
+            bump(*sorted({session_key(message.session_id) for message in batch}))
+            logger.info(f"Persisted {len(batch)} buffered messages")
+            return len(batch)
+
+    async def aflush(self):
+        with DB_CALL_SECONDS.time(call='flush_messages'):
+            return await database_sync_to_async(self.flush)()
+
+    def _without_orphans(self, batch):
+        session_ids = set(DebateSession.objects.filter(
+            id__in={m.session_id for m in batch}).values_list('id', flat=True))
+        author_ids = set(User.objects.filter(
+            id__in={m.author_id for m in batch}).values_list('id', flat=True))
+        kept = [m for m in batch if m.session_id in session_ids and m.author_id in author_ids]
+        if len(kept) != len(batch):
+            logger.warning(f"Dropped {len(batch) - len(kept)} buffered messages for deleted sessions or users")
+        return kept
+
+    def _ensure_flusher(self):
+        """Start the time-based flusher on the running event loop, if any."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from sync code: the next flush() or process exit picks it up
+            return
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.aflush()
+            except Exception:
+                pass  # Already logged; the batch stays queued for the next round
+
+            # Stop while idle; the next append() starts a new flusher
+            if not self._pending:
+                self._task = None
+                return
+
+
+message_buffer = MessageWriteBuffer()
+
+# Daphne exits through the normal interpreter shutdown on SIGINT/SIGTERM
+atexit.register(message_buffer.flush)
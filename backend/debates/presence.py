@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceStore:
+    """
+    In-process registry of who is connected to each debate room.
+
+    Every operation touches a single member entry under one lock, so joins and
+    leaves are O(1) regardless of room size and concurrent joins can't overwrite
+    each other. A user with several open sockets (e.g. two tabs) is counted once
+    and only leaves the room when their last connection closes.
+
+    Each room has a presence version that is bumped whenever its membership
+    changes, so clients can apply join/leave deltas in order and spot gaps.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _bump(self, room_key):
+        version = self._versions.get(room_key, 0) + 1
+        self._versions[room_key] = version
+        return version
+
+    def add(self, room_id, user_id, username):
+        """
+        Register a connection. Returns the new presence version if the user
+        joined the room, or None if they were already present.
+        """
+        room_key = str(room_id)
+        with self._lock:
+            members = self._rooms.setdefault(room_key, {})
+            entry = members.get(user_id)
+            if entry is not None:
+                entry['connections'] += 1
+                entry['last_seen'] = time.monotonic()
+                return None
+            members[user_id] = {
+                'username': username,
+                'connections': 1,
+                'last_seen': time.monotonic(),
+            }
+            return self._bump(room_key)
+
+    def remove(self, room_id, user_id):
+        """
+        Unregister a connection. Returns the new presence version if the user
+        left the room, or None if they still have other connections open.
+        """
+        room_key = str(room_id)
+        with self._lock:
+            members = self._rooms.get(room_key)
+            if not members or user_id not in members:
+                return None
+            entry = members[user_id]
+            entry['connections'] -= 1
+            if entry['connections'] > 0:
+                return None
+            del members[user_id]
+            if not members:
+                del self._rooms[room_key]
+            return self._bump(room_key)
+
+    def touch(self, room_id, user_id):
+        """Mark a member as active. Returns False if they are not in the room."""
+        with self._lock:
+            entry = self._rooms.get(str(room_id), {}).get(user_id)
+            if entry is None:
+                return False
+            entry['last_seen'] = time.monotonic()
+            return True
+
+    def count(self, room_id):
+        with self._lock:
+            return len(self._rooms.get(str(room_id), ()))
+
+    def connection_counts(self):
+        """Open connections per room, counting every socket of a user."""
+        with self._lock:
+            return {
+                room_key: sum(entry['connections'] for entry in members.values())
+                for room_key, members in self._rooms.items()
+            }
+
+    def version(self, room_id):
+        with self._lock:
+            return self._versions.get(str(room_id), 0)
+
+    def members(self, room_id):
+        """Snapshot of the room in the participant format sent to clients."""
+        return self.snapshot(room_id)[1]
+
+    def snapshot(self, room_id):
+        """Return ``(version, members)`` read atomically."""
+        room_key = str(room_id)
+        with self._lock:
+            version = self._versions.get(room_key, 0)
+            members = list(self._rooms.get(room_key, {}).items())
+        return version, [
+            {'id': user_id, 'username': entry['username'], 'is_online': True}
+            for user_id, entry in members
+        ]
+
+    def expire(self, room_id, max_idle):
+        """Drop members not seen for ``max_idle`` seconds. Returns their user ids."""
+        cutoff = time.monotonic() - max_idle
+        with self._lock:
+            members = self._rooms.get(str(room_id))
+            if not members:
+                return []
+            stale = [user_id for user_id, entry in members.items() if entry['last_seen'] < cutoff]
+            for user_id in stale:
+                del members[user_id]
+            if not members:
+                del self._rooms[str(room_id)]
+            if stale:
+                self._bump(str(room_id))
+        if stale:
+            logger.info(f"Expired {len(stale)} stale participants from debate {room_id}")
+        return stale
+
+    def clear(self, room_id=None):
+        with self._lock:
+            if room_id is None:
+                self._rooms.clear()
+                self._versions.clear()
+            else:
+                self._rooms.pop(str(room_id), None)
+                self._versions.pop(str(room_id), None)
+
+
+presence = PresenceStore()
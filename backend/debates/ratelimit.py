@@ -0,0 +1,98 @@
+import time
+
+from core.ttlcache import TTLCache
+
+from .conf import debate_setting
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Inbound event type -> rate limit bucket. Unlisted events are not limited.
+EVENT_BUCKETS = {
+    'message': 'message',
+    'reaction': 'reaction',
+    'typing_start': 'typing',
+    'typing_stop': 'typing',
+    'get_participants': 'participants',
+    'get_history': 'history',
+}
+
+# Buckets that also draw from the room's shared budget, since they fan out
+ROOM_BUDGETED = ('message', 'reaction', 'typing')
+
+
+def parse_rate(rate):
+    """Parse a DRF-style rate such as ``'30/min'`` into ``(count, seconds)``."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucket:
+    """Allows ``count`` events per ``seconds``, in bursts of up to ``count``."""
+
+    __slots__ = ('capacity', 'refill_rate', 'tokens', 'updated')
+
+    def __init__(self, count, seconds):
+        self.capacity = count
+        self.refill_rate = count / seconds
+        self.tokens = float(count)
+        self.updated = time.monotonic()
+
+    def consume(self):
+        """Take one token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.refill_rate
+
+
+def make_bucket(name):
+    rate = parse_rate(debate_setting('RATE_LIMITS').get(name))
+    return TokenBucket(*rate) if rate else None
+
+
+# Shared per-room budgets; an evicted idle room simply starts again with a full bucket
+room_buckets = TTLCache(maxsize=10000, ttl=300)
+
+
+class ConnectionRateLimiter:
+    """
+    Per-connection token buckets for inbound WebSocket events, one per event
+    type, backed by a per-room budget shared by every connection in the room.
+
+    Checks are plain arithmetic on the event loop, so an over-limit frame is
+    rejected before it costs a database write or a group fan-out.
+    """
+
+    def __init__(self, room_id):
+        self.room_key = str(room_id)
+        self._buckets = {}
+
+    def check(self, event_type):
+        """Returns 0 if the event may proceed, else the seconds to wait before retrying."""
+        name = EVENT_BUCKETS.get(event_type)
+        if name is None:
+            return 0
+        if name not in self._buckets:
+            self._buckets[name] = make_bucket(name)
+        bucket = self._buckets[name]
+        if bucket is not None:
+            retry_after = bucket.consume()
+            if retry_after:
+                return retry_after
+        if name in ROOM_BUDGETED:
+            return self._check_room()
+        return 0
+
+    def _check_room(self):
+        bucket = room_buckets.get(self.room_key)
+        if bucket is None:
+            bucket = make_bucket('room')
+            if bucket is None:
+                return 0
+        room_buckets.set(self.room_key, bucket)
+        return bucket.consume()
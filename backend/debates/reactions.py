@@ -0,0 +1,134 @@
+import atexit
+import logging
+import threading
+import uuid
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F
+
+from core.metrics import DB_CALL_SECONDS
+from .broadcast import publish
+from .coalesce import RoomTicker
+from .conf import debate_setting
+from .models import Message, MessageReaction
+from .persistence import message_buffer
+from .spectators import relay
+
+logger = logging.getLogger(__name__)
+
+MAX_EMOJI_LENGTH = MessageReaction._meta.get_field('emoji').max_length
+
+
+class ReactionAccumulator:
+    """
+    Reaction clicks not yet written, counted per room, message and emoji.
+
+    A reaction storm on one message collapses into a single counter here and
+    a single UPDATE per emoji when the room's tick drains it.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def add(self, room_id, message_id, emoji):
+        with self._lock:
+            room = self._rooms.setdefault(str(room_id), {})
+            room.setdefault(message_id, Counter())[emoji] += 1
+
+    def drain(self, room_id):
+        """Remove and return ``{message_uuid: Counter(emoji=delta)}`` for a room."""
+        with self._lock:
+            return self._rooms.pop(str(room_id), {})
+
+    def restore(self, room_id, deltas):
+        """Put back deltas that could not be written."""
+        with self._lock:
+            room = self._rooms.setdefault(str(room_id), {})
+            for message_id, counts in deltas.items():
+                room.setdefault(message_id, Counter()).update(counts)
+
+    def rooms(self):
+        with self._lock:
+            return list(self._rooms)
+
+
+reaction_accumulator = ReactionAccumulator()
+
+
+def parse_reaction(message_id, emoji):
+    """Validate an inbound reaction. Returns ``(message_uuid, emoji)`` or None."""
+    if not isinstance(emoji, str) or not 0 < len(emoji) <= MAX_EMOJI_LENGTH:
+        return None
+    try:
+        return str(uuid.UUID(str(message_id))), emoji
+    except ValueError:
+        return None
+
+
+def apply_reaction_deltas(session_id, deltas):
+    """
+    Add the accumulated deltas to the stored counters and return the new totals
+    as ``{message_uuid: {emoji: count}}`` for the messages that changed.
+    """
+    # Reactions may target messages still waiting in the write-behind buffer
+    message_buffer.flush()
+    messages = {
+        str(message_uuid): message_id
+        for message_uuid, message_id in Message.objects.filter(
+            session_id=session_id, uuid__in=list(deltas)).values_list('uuid', 'id')
+    }
+    if not messages:
+        return {}
+
+    with transaction.atomic():
+        for message_uuid, counts in deltas.items():
+            message_id = messages.get(message_uuid)
+            if message_id is None:
+                continue
+            for emoji, delta in counts.items():
+                updated = MessageReaction.objects.filter(message_id=message_id, emoji=emoji).update(
+                    count=F('count') + delta)
+                if not updated:
+                    MessageReaction.objects.create(message_id=message_id, emoji=emoji, count=delta)
+
+    totals = {}
+    for message_uuid, emoji, count in MessageReaction.objects.filter(
+            message_id__in=messages.values()).values_list('message__uuid', 'emoji', 'count'):
+        totals.setdefault(str(message_uuid), {})[emoji] = count
+    return totals
+
+
+async def flush_reactions(room_id):
+    """Persist a room's pending reactions and publish one aggregated frame."""
+    deltas = reaction_accumulator.drain(room_id)
+    if not deltas:
+        return
+    try:
+        with DB_CALL_SECONDS.time(call='apply_reaction_deltas'):
+            totals = await database_sync_to_async(apply_reaction_deltas)(room_id, deltas)
+    except Exception:
+        logger.exception(f"Failed to persist reactions for debate {room_id}, will retry")
+        reaction_accumulator.restore(room_id, deltas)
+        reaction_ticker.mark(room_id)
+        return
+    logger.info(f"Flushed {sum(sum(c.values()) for c in deltas.values())} reactions for debate {room_id}")
+    if totals:
+        payload = {'type': 'reaction_counts', 'reactions': totals}
+        relay(room_id, payload)
+        await publish(get_channel_layer(), room_id, payload, replay=True)
+
+
+reaction_ticker = RoomTicker(debate_setting('REACTION_TICK'), flush_reactions)
+
+
+def flush_all_reactions():
+    """Write every room's pending reactions; used at process exit."""
+    for room_id in reaction_accumulator.rooms():
+        apply_reaction_deltas(room_id, reaction_accumulator.drain(room_id))
+
+
+atexit.register(flush_all_reactions)
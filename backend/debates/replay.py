@@ -0,0 +1,84 @@
+import threading
+import uuid
+from collections import deque
+
+from .conf import debate_setting
+
+
+class RoomLog:
+    """
+    Recent replayable frames per room, stamped with a monotonic sequence number.
+
+    Frames are stamped by the first local consumer that handles them rather
+    than by the publisher, so every worker process numbers all of a room's
+    frames in its own delivery order, whichever process published them. Each
+    room keeps the last ``size`` stamped frames in a ring buffer so a client
+    that reconnects with ``last_seq`` can be sent exactly what it missed.
+    Sequence numbers restart with the process; the ``epoch`` token tells
+    clients which numbering their ``last_seq`` belongs to.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.epoch = uuid.uuid4().hex[:12]
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def stamp(self, room_id, frame_id, text):
+        """
+        Return the stamped copy of an encoded frame, stamping and storing it with
+        the room's next ``seq`` the first time ``frame_id`` is seen.
+        """
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                room = self._rooms[str(room_id)] = {'seq': 0, 'frames': deque(), 'stamped': {}}
+            stamped = room['stamped'].get(frame_id)
+            if stamped is not None:
+                return stamped
+            room['seq'] += 1
+            # ``text`` is a JSON object, so the seq can be spliced in without re-encoding
+            stamped = f'{text[:-1]}, "seq": {room["seq"]}}}'
+            room['frames'].append((room['seq'], frame_id, stamped))
+            room['stamped'][frame_id] = stamped
+            if len(room['frames']) > self.size:
+                _, evicted, _ = room['frames'].popleft()
+                del room['stamped'][evicted]
+            return stamped
+
+    def last_seq(self, room_id):
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            return room['seq'] if room else 0
+
+    def since(self, room_id, epoch, last_seq):
+        """
+        Encoded frames published after ``last_seq``, oldest first, or None if
+        they can't all be replayed: the epoch is stale, the sequence is ahead
+        of ours or invalid, or the gap has already fallen out of the ring.
+        """
+        if epoch != self.epoch:
+            return None
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            current = room['seq'] if room else 0
+            if last_seq > current:
+                return None
+            if last_seq == current:
+                return []
+            if room is None or last_seq < 0:
+                return None
+            frames = room['frames']
+            if frames[0][0] > last_seq + 1:
+                return None
+            return [text for seq, _, text in frames if seq > last_seq]
+
+    def clear(self, room_id=None):
+        with self._lock:
+            if room_id is None:
+                self._rooms.clear()
+            else:
+                self._rooms.pop(str(room_id), None)
+
+
+room_log = RoomLog(debate_setting('REPLAY_BUFFER_SIZE'))
@@ -4,4 +4,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'^ws/debates/(?P<debate_id>\d+)/$', consumers.DebateConsumer.as_asgi()),
+    re_path(r'^ws/debates/(?P<debate_id>\d+)/watch/$', consumers.SpectatorConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,101 @@
+import operator
+import re
+from abc import ABC, abstractmethod
+from functools import reduce
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.utils.module_loading import import_string
+
+from .conf import debate_setting
+from .models import DebateTopic, Message
+
+# Text fields searched per model. The SQLite index over them is created by
+# migration 0006_search_index and kept in sync by triggers on every write.
+SEARCH_FIELDS = {
+    Message: ('content',),
+    DebateTopic: ('title', 'description'),
+}
+
+# "a quoted phrase", or a word with an optional * for prefix matching
+TERM = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+
+
+def parse_terms(text):
+    """
+    ``[(words, prefix)]`` for a user's search text: each term is a tuple of
+    words that must appear together, and ``prefix`` marks a trailing ``*``.
+    Anything but words, quotes and ``*`` is ignored.
+    """
+    terms = []
+    for phrase, word, star in TERM.findall(text):
+        words = tuple(re.findall(r'\w+', phrase)) if phrase else (word,)
+        if words:
+            terms.append((words, bool(star)))
+    return terms
+
+
+class SearchBackend(ABC):
+    """
+    Full-text search over the models in ``SEARCH_FIELDS``. Select one with
+    the ``SEARCH_BACKEND`` setting.
+    """
+
+    @abstractmethod
+    def search(self, queryset, text):
+        """
+        ``queryset`` narrowed to rows matching every term of ``text``, with a
+        ``score`` (higher is more relevant) and ordered by it.
+        """
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """
+    SQLite FTS5. Each model has an external-content ``<table>_fts`` index
+    ranked with BM25; matching and ranking never scan the base table.
+    """
+
+    def match_expression(self, terms):
+        # Words only ever contain \w characters, so they can be quoted as is
+        return ' '.join('"{}"{}'.format(' '.join(words), '*' if prefix else '') for words, prefix in terms)
+
+    def search(self, queryset, text):
+        terms = parse_terms(text)
+        if not terms:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        index = f'{table}_fts'
+        return queryset.extra(
+            select={'score': f'-bm25("{index}")'},
+            tables=[index],
+            where=[f'"{index}".rowid = "{table}"."id"', f'"{index}" MATCH %s'],
+            params=[self.match_expression(terms)],
+        ).order_by('-score', '-pk')
+
+
+class BasicSearchBackend(SearchBackend):
+    """
+    Portable fallback for databases without a search index here: every term
+    must appear in one of the fields, case-insensitively. Scans the table and
+    does not rank, so results come newest first with a score of 0.
+    """
+
+    def search(self, queryset, text):
+        terms = parse_terms(text)
+        if not terms:
+            return queryset.none()
+        fields = SEARCH_FIELDS[queryset.model]
+        for words, prefix in terms:
+            phrase = ' '.join(words)
+            queryset = queryset.filter(reduce(operator.or_, (Q(**{f'{field}__icontains': phrase}) for field in fields)))
+        return queryset.annotate(score=Value(0.0, output_field=FloatField())).order_by('-pk')
+
+
+def search_backend():
+    """The configured backend, or FTS5 on SQLite and the basic backend elsewhere."""
+    path = debate_setting('SEARCH_BACKEND')
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    return BasicSearchBackend()
@@ -1,19 +1,98 @@
 from rest_framework import serializers
+from .history import reaction_totals
 from .models import DebateTopic, DebateSession, Message, Participation
 from users.serializers import UserSerializer
 
+# Columns read for compact and fast-path responses, with author details
+# joined in as author__ columns
+COMPACT_MESSAGE_FIELDS = ('id', 'uuid', 'session_id', 'author_id', 'content', 'timestamp')
+COMPACT_USER_FIELDS = ('id', 'username', 'email', 'role')
+MESSAGE_VALUES = COMPACT_MESSAGE_FIELDS + tuple(f'author__{name}' for name in COMPACT_USER_FIELDS[1:])
+
 class MessageSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
+    reactions = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
-        fields = ['id', 'session', 'author', 'content', 'timestamp']
+        fields = ['id', 'uuid', 'session', 'author', 'content', 'timestamp', 'reactions']
+
+    def get_reactions(self, obj):
+        # Uses the prefetched reactions when the queryset provides them
+        return {reaction.emoji: reaction.count for reaction in obj.reactions.all()}
+
+_datetime_field = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    """A datetime as a DateTimeField renders it, honouring DATETIME_FORMAT."""
+    return _datetime_field.to_representation(value)
+
+
+def related_row(row, name, fields):
+    """A nested object from the ``name__``-prefixed columns of a ``values()`` row."""
+    if row[f'{name}__id'] is None:
+        return None
+    return {field: row[f'{name}__{field}'] for field in fields}
+
+
+def wants_compact(request):
+    return request is not None and request.query_params.get('compact', '').lower() in ('1', 'true', 'yes')
+
+
+def compact_user(row, prefix=''):
+    """A ``users`` map entry from a ``values()`` row, in UserSerializer's fields."""
+    return {name: row[prefix + name] for name in COMPACT_USER_FIELDS[1:]}
+
+
+def message_row(row, reactions, author_key, author):
+    return {
+        'id': row['id'],
+        'uuid': str(row['uuid']),
+        'session': row['session_id'],
+        author_key: author,
+        'content': row['content'],
+        'timestamp': format_datetime(row['timestamp']),
+        'reactions': reactions.get(row['id'], {}),
+    }
+
+
+def compact_messages(rows):
+    """
+    Messages in the compact format, from ``values()`` rows of
+    ``MESSAGE_VALUES``. Returns ``(messages, users)``: each message carries
+    only ``author_id``, and every author appears once in ``users``, keyed by id.
+    """
+    reactions = reaction_totals([row['id'] for row in rows])
+    users = {}
+    messages = []
+    for row in rows:
+        if row['author_id'] not in users:
+            users[row['author_id']] = compact_user(row, 'author__')
+        messages.append(message_row(row, reactions, 'author_id', row['author_id']))
+    return messages, users
+
+
+def message_rows(rows):
+    """MessageSerializer's representation of ``values()`` rows of ``MESSAGE_VALUES``."""
+    reactions = reaction_totals([row['id'] for row in rows])
+    return [message_row(row, reactions, 'author', {'id': row['author_id'], **compact_user(row, 'author__')})
+            for row in rows]
+
 
 class DebateTopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = DebateTopic
         fields = ['id', 'title', 'description', 'created_at']
 
+TOPIC_VALUES = ('id', 'title', 'description', 'created_at')
+
+
+def topic_rows(rows):
+    """DebateTopicSerializer's representation of ``values()`` rows of ``TOPIC_VALUES``."""
+    return [dict(row, created_at=format_datetime(row['created_at'])) for row in rows]
+
+
 class ParticipationSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
@@ -21,13 +100,94 @@ class ParticipationSerializer(serializers.ModelSerializer):
         model = Participation
         fields = ['user', 'is_muted']
 
-class DebateSessionSerializer(serializers.ModelSerializer):
+def request_list_param(request, name):
+    """Comma-separated query parameter of a request, as a set."""
+    if request is None:
+        return set()
+    return {value for value in request.query_params.get(name, '').split(',') if value}
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients shape the representation: ``?fields=id,topic`` keeps only the
+    listed fields, and ``?expand=participants`` adds nested collections named
+    in ``Meta.expandable_fields``, which are left out by default.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in request_list_param(self.context.get('request'), 'expand') & set(expandable):
+            field_class, field_kwargs = expandable[name]
+            self.fields[name] = field_class(**field_kwargs)
+        only = request_list_param(self.context.get('request'), 'fields')
+        if only:
+            for name in set(self.fields) - only:
+                if not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+
+class DebateSessionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    A session with its counts. Participants are expandable; messages are only
+    served, paginated, by the message list.
+    """
     topic = DebateTopicSerializer(read_only=True)
     topic_id = serializers.IntegerField(write_only=True)
     moderator = UserSerializer(read_only=True)
-    participants = ParticipationSerializer(source='participation_set', many=True, read_only=True)
-    messages = MessageSerializer(many=True, read_only=True)
+    participant_count = serializers.SerializerMethodField()
+    message_count = serializers.SerializerMethodField()
 
     class Meta:
         model = DebateSession
-        fields = ['id', 'topic', 'topic_id', 'moderator', 'start_time', 'end_time', 'participants', 'messages']
\ No newline at end of file
+        fields = ['id', 'topic', 'topic_id', 'moderator', 'start_time', 'end_time', 'participant_count', 'message_count']
+        expandable_fields = {
+            'participants': (ParticipationSerializer, {'source': 'participation_set', 'many': True, 'read_only': True}),
+        }
+
+    def get_participant_count(self, obj):
+        # Annotated by DebateSessionViewSet; counted here for freshly created sessions
+        count = getattr(obj, 'participant_count', None)
+        return obj.participation_set.count() if count is None else count
+
+    def get_message_count(self, obj):
+        count = getattr(obj, 'message_count', None)
+        return obj.messages.count() if count is None else count
+
+
+class DebateSessionDetailSerializer(DebateSessionSerializer):
+    """A single session, with its participants included."""
+
+    participants = ParticipationSerializer(source='participation_set', many=True, read_only=True)
+
+    class Meta(DebateSessionSerializer.Meta):
+        fields = DebateSessionSerializer.Meta.fields + ['participants']
+        expandable_fields = {}
+
+
+SESSION_VALUES = (
+    'id', 'start_time', 'end_time', 'participant_count', 'message_count',
+    *(f'topic__{name}' for name in TOPIC_VALUES), *(f'moderator__{name}' for name in COMPACT_USER_FIELDS),
+)
+
+
+def session_rows(rows):
+    """
+    DebateSessionSerializer's representation of ``values()`` rows of
+    ``SESSION_VALUES`` (with the counts annotated), without expanded fields.
+    """
+    sessions = []
+    for row in rows:
+        topic = related_row(row, 'topic', TOPIC_VALUES)
+        topic['created_at'] = format_datetime(topic['created_at'])
+        session = {
+            'id': row['id'],
+            'topic': topic,
+            'moderator': related_row(row, 'moderator', COMPACT_USER_FIELDS),
+            'start_time': format_datetime(row['start_time']),
+            'end_time': format_datetime(row['end_time']),
+            'participant_count': row['participant_count'],
+            'message_count': row['message_count'],
+        }
+        sessions.append(session)
+    return sessions
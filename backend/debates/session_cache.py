@@ -0,0 +1,34 @@
+import logging
+
+from channels.db import database_sync_to_async
+
+from core.metrics import DB_CALL_SECONDS
+from core.ttlcache import TTLCache
+from .conf import debate_setting
+from .models import DebateSession
+
+logger = logging.getLogger(__name__)
+
+# Debate sessions looked up on WebSocket connect, keyed by id as a string.
+# Invalidated by the model signals in debates/signals.py.
+session_cache = TTLCache(
+    maxsize=debate_setting('SESSION_CACHE_SIZE'),
+    ttl=debate_setting('SESSION_CACHE_TTL'),
+)
+
+
+def fetch_debate_session(debate_id):
+    return DebateSession.objects.select_related('topic', 'moderator').filter(id=debate_id).first()
+
+
+async def get_debate_session(debate_id):
+    """Return the DebateSession for ``debate_id`` (topic and moderator loaded), or None."""
+    session = session_cache.get(str(debate_id))
+    if session is None:
+        with DB_CALL_SECONDS.time(call='fetch_debate_session'):
+            session = await database_sync_to_async(fetch_debate_session)(debate_id)
+        if session is None:
+            logger.error(f"Debate session {debate_id} does not exist")
+            return None
+        session_cache.set(str(debate_id), session)
+    return session
@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .moderation import muted_users
+from .models import DebateSession, DebateTopic, Message, Participation
+from .session_cache import session_cache
+from .versions import TOPICS, bump, moderation_key, session_key
+
+
+@receiver(post_save, sender=DebateSession)
+@receiver(post_delete, sender=DebateSession)
+def invalidate_cached_session(sender, instance, **kwargs):
+    session_cache.pop(str(instance.pk))
+
+
+@receiver(post_save, sender=DebateTopic)
+@receiver(post_delete, sender=DebateTopic)
+def invalidate_sessions_for_topic(sender, instance, **kwargs):
+    # Cached sessions embed their topic; topic edits are rare, so start over
+    session_cache.clear()
+
+
+@receiver(post_save, sender=Participation)
+def update_muted_users(sender, instance, **kwargs):
+    muted_users.apply(instance.session_id, instance.user_id, 'muted' if instance.is_muted else 'unmuted')
+
+
+@receiver(post_delete, sender=Participation)
+def unmute_removed_participant(sender, instance, **kwargs):
+    muted_users.apply(instance.session_id, instance.user_id, 'removed')
+
+
+# Versions behind conditional GETs. Deletes bump too, so a reused id never
+# repeats an old ETag. Buffered WebSocket messages are bulk-created without
+# signals; MessageWriteBuffer.flush bumps their sessions itself.
+
+@receiver(post_save, sender=DebateSession)
+@receiver(post_delete, sender=DebateSession)
+def bump_session_version(sender, instance, **kwargs):
+    bump(session_key(instance.pk))
+
+
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def bump_parent_session_version(sender, instance, **kwargs):
+    bump(session_key(instance.session_id))
+
+
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+def bump_moderation_version(sender, instance, **kwargs):
+    bump(moderation_key(instance.session_id))
+
+
+@receiver(post_save, sender=DebateTopic)
+@receiver(post_delete, sender=DebateTopic)
+def bump_topics_version(sender, instance, **kwargs):
+    bump(TOPICS)
@@ -0,0 +1,112 @@
+import threading
+from collections import Counter
+
+from channels.layers import get_channel_layer
+
+from .broadcast import encode_frame, frame_event, spectator_group_name
+from .coalesce import RoomTicker
+from .conf import debate_setting
+from .presence import presence
+
+
+class SpectatorFeed:
+    """
+    The condensed stream spectators of each room get, collected between ticks.
+
+    Only chat messages and reaction totals are kept; presence and typing are
+    left out and reduced to member and spectator counts. Spectators are only
+    counted, never listed, so their joins and leaves cost a counter update.
+    """
+
+    def __init__(self):
+        self._messages = {}
+        self._reactions = {}
+        self._spectators = Counter()
+        # Counts in the last batch sent to each room
+        self._sent_counts = {}
+        self._lock = threading.Lock()
+
+    def add_message(self, room_id, payload):
+        with self._lock:
+            self._messages.setdefault(str(room_id), []).append(payload)
+
+    def add_reactions(self, room_id, totals):
+        with self._lock:
+            self._reactions.setdefault(str(room_id), {}).update(totals)
+
+    def drain(self, room_id):
+        """Remove and return ``(messages, reactions)`` collected for a room."""
+        with self._lock:
+            return self._messages.pop(str(room_id), []), self._reactions.pop(str(room_id), {})
+
+    def join(self, room_id):
+        with self._lock:
+            self._spectators[str(room_id)] += 1
+            return self._spectators[str(room_id)]
+
+    def leave(self, room_id):
+        with self._lock:
+            self._spectators[str(room_id)] -= 1
+            if self._spectators[str(room_id)] <= 0:
+                del self._spectators[str(room_id)]
+            return self._spectators[str(room_id)]
+
+    def count(self, room_id):
+        with self._lock:
+            return self._spectators[str(room_id)]
+
+    def counts(self):
+        with self._lock:
+            return dict(self._spectators)
+
+    def counts_changed(self, room_id, counts):
+        """Record the counts about to be sent; returns False if they were sent last time."""
+        with self._lock:
+            if self._sent_counts.get(str(room_id)) == counts:
+                return False
+            if any(counts.values()):
+                self._sent_counts[str(room_id)] = counts
+            else:
+                self._sent_counts.pop(str(room_id), None)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._sent_counts.clear()
+            self._messages.clear()
+            self._reactions.clear()
+            self._spectators.clear()
+
+
+spectator_feed = SpectatorFeed()
+
+
+def room_counts(room_id):
+    return {'participants': presence.count(room_id), 'spectators': spectator_feed.count(room_id)}
+
+
+def relay(room_id, payload):
+    """Pass a frame published to a room's members on to its spectators' next batch."""
+    kind = payload.get('type')
+    if kind == 'message':
+        spectator_feed.add_message(room_id, payload)
+    elif kind == 'reaction_counts':
+        spectator_feed.add_reactions(room_id, payload['reactions'])
+    elif kind not in ('user_joined', 'user_left'):
+        return
+    spectator_ticker.mark(room_id)
+
+
+async def emit_spectator_batch(room_id):
+    """Publish everything collected for a room's spectators as one ``batch`` frame."""
+    messages, reactions = spectator_feed.drain(room_id)
+    counts = room_counts(room_id)
+    if not spectator_feed.counts_changed(room_id, counts) and not messages and not reactions:
+        return
+    await get_channel_layer().group_send(
+        spectator_group_name(room_id),
+        frame_event(encode_frame({'type': 'batch', 'messages': messages, 'reactions': reactions, **counts})),
+    )
+
+
+spectator_ticker = RoomTicker(debate_setting('SPECTATOR_TICK'), emit_spectator_batch)
@@ -0,0 +1,451 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from onlineDebatePlatform.asgi import application
+from users.middleware import user_cache
+from users.models import User
+from ..conf import debate_setting
+from ..moderation import REMOVED_CLOSE_CODE, MuteRegistry, moderation_ticker, muted_users
+from ..models import DebateTopic, DebateSession, Message, Participation
+from ..persistence import message_buffer
+from ..presence import presence
+from ..ratelimit import room_buckets
+from ..reactions import reaction_ticker
+from ..replay import room_log
+from ..session_cache import session_cache
+from ..spectators import spectator_feed, spectator_ticker
+from ..typing_state import typing_ticker, typing_tracker
+
+
+class ConsumerTestCase(TransactionTestCase):
+    """Connects real DebateConsumer instances through the project routing."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        topic = DebateTopic.objects.create(title="Sample Topic", description="Sample")
+        self.session = DebateSession.objects.create(topic=topic, moderator=self.alice)
+        presence.clear()
+        room_log.clear()
+        room_buckets.clear()
+        user_cache.clear()
+        session_cache.clear()
+        muted_users.clear()
+        spectator_feed.clear()
+
+    def tearDown(self):
+        # Write anything still buffered while the test database exists
+        message_buffer.flush()
+        presence.clear()
+
+    async def connect(self, user, query=''):
+        communicator = WebsocketCommunicator(
+            application,
+            f"/ws/debates/{self.session.id}/?token={AccessToken.for_user(user)}{query}",
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+
+class ConnectTest(ConsumerTestCase):
+
+    async def attempt(self, path):
+        communicator = WebsocketCommunicator(application, path)
+        connected, code = await communicator.connect()
+        return connected, code
+
+    async def test_rejects_missing_and_invalid_tokens(self):
+        self.assertEqual(await self.attempt(f"/ws/debates/{self.session.id}/"), (False, 4001))
+        self.assertEqual(await self.attempt(f"/ws/debates/{self.session.id}/?token=invalid"), (False, 4002))
+
+    async def test_rejects_unknown_session(self):
+        token = AccessToken.for_user(self.alice)
+        self.assertEqual(await self.attempt(f"/ws/debates/999/?token={token}"), (False, 4003))
+
+    async def connect_and_leave(self):
+        communicator = await self.connect(self.alice)
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+
+    def test_warm_reconnect_hits_no_database(self):
+        async_to_sync(self.connect_and_leave)()
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(self.connect_and_leave)()
+        self.assertEqual(len(queries), 0)
+
+    def test_user_changes_invalidate_cache(self):
+        async_to_sync(self.connect_and_leave)()
+        self.assertIsNotNone(user_cache.get(str(self.alice.id)))
+        self.alice.is_active = False
+        self.alice.save()
+        self.assertIsNone(user_cache.get(str(self.alice.id)))
+
+
+class PresenceDeltaTest(ConsumerTestCase):
+
+    async def test_join_and_leave_send_versioned_deltas(self):
+        alice = await self.connect(self.alice)
+        established = await alice.receive_json_from()
+        self.assertEqual(established['type'], 'connection_established')
+        self.assertEqual(established['presence_version'], 1)
+        self.assertEqual(await alice.receive_json_from(), {
+            'type': 'user_joined', 'user_id': self.alice.id, 'username': 'alice',
+            'presence_version': 1, 'count': 1,
+        })
+
+        bob = await self.connect(self.bob)
+        established = await bob.receive_json_from()
+        self.assertEqual({p['username'] for p in established['participants']}, {'alice', 'bob'})
+        self.assertEqual(established['presence_version'], 2)
+
+        joined = await alice.receive_json_from()
+        self.assertEqual(joined['type'], 'user_joined')
+        self.assertEqual(joined['presence_version'], 2)
+        self.assertNotIn('participants', joined)
+
+        await bob.disconnect()
+        left = await alice.receive_json_from()
+        self.assertEqual((left['type'], left['presence_version'], left['count']), ('user_left', 3, 1))
+        self.assertTrue(await alice.receive_nothing())
+        await alice.disconnect()
+
+    async def test_second_tab_does_not_broadcast(self):
+        first = await self.connect(self.alice)
+        await first.receive_json_from()
+        await first.receive_json_from()
+
+        second = await self.connect(self.alice)
+        established = await second.receive_json_from()
+        self.assertEqual(established['presence_version'], 1)
+        self.assertTrue(await first.receive_nothing())
+
+        await second.disconnect()
+        self.assertTrue(await first.receive_nothing())
+        await first.disconnect()
+
+    async def test_snapshot_on_request(self):
+        alice = await self.connect(self.alice)
+        await alice.receive_json_from()
+        await alice.receive_json_from()
+
+        await alice.send_json_to({'type': 'get_participants'})
+        snapshot = await alice.receive_json_from()
+        self.assertEqual(snapshot['type'], 'participant_list')
+        self.assertEqual(snapshot['presence_version'], 1)
+        self.assertEqual(snapshot['participants'], [{'id': self.alice.id, 'username': 'alice', 'is_online': True}])
+        await alice.disconnect()
+
+
+class BroadcastTest(ConsumerTestCase):
+
+    async def connect_both(self):
+        alice = await self.connect(self.alice)
+        await alice.receive_json_from()
+        await alice.receive_json_from()
+        bob = await self.connect(self.bob)
+        await bob.receive_json_from()
+        await bob.receive_json_from()
+        await alice.receive_json_from()
+        return alice, bob
+
+    async def test_message_reaches_everyone(self):
+        alice, bob = await self.connect_both()
+        await alice.send_json_to({'type': 'message', 'message': 'Hello'})
+        for communicator in (alice, bob):
+            frame = await communicator.receive_json_from()
+            self.assertEqual((frame['type'], frame['message'], frame['username']), ('message', 'Hello', 'alice'))
+            self.assertTrue(frame['message_id'])
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+    @override_settings(DEBATES={'RATE_LIMITS': {'message': '2/min'}})
+    async def test_message_flood_is_rejected_before_fan_out(self):
+        alice, bob = await self.connect_both()
+        for text in ('one', 'two', 'three'):
+            await alice.send_json_to({'type': 'message', 'message': text})
+        self.assertEqual([(await bob.receive_json_from())['message'] for _ in range(2)], ['one', 'two'])
+        self.assertTrue(await bob.receive_nothing(0.2))
+
+        frames = [await alice.receive_json_from() for _ in range(3)]
+        error = frames[-1]
+        self.assertEqual((error['type'], error['code'], error['event']), ('error', 'rate_limited', 'message'))
+        self.assertGreater(error['retry_after'], 0)
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+class TypingTest(BroadcastTest):
+
+    def setUp(self):
+        super().setUp()
+        typing_ticker.interval = 0.05
+        typing_tracker.ttl = 6.0
+
+    def tearDown(self):
+        super().tearDown()
+        typing_ticker.interval = debate_setting('TYPING_TICK')
+        typing_tracker.ttl = debate_setting('TYPING_TTL')
+
+    async def test_typing_is_coalesced_per_tick(self):
+        alice, bob = await self.connect_both()
+        for _ in range(5):
+            await alice.send_json_to({'type': 'typing_start'})
+        await bob.send_json_to({'type': 'typing_start'})
+
+        frame = await bob.receive_json_from()
+        self.assertEqual(frame['type'], 'typing_status')
+        self.assertEqual([u['username'] for u in frame['typing_users']], ['alice'])
+        # Alice sees the same frame without herself in it
+        frame = await alice.receive_json_from()
+        self.assertEqual([u['username'] for u in frame['typing_users']], ['bob'])
+        self.assertTrue(await bob.receive_nothing(0.2))
+
+        await alice.send_json_to({'type': 'typing_stop'})
+        frame = await bob.receive_json_from()
+        self.assertEqual(frame['typing_users'], [])
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_typing_expires_without_stop(self):
+        typing_tracker.ttl = 0.2
+        alice, bob = await self.connect_both()
+        await alice.send_json_to({'type': 'typing_start'})
+        frame = await bob.receive_json_from()
+        self.assertEqual(len(frame['typing_users']), 1)
+        frame = await bob.receive_json_from(timeout=2)
+        self.assertEqual(frame['typing_users'], [])
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+class ReactionFrameTest(BroadcastTest):
+
+    def setUp(self):
+        super().setUp()
+        reaction_ticker.interval = 0.05
+
+    def tearDown(self):
+        super().tearDown()
+        reaction_ticker.interval = debate_setting('REACTION_TICK')
+
+    async def test_reactions_are_aggregated(self):
+        alice, bob = await self.connect_both()
+        await alice.send_json_to({'type': 'message', 'message': 'Hello'})
+        message_id = (await alice.receive_json_from())['message_id']
+        await bob.receive_json_from()
+
+        for _ in range(10):
+            await bob.send_json_to({'type': 'reaction', 'message_id': message_id, 'emoji': '👍'})
+        await alice.send_json_to({'type': 'reaction', 'message_id': message_id, 'emoji': '🔥'})
+
+        frame = await alice.receive_json_from(timeout=2)
+        self.assertEqual(frame, {'type': 'reaction_counts', 'reactions': {message_id: {'👍': 10, '🔥': 1}}, 'seq': 2})
+        self.assertEqual(await bob.receive_json_from(timeout=2), frame)
+        self.assertTrue(await alice.receive_nothing(0.2))
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+class ReplayTest(BroadcastTest):
+
+    async def send_messages(self, communicator, *texts):
+        for text in texts:
+            await communicator.send_json_to({'type': 'message', 'message': text})
+            await communicator.receive_json_from()
+
+    async def reconnect(self, user, query):
+        communicator = await self.connect(user, query)
+        welcome = await communicator.receive_json_from()
+        self.assertEqual(welcome['type'], 'connection_established')
+        return communicator, welcome
+
+    async def test_reconnect_replays_missed_frames(self):
+        alice = await self.connect(self.alice)
+        welcome = await alice.receive_json_from()
+        self.assertEqual(welcome['seq'], 0)
+        await alice.receive_json_from()  # alice joined
+        await self.send_messages(alice, 'one')
+
+        bob, _ = await self.reconnect(self.bob, f"&epoch={welcome['epoch']}&last_seq=0")
+        frame = await bob.receive_json_from()
+        self.assertEqual((frame['seq'], frame['message']), (1, 'one'))
+        self.assertEqual((await bob.receive_json_from())['type'], 'user_joined')
+        await bob.disconnect()
+
+        await alice.receive_json_from()  # bob joined
+        await alice.receive_json_from()  # bob left
+        await self.send_messages(alice, 'two', 'three')
+        bob, welcome = await self.reconnect(self.bob, f"&epoch={welcome['epoch']}&last_seq=1")
+        self.assertEqual(welcome['seq'], 3)
+        self.assertEqual([(await bob.receive_json_from())['message'] for _ in range(2)], ['two', 'three'])
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_stale_epoch_falls_back_to_history(self):
+        alice = await self.connect(self.alice)
+        await alice.receive_json_from()
+        await alice.receive_json_from()  # alice joined
+        await self.send_messages(alice, 'one', 'two', 'three')
+        await message_buffer.aflush()
+        first = await database_sync_to_async(Message.objects.get)(content='one')
+
+        bob, _ = await self.reconnect(self.bob, f"&epoch=stale&last_seq=7&last_message_id={first.uuid}")
+        frame = await bob.receive_json_from()
+        self.assertEqual(frame['type'], 'history')
+        self.assertEqual([m['message'] for m in frame['messages']], ['two', 'three'])
+        self.assertFalse(frame['has_more'])
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+    async def test_history_on_connect_and_paging(self):
+        alice = await self.connect(self.alice)
+        await alice.receive_json_from()
+        await alice.receive_json_from()  # alice joined
+        await self.send_messages(alice, 'one', 'two', 'three')
+
+        bob, _ = await self.reconnect(self.bob, '&history=2')
+        page = await bob.receive_json_from()
+        self.assertEqual(page['type'], 'history')
+        self.assertEqual([m['message'] for m in page['messages']], ['two', 'three'])
+        self.assertEqual({m['user_id'] for m in page['messages']}, {self.alice.id})
+        self.assertEqual(page['users'], {str(self.alice.id): 'alice'})
+        self.assertTrue(page['has_more'])
+        self.assertEqual((await bob.receive_json_from())['type'], 'user_joined')
+
+        await bob.send_json_to({'type': 'get_history', 'before': page['cursor'], 'limit': 5})
+        older = await bob.receive_json_from()
+        self.assertEqual([m['message'] for m in older['messages']], ['one'])
+        self.assertFalse(older['has_more'])
+
+        await bob.send_json_to({'type': 'get_history', 'before': 'garbage'})
+        self.assertEqual(await bob.receive_json_from(), {'type': 'error', 'code': 'invalid_cursor', 'event': 'get_history'})
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+class ModerationTest(ConsumerTestCase):
+
+    def moderate(self, action, user):
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        response = client.post(reverse(f'session-{action}', args=[self.session.id]), {'user_id': user.id})
+        self.assertEqual(response.status_code, 200)
+
+    async def join_room(self):
+        alice = await self.connect(self.alice)
+        await alice.receive_json_from()
+        await alice.receive_json_from()  # alice joined
+        bob = await self.connect(self.bob)
+        await bob.receive_json_from()
+        await bob.receive_json_from()  # bob joined
+        await alice.receive_json_from()  # bob joined
+        return alice, bob
+
+    async def test_mute_is_loaded_on_join_and_enforced(self):
+        await database_sync_to_async(Participation.objects.create)(user=self.bob, session=self.session, is_muted=True)
+        alice, bob = await self.join_room()
+
+        await bob.send_json_to({'type': 'message', 'message': 'hello'})
+        self.assertEqual(await bob.receive_json_from(), {'type': 'error', 'code': 'muted', 'event': 'message'})
+        self.assertTrue(await alice.receive_nothing(0.2))
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_moderator_actions_reach_the_socket(self):
+        alice, bob = await self.join_room()
+
+        await database_sync_to_async(self.moderate)('mute-participant', self.bob)
+        self.assertEqual(await bob.receive_json_from(), {'type': 'moderation', 'action': 'muted'})
+        await bob.send_json_to({'type': 'message', 'message': 'hello'})
+        self.assertEqual((await bob.receive_json_from())['code'], 'muted')
+
+        await database_sync_to_async(self.moderate)('unmute-participant', self.bob)
+        self.assertEqual(await bob.receive_json_from(), {'type': 'moderation', 'action': 'unmuted'})
+        await bob.send_json_to({'type': 'message', 'message': 'hello'})
+        self.assertEqual((await bob.receive_json_from())['message'], 'hello')
+
+        await database_sync_to_async(self.moderate)('remove-participant', self.bob)
+        self.assertEqual(await bob.receive_json_from(), {'type': 'moderation', 'action': 'removed'})
+        self.assertEqual(await bob.receive_output(), {'type': 'websocket.close', 'code': REMOVED_CLOSE_CODE})
+        await alice.disconnect()
+
+    def moderate_elsewhere(self, action, user):
+        # Like the REST server under startapi: its own channel layer and registry
+        with mock.patch('debates.moderation.get_channel_layer', return_value=InMemoryChannelLayer()), \
+                mock.patch('debates.signals.muted_users', MuteRegistry()):
+            self.moderate(action, user)
+
+    async def test_moderator_actions_from_another_process_reach_the_socket(self):
+        moderation_ticker.interval = 0.05
+        self.addCleanup(setattr, moderation_ticker, 'interval', debate_setting('MODERATION_CHECK_INTERVAL'))
+        alice, bob = await self.join_room()
+
+        await database_sync_to_async(self.moderate_elsewhere)('mute-participant', self.bob)
+        self.assertEqual(await bob.receive_json_from(), {'type': 'moderation', 'action': 'muted'})
+        await bob.send_json_to({'type': 'message', 'message': 'hello'})
+        self.assertEqual((await bob.receive_json_from())['code'], 'muted')
+
+        await database_sync_to_async(self.moderate_elsewhere)('remove-participant', self.bob)
+        self.assertEqual(await bob.receive_json_from(), {'type': 'moderation', 'action': 'removed'})
+        self.assertEqual(await bob.receive_output(), {'type': 'websocket.close', 'code': REMOVED_CLOSE_CODE})
+        self.assertTrue(await alice.receive_nothing(0.2))
+        await alice.disconnect()
+
+
+class SpectatorTest(ConsumerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        spectator_ticker.interval = 0.05
+
+    def tearDown(self):
+        spectator_ticker.interval = debate_setting('SPECTATOR_TICK')
+        super().tearDown()
+
+    async def watch(self, user):
+        communicator = WebsocketCommunicator(
+            application,
+            f"/ws/debates/{self.session.id}/watch/?token={AccessToken.for_user(user)}",
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_spectators_get_condensed_batches(self):
+        alice = await self.connect(self.alice)
+        await alice.receive_json_from()
+        await alice.receive_json_from()  # alice joined
+
+        bob = await self.watch(self.bob)
+        self.assertEqual(await bob.receive_json_from(), {'type': 'spectating', 'participants': 1, 'spectators': 1})
+        self.assertEqual(await bob.receive_json_from(), {
+            'type': 'batch', 'messages': [], 'reactions': {}, 'participants': 1, 'spectators': 1})
+        # Spectators are not room members
+        self.assertTrue(await alice.receive_nothing(0.1))
+        self.assertEqual(presence.count(self.session.id), 1)
+
+        await alice.send_json_to({'type': 'typing_start'})
+        await alice.send_json_to({'type': 'message', 'message': 'one'})
+        await alice.send_json_to({'type': 'message', 'message': 'two'})
+        batch = await bob.receive_json_from()
+        self.assertEqual(batch['type'], 'batch')
+        self.assertEqual([m['message'] for m in batch['messages']], ['one', 'two'])
+        self.assertTrue(await bob.receive_nothing(0.2))
+
+        await bob.send_json_to({'type': 'message', 'message': 'ignored'})
+        self.assertTrue(await bob.receive_nothing(0.2))
+        await alice.disconnect()
+        await bob.disconnect()
@@ -0,0 +1,34 @@
+from django.test import SimpleTestCase
+from ..moderation import MuteRegistry
+
+
+class MuteRegistryTest(SimpleTestCase):
+
+    def setUp(self):
+        self.registry = MuteRegistry()
+
+    def test_changes_apply_only_to_loaded_rooms(self):
+        self.registry.apply(1, 10, 'muted')
+        self.assertFalse(self.registry.loaded(1))
+        self.assertFalse(self.registry.is_muted(1, 10))
+
+        self.assertEqual(self.registry.load('1', 3, {10: True}), [])
+        self.assertTrue(self.registry.is_muted(1, 10))
+        self.registry.apply(1, 11, 'muted')
+        self.registry.apply(1, 10, 'unmuted')
+        self.assertFalse(self.registry.is_muted(1, 10))
+        self.assertTrue(self.registry.is_muted(1, 11))
+        self.registry.apply(1, 11, 'removed')
+        self.assertFalse(self.registry.is_muted(1, 11))
+
+    def test_reload_reports_what_changed(self):
+        self.registry.load(1, 3, {10: False, 11: True, 12: False})
+        changes = self.registry.load(1, 4, {10: True, 11: False, 13: True})
+        self.assertCountEqual(changes, [(10, 'muted'), (11, 'unmuted'), (12, 'removed'), (13, 'muted')])
+        self.assertEqual(self.registry.version(1), 4)
+
+    def test_rooms_expire(self):
+        registry = MuteRegistry(ttl=0)
+        registry.load(1, 3, {10: True})
+        self.assertFalse(registry.loaded(1))
+        self.assertFalse(registry.is_muted(1, 10))
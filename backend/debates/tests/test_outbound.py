@@ -0,0 +1,112 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from ..outbound import SLOW_CONSUMER_CLOSE_CODE, OutboundQueue, outbound_stats
+
+
+class StalledClient:
+    """Accepts frames only while ``flowing`` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.flowing = asyncio.Event()
+
+    async def send(self, text):
+        await self.flowing.wait()
+        self.sent.append(text)
+
+    async def close(self, code):
+        self.closed_with = code
+
+
+class OutboundQueueTest(SimpleTestCase):
+
+    def setUp(self):
+        outbound_stats.counters.clear()
+
+    def make_queue(self, maxsize=4, max_lag=60):
+        self.client = StalledClient()
+        return OutboundQueue(self.client.send, self.client.close, maxsize=maxsize, max_lag=max_lag)
+
+    async def flow(self, queue):
+        self.client.flowing.set()
+        while len(queue):
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    async def test_frames_are_sent_in_order(self):
+        queue = self.make_queue()
+        for text in ('a', 'b', 'c'):
+            self.assertTrue(await queue.put(text))
+        await self.flow(queue)
+        self.assertEqual(self.client.sent, ['a', 'b', 'c'])
+        self.assertEqual(outbound_stats.counters['sent'], 3)
+
+    async def test_typing_and_snapshots_are_coalesced(self):
+        queue = self.make_queue()
+        await queue.put('first', 'message')  # taken by the writer, stalled in send()
+        await asyncio.sleep(0)
+        await queue.put('typing-1', 'typing')
+        await queue.put('snapshot-1', 'snapshot')
+        await queue.put('typing-2', 'typing')
+        await queue.put('snapshot-2', 'snapshot')
+        self.assertEqual(len(queue), 2)
+        await self.flow(queue)
+        self.assertEqual(self.client.sent, ['first', 'typing-2', 'snapshot-2'])
+        self.assertEqual(outbound_stats.counters['coalesced'], 2)
+
+    async def test_full_queue_sheds_typing_then_presence(self):
+        queue = self.make_queue(maxsize=3)
+        await queue.put('joined', 'presence')
+        await queue.put('typing', 'typing')
+        await queue.put('m1')
+        await queue.put('m2')
+        await queue.put('m3')
+        self.assertEqual([outbound_stats.counters['dropped_typing'], outbound_stats.counters['dropped_presence']], [1, 1])
+        # Droppable frames arriving at a full queue are dropped themselves
+        self.assertFalse(await queue.put('left', 'presence'))
+        self.assertIsNone(self.client.closed_with)
+        await self.flow(queue)
+        self.assertEqual(self.client.sent, ['m1', 'm2', 'm3'])
+
+    async def test_queue_full_of_messages_disconnects(self):
+        queue = self.make_queue(maxsize=2)
+        for text in ('m1', 'm2', 'm3'):
+            await queue.put(text)
+        self.assertFalse(await queue.put('m4'))
+        self.assertEqual(self.client.closed_with, SLOW_CONSUMER_CLOSE_CODE)
+        self.assertTrue(queue.closed)
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(outbound_stats.counters['slow_disconnects'], 1)
+
+    async def test_lagging_client_is_disconnected(self):
+        queue = self.make_queue(max_lag=0.05)
+        await queue.put('m1')
+        await queue.put('m2')
+        await asyncio.sleep(0.1)
+        self.assertFalse(await queue.put('m3'))
+        self.assertEqual(self.client.closed_with, SLOW_CONSUMER_CLOSE_CODE)
+
+    async def test_writer_disconnects_a_lagging_client_without_new_frames(self):
+        queue = self.make_queue(max_lag=0.05)
+        await queue.put('m1')  # taken by the writer, stalled in send()
+        await queue.put('m2')
+        await asyncio.sleep(0.1)
+        self.client.flowing.set()
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.client.sent, ['m1'])
+        self.assertEqual(self.client.closed_with, SLOW_CONSUMER_CLOSE_CODE)
+        self.assertTrue(queue.closed)
+        self.assertEqual(len(queue), 0)
+
+    async def test_stats_report_live_depth(self):
+        queue = self.make_queue()
+        for text in ('m1', 'm2', 'm3'):
+            await queue.put(text)
+        await asyncio.sleep(0)
+        stats = outbound_stats.snapshot()
+        self.assertEqual((stats['queued'], stats['max_depth']), (2, 2))
+        queue.close()
+        self.assertEqual(outbound_stats.snapshot()['queued'], 0)
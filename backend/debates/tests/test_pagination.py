@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from ..models import DebateSession, DebateTopic, Message
+from ..pagination import decode_cursor, encode_cursor
+
+
+class MessagePaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice', password='testpass123')
+        topic = DebateTopic.objects.create(title='Topic', description='Topic')
+        cls.session = DebateSession.objects.create(topic=topic, moderator=cls.user)
+        start = timezone.now()
+        # Pairs of messages share a timestamp, so ties have to be broken on id
+        Message.objects.bulk_create([
+            Message(session=cls.session, author=cls.user, content=f'm{n}', timestamp=start + timedelta(seconds=n // 2))
+            for n in range(7)
+        ])
+        cls.start = start
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url=None, **params):
+        if url is None:
+            url = reverse('message-list')
+            params.setdefault('session_pk', self.session.id)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def contents(self, page):
+        return [message['content'] for message in page['results']]
+
+    def test_cursor_round_trip(self):
+        timestamp = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(timestamp, 42)), (timestamp, 42))
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor')
+
+    def test_pages_backward_from_the_newest(self):
+        page = self.get(limit=3)
+        self.assertEqual(self.contents(page), ['m4', 'm5', 'm6'])
+        page = self.get(page['previous'])
+        self.assertEqual(self.contents(page), ['m1', 'm2', 'm3'])
+        page = self.get(page['previous'])
+        self.assertEqual(self.contents(page), ['m0'])
+        self.assertIsNone(page['previous'])
+
+    def test_pages_forward_and_polls(self):
+        first = self.get(limit=3, since=(self.start - timedelta(seconds=1)).isoformat())
+        self.assertEqual(self.contents(first), ['m0', 'm1', 'm2'])
+        page = self.get(first['next'])
+        self.assertEqual(self.contents(page), ['m3', 'm4', 'm5'])
+        page = self.get(page['next'])
+        self.assertEqual(self.contents(page), ['m6'])
+
+        # Caught up: next keeps pointing at the same position until something arrives
+        empty = self.get(page['next'])
+        self.assertEqual(empty['results'], [])
+        Message.objects.create(session=self.session, author=self.user, content='m7', timestamp=self.start + timedelta(seconds=10))
+        self.assertEqual(self.contents(self.get(empty['next'])), ['m7'])
+
+    def test_rejects_bad_positions(self):
+        url = reverse('message-list')
+        for params in ({'after': 'garbage'}, {'since': 'yesterday'}, {'after': 'x', 'before': 'y'}):
+            response = self.client.get(url, {'session_pk': self.session.id, **params})
+            self.assertEqual(response.status_code, 400)
+
+    def test_page_is_an_index_range_scan(self):
+        queryset = Message.objects.filter(session=self.session).order_by('-timestamp', '-id')[:51]
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('message_session_keyset_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_compact_format_side_loads_authors(self):
+        bob = User.objects.create_user(username='bob', password='testpass123')
+        Message.objects.create(session=self.session, author=bob, content='m7', timestamp=self.start + timedelta(seconds=10))
+        full = self.get(limit=4)
+        with self.assertNumQueries(2):
+            compact = self.get(limit=4, compact='true')
+
+        self.assertEqual(compact['users'], {
+            self.user.id: {'username': 'alice', 'email': '', 'role': 'student'},
+            bob.id: {'username': 'bob', 'email': '', 'role': 'student'},
+        })
+        self.assertIn('compact=true', compact['previous'])
+        for message, expected in zip(compact['results'], full['results']):
+            author = expected.pop('author')
+            self.assertEqual(message.pop('author_id'), author['id'])
+            self.assertEqual(message, expected)
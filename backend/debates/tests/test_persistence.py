@@ -0,0 +1,69 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import IntegrityError
+from django.test import TransactionTestCase
+from users.models import User
+from ..models import DebateTopic, DebateSession, Message
+from ..persistence import MessageWriteBuffer
+
+
+class MessageWriteBufferTest(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='speaker', password='testpass123')
+        topic = DebateTopic.objects.create(title="Sample Topic", description="Sample")
+        self.session = DebateSession.objects.create(topic=topic, moderator=self.user)
+        self.buffer = MessageWriteBuffer(batch_size=3, flush_interval=0.05)
+
+    def test_append_does_not_write_until_flush(self):
+        message = self.buffer.append(self.session.id, self.user.id, "Hello")
+        self.assertIsNotNone(message.uuid)
+        self.assertEqual(Message.objects.count(), 0)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        saved = Message.objects.get()
+        self.assertEqual(saved.uuid, message.uuid)
+        self.assertEqual(saved.timestamp, message.timestamp)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_flush_keeps_append_order(self):
+        for i in range(5):
+            self.buffer.append(self.session.id, self.user.id, f"Message {i}")
+        self.buffer.flush()
+        self.assertEqual(
+            list(Message.objects.values_list('content', flat=True)),
+            [f"Message {i}" for i in range(5)],
+        )
+
+    def test_flush_drops_messages_for_deleted_sessions(self):
+        other = DebateSession.objects.create(topic=self.session.topic)
+        self.buffer.append(self.session.id, self.user.id, "Kept")
+        self.buffer.append(other.id, self.user.id, "Dropped")
+        other.delete()
+
+        self.buffer.flush()
+        self.assertEqual(list(Message.objects.values_list('content', flat=True)), ["Kept"])
+
+    def test_failed_retry_requeues_the_kept_messages(self):
+        other = DebateSession.objects.create(topic=self.session.topic)
+        self.buffer.append(self.session.id, self.user.id, "Kept")
+        self.buffer.append(other.id, self.user.id, "Dropped")
+        other.delete()
+
+        with mock.patch.object(Message.objects, 'bulk_create', side_effect=IntegrityError), \
+                self.assertLogs('debates.persistence', 'ERROR'):
+            with self.assertRaises(IntegrityError):
+                self.buffer.flush()
+        self.assertEqual([m.content for m in self.buffer._pending], ["Kept"])
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(list(Message.objects.values_list('content', flat=True)), ["Kept"])
+
+    def test_background_flush_on_interval(self):
+        async def append_and_wait():
+            self.buffer.append(self.session.id, self.user.id, "Hello")
+            await self.buffer._task
+
+        async_to_sync(append_and_wait)()
+        self.assertEqual(Message.objects.count(), 1)
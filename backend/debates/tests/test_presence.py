@@ -0,0 +1,53 @@
+import threading
+from django.test import SimpleTestCase
+from ..presence import PresenceStore
+
+
+class PresenceStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        self.store = PresenceStore()
+
+    def test_add_and_remove(self):
+        self.assertTrue(self.store.add(1, 10, 'alice'))
+        self.assertTrue(self.store.add(1, 11, 'bob'))
+        self.assertEqual(self.store.count(1), 2)
+
+        self.assertTrue(self.store.remove(1, 10))
+        self.assertEqual(self.store.members(1), [{'id': 11, 'username': 'bob', 'is_online': True}])
+
+    def test_multiple_connections_count_once(self):
+        self.assertTrue(self.store.add(1, 10, 'alice'))
+        self.assertFalse(self.store.add(1, 10, 'alice'))
+        self.assertEqual(self.store.count(1), 1)
+
+        self.assertFalse(self.store.remove(1, 10))
+        self.assertEqual(self.store.count(1), 1)
+        self.assertTrue(self.store.remove(1, 10))
+        self.assertEqual(self.store.count(1), 0)
+
+    def test_room_ids_are_normalized(self):
+        self.store.add(5, 10, 'alice')
+        self.assertEqual(self.store.count('5'), 1)
+
+    def test_expire_drops_idle_members(self):
+        self.store.add(1, 10, 'alice')
+        self.store.add(1, 11, 'bob')
+        self.assertEqual(self.store.expire(1, max_idle=3600), [])
+        self.assertEqual(sorted(self.store.expire(1, max_idle=-1)), [10, 11])
+        self.assertEqual(self.store.count(1), 0)
+
+    def test_touch_unknown_member(self):
+        self.assertFalse(self.store.touch(1, 10))
+
+    def test_concurrent_joins_are_not_lost(self):
+        def join(offset):
+            for user_id in range(offset, offset + 500):
+                self.store.add(1, user_id, f'user{user_id}')
+
+        threads = [threading.Thread(target=join, args=(i * 500,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.store.count(1), 4000)
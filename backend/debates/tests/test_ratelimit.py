@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..ratelimit import ConnectionRateLimiter, TokenBucket, parse_rate, room_buckets
+
+LIMITS = {'message': '2/min', 'typing': None, 'room': '3/min'}
+
+
+class TokenBucketTest(SimpleTestCase):
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('20/min'), (20, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+        self.assertIsNone(parse_rate(None))
+
+    @mock.patch('debates.ratelimit.time.monotonic')
+    def test_bucket_refills_over_time(self, monotonic):
+        monotonic.return_value = 100.0
+        bucket = TokenBucket(2, 10)
+        self.assertEqual([bucket.consume(), bucket.consume()], [0, 0])
+        self.assertAlmostEqual(bucket.consume(), 5.0)
+        monotonic.return_value = 105.0
+        self.assertEqual(bucket.consume(), 0)
+
+
+@override_settings(DEBATES={'RATE_LIMITS': LIMITS})
+class ConnectionRateLimiterTest(SimpleTestCase):
+
+    def setUp(self):
+        room_buckets.clear()
+
+    def test_limits_each_event_type(self):
+        limiter = ConnectionRateLimiter(1)
+        self.assertEqual([bool(limiter.check('message')) for _ in range(3)], [False, False, True])
+        # Unlimited buckets and unknown events pass
+        self.assertFalse(limiter.check('typing_start'))
+        self.assertFalse(limiter.check('something_else'))
+
+    def test_room_budget_is_shared(self):
+        first, second = ConnectionRateLimiter(1), ConnectionRateLimiter(1)
+        self.assertFalse(first.check('message'))
+        self.assertFalse(first.check('message'))
+        self.assertFalse(second.check('message'))
+        self.assertTrue(second.check('message'))
+        self.assertFalse(ConnectionRateLimiter(2).check('message'))
@@ -0,0 +1,41 @@
+from collections import Counter
+from django.test import TransactionTestCase
+from users.models import User
+from ..models import DebateTopic, DebateSession, Message, MessageReaction
+from ..reactions import ReactionAccumulator, apply_reaction_deltas, parse_reaction
+
+
+class ReactionTest(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='speaker', password='testpass123')
+        topic = DebateTopic.objects.create(title="Sample Topic", description="Sample")
+        self.session = DebateSession.objects.create(topic=topic, moderator=self.user)
+        self.message = Message.objects.create(session=self.session, author=self.user, content="Hello")
+        self.message_id = str(self.message.uuid)
+
+    def test_accumulator_collapses_clicks(self):
+        accumulator = ReactionAccumulator()
+        for _ in range(50):
+            accumulator.add(1, self.message_id, '👍')
+        accumulator.add(1, self.message_id, '🔥')
+        self.assertEqual(accumulator.drain(1), {self.message_id: Counter({'👍': 50, '🔥': 1})})
+        self.assertEqual(accumulator.drain(1), {})
+
+    def test_parse_reaction(self):
+        self.assertEqual(parse_reaction(self.message_id, '👍'), (self.message_id, '👍'))
+        self.assertIsNone(parse_reaction('17', '👍'))
+        self.assertIsNone(parse_reaction(self.message_id, ''))
+        self.assertIsNone(parse_reaction(self.message_id, 'x' * 100))
+
+    def test_apply_deltas_adds_to_stored_counts(self):
+        totals = apply_reaction_deltas(self.session.id, {self.message_id: Counter({'👍': 3})})
+        self.assertEqual(totals, {self.message_id: {'👍': 3}})
+        totals = apply_reaction_deltas(self.session.id, {self.message_id: Counter({'👍': 2, '🔥': 1})})
+        self.assertEqual(totals, {self.message_id: {'👍': 5, '🔥': 1}})
+        self.assertEqual(MessageReaction.objects.count(), 2)
+
+    def test_apply_deltas_ignores_messages_from_other_sessions(self):
+        other = DebateSession.objects.create(topic=self.session.topic)
+        self.assertEqual(apply_reaction_deltas(other.id, {self.message_id: Counter({'👍': 1})}), {})
+        self.assertFalse(MessageReaction.objects.exists())
@@ -0,0 +1,46 @@
+import json
+
+from django.test import SimpleTestCase
+
+from ..replay import RoomLog
+
+
+class RoomLogTest(SimpleTestCase):
+
+    def setUp(self):
+        self.log = RoomLog(size=3)
+
+    def stamp(self, room_id, frame_id, payload=None):
+        return self.log.stamp(room_id, frame_id, json.dumps(payload or {'type': 'message'}))
+
+    def test_frames_are_stamped_once_per_room(self):
+        self.assertEqual(json.loads(self.stamp(1, 'a')), {'type': 'message', 'seq': 1})
+        # Every consumer handling the same frame gets the same stamped text
+        self.assertEqual(self.stamp(1, 'a'), self.stamp(1, 'a'))
+        self.stamp(1, 'b')
+        self.stamp(2, 'c')
+        self.assertEqual(self.log.last_seq(1), 2)
+        self.assertEqual(self.log.last_seq('2'), 1)
+        self.assertEqual(self.log.last_seq(3), 0)
+
+    def test_since_returns_missed_frames(self):
+        for n in range(3):
+            self.stamp(1, n, {'n': n})
+        frames = self.log.since(1, self.log.epoch, 1)
+        self.assertEqual([json.loads(f)['n'] for f in frames], [1, 2])
+        self.assertEqual(self.log.since(1, self.log.epoch, 3), [])
+        self.assertEqual(self.log.since(2, self.log.epoch, 0), [])
+
+    def test_since_refuses_gaps_it_cannot_fill(self):
+        for n in range(5):
+            self.stamp(1, n, {'n': n})
+        # Frames 1 and 2 have been evicted from the ring
+        self.assertIsNone(self.log.since(1, self.log.epoch, 1))
+        self.assertEqual(len(self.log.since(1, self.log.epoch, 2)), 3)
+        self.assertIsNone(self.log.since(1, 'other-epoch', 4))
+        self.assertIsNone(self.log.since(1, self.log.epoch, 9))
+
+    def test_since_rejects_negative_sequences(self):
+        self.assertIsNone(self.log.since(2, self.log.epoch, -1))
+        self.stamp(1, 'a')
+        self.assertIsNone(self.log.since(1, self.log.epoch, -1))
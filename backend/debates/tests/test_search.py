@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.contrib.admin.sites import AdminSite
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from ..admin import MessageAdmin
+from ..models import DebateSession, DebateTopic, Message
+from ..persistence import MessageWriteBuffer
+from ..search import parse_terms, search_backend
+
+
+class SearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.bob = User.objects.create_user(username='bob', password='testpass123')
+        cls.topic = DebateTopic.objects.create(title='Climate policy', description='Should carbon be taxed?')
+        DebateTopic.objects.create(title='School uniforms', description='Do they help?')
+        cls.session = DebateSession.objects.create(topic=cls.topic, moderator=cls.alice)
+        cls.other = DebateSession.objects.create(topic=cls.topic, moderator=cls.alice)
+        cls.start = timezone.now()
+        cls.messages = Message.objects.bulk_create([
+            Message(session=cls.session, author=cls.alice, content='A carbon tax works', timestamp=cls.start),
+            Message(session=cls.session, author=cls.bob, content='Carbon carbon carbon, taxes everywhere',
+                    timestamp=cls.start + timedelta(minutes=1)),
+            Message(session=cls.other, author=cls.bob, content='Taxing carbon is regressive',
+                    timestamp=cls.start + timedelta(minutes=2)),
+            Message(session=cls.session, author=cls.alice, content='Uniforms are unrelated',
+                    timestamp=cls.start + timedelta(minutes=3)),
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def search(self, kind='messages', **params):
+        response = self.client.get(reverse(f'search-{kind}'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def contents(self, **params):
+        return [row['content'] for row in self.search(**params)['results']]
+
+    def test_parse_terms(self):
+        self.assertEqual(parse_terms('carbon "a tax" reg* OR; --'), [
+            (('carbon',), False), (('a', 'tax'), False), (('reg',), True), (('OR',), False),
+        ])
+
+    def test_ranked_results(self):
+        page = self.search(q='carbon')
+        self.assertEqual(page['count'], 3)
+        self.assertEqual(page['results'][0]['content'], 'Carbon carbon carbon, taxes everywhere')
+        scores = [row['score'] for row in page['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(page['results'][0]['author']['username'], 'bob')
+
+    def test_phrases_and_prefixes(self):
+        self.assertEqual(self.contents(q='"carbon tax"'), ['A carbon tax works'])
+        self.assertCountEqual(self.contents(q='tax*'), [
+            'A carbon tax works', 'Carbon carbon carbon, taxes everywhere', 'Taxing carbon is regressive'])
+
+    def test_filters(self):
+        self.assertEqual(len(self.contents(q='carbon', session=self.session.id)), 2)
+        self.assertEqual(self.contents(q='carbon', author=self.alice.id), ['A carbon tax works'])
+        since = (self.start + timedelta(seconds=30)).isoformat()
+        until = (self.start + timedelta(seconds=90)).isoformat()
+        self.assertEqual(self.contents(q='carbon', since=since, until=until), ['Carbon carbon carbon, taxes everywhere'])
+        response = self.client.get(reverse('search-messages'), {'q': 'carbon', 'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('search-messages')).status_code, 400)
+
+    def test_punctuation_only_query(self):
+        for kind in ('messages', 'topics'):
+            response = self.client.get(reverse(f'search-{kind}'), {'q': '!!'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('q', response.data)
+
+    def test_pagination(self):
+        page = self.search(q='carbon', page_size=2)
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+
+    def test_index_follows_writes(self):
+        buffer = MessageWriteBuffer(batch_size=10, flush_interval=60)
+        buffer.append(self.session.id, self.bob.id, 'Glaciers are melting')
+        buffer.flush()
+        self.assertEqual(self.contents(q='glaciers'), ['Glaciers are melting'])
+        Message.objects.filter(content='Glaciers are melting').delete()
+        self.assertEqual(self.contents(q='glaciers'), [])
+
+        self.topic.description = 'Is a levy on emissions fair?'
+        self.topic.save()
+        self.assertEqual([row['title'] for row in self.search('topics', q='levy')['results']], ['Climate policy'])
+        self.assertEqual(self.search('topics', q='carbon')['count'], 0)
+
+    @override_settings(DEBATES={'SEARCH_BACKEND': 'debates.search.BasicSearchBackend'})
+    def test_basic_backend(self):
+        self.assertEqual(search_backend().__class__.__name__, 'BasicSearchBackend')
+        self.assertCountEqual(self.contents(q='carbon'), [
+            'A carbon tax works', 'Carbon carbon carbon, taxes everywhere', 'Taxing carbon is regressive'])
+        self.assertEqual(self.contents(q='"carbon tax"'), ['A carbon tax works'])
+
+    def test_admin_uses_the_index(self):
+        admin = MessageAdmin(Message, AdminSite())
+        request = RequestFactory().get('/')
+        queryset, duplicates = admin.get_search_results(request, Message.objects.all(), 'regressive')
+        self.assertEqual([m.content for m in queryset], ['Taxing carbon is regressive'])
+        self.assertFalse(duplicates)
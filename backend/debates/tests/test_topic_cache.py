@@ -0,0 +1,95 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from ..models import DebateTopic
+from ..topic_cache import TopicCatalogue, topic_catalogue
+
+
+class TopicCatalogueTest(SimpleTestCase):
+
+    def test_single_flight_rebuild(self):
+        catalogue = TopicCatalogue()
+        loads = []
+
+        def slow_rows(queryset):
+            loads.append(1)
+            time.sleep(0.05)
+            return [{'id': 1, 'title': 'Topic'}]
+
+        results = []
+        with mock.patch('debates.topic_cache.topic_rows', side_effect=slow_rows):
+            threads = [threading.Thread(target=lambda: results.append(catalogue.rows((1, 'a')))) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(loads), 1)
+            self.assertEqual(results, [[{'id': 1, 'title': 'Topic'}]] * 8)
+            catalogue.rows((2, 'b'))
+            self.assertEqual(len(loads), 2)
+
+    def test_write_patches_in_place_or_drops(self):
+        catalogue = TopicCatalogue()
+        with mock.patch('debates.topic_cache.topic_rows', return_value=[{'id': 2, 'title': 'B'}]) as load:
+            catalogue.rows((1, 'a'))
+            catalogue.write((1, 'a'), (2, 'b'), 1, {'id': 1, 'title': 'A'})
+            self.assertEqual(catalogue.rows((2, 'b')), [{'id': 1, 'title': 'A'}, {'id': 2, 'title': 'B'}])
+            catalogue.write((2, 'b'), (3, 'c'), 2)
+            self.assertEqual(catalogue.get((3, 'c'), 1), {'id': 1, 'title': 'A'})
+            self.assertIsNone(catalogue.get((3, 'c'), 2))
+            self.assertEqual(load.call_count, 1)
+
+            # Another change landed in between: rebuild on the next read
+            catalogue.write((3, 'c'), (5, 'e'), 1, {'id': 1, 'title': 'A2'})
+            catalogue.rows((5, 'e'))
+            self.assertEqual(load.call_count, 2)
+
+
+class TopicViewCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create_user(username='mod', password='testpass123', role='moderator')
+        cls.topic = DebateTopic.objects.create(title='Topic', description='About it')
+
+    def setUp(self):
+        topic_catalogue.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.moderator)
+
+    def titles(self):
+        response = self.client.get(reverse('topic-list'))
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.data]
+
+    def test_warm_reads_only_check_the_version(self):
+        self.titles()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(), ['Topic'])
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('topic-detail', args=[self.topic.id]))
+        self.assertEqual(response.data['description'], 'About it')
+        self.assertEqual(self.client.get(reverse('topic-detail', args=[self.topic.id + 1])).status_code, 404)
+
+    def test_writes_update_the_catalogue(self):
+        self.titles()
+        with mock.patch('debates.topic_cache.topic_rows') as load:
+            response = self.client.post(reverse('topic-list'), {'title': 'New', 'description': 'More'})
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(self.titles(), ['Topic', 'New'])
+            self.client.patch(reverse('topic-detail', args=[self.topic.id]), {'title': 'Renamed'})
+            self.assertEqual(self.titles(), ['Renamed', 'New'])
+            self.client.delete(reverse('topic-detail', args=[response.data['id']]))
+            self.assertEqual(self.titles(), ['Renamed'])
+            load.assert_not_called()
+
+    def test_changes_outside_the_api_reload(self):
+        self.titles()
+        DebateTopic.objects.create(title='From admin', description='x')
+        self.assertEqual(self.titles(), ['Topic', 'From admin'])
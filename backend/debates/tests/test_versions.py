@@ -0,0 +1,106 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from ..models import DebateSession, DebateTopic, Participation, ResourceVersion
+from ..persistence import MessageWriteBuffer
+from ..presence import presence
+from ..versions import bump, lookup, session_key
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create_user(username='mod', password='testpass123', role='moderator')
+        cls.user = User.objects.create_user(username='alice', password='testpass123')
+        cls.topic = DebateTopic.objects.create(title='Topic', description='About it')
+        cls.session = DebateSession.objects.create(topic=cls.topic, moderator=cls.moderator)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.moderator)
+        self.url = reverse('session-detail', args=[self.session.id])
+
+    def tearDown(self):
+        presence.clear(self.session.id)
+
+    def etag(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        return response['ETag']
+
+    def assertNotModified(self, etag, url=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url or self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertLessEqual(len(queries), 1)
+
+    def assertChangedBy(self, change, status=200):
+        etag = self.etag()
+        response = change()
+        if status is not None:
+            self.assertEqual(response.status_code, status, response.data)
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_unchanged_session_is_not_modified(self):
+        etag = self.etag()
+        self.assertNotModified(etag)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='W/"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_session_changes_bump_the_version(self):
+        self.assertChangedBy(lambda: self.client.post(reverse('session-join', args=[self.session.id])))
+        self.assertChangedBy(lambda: self.client.post(
+            reverse('session-mute-participant', args=[self.session.id]), {'user_id': self.user.id}))
+        self.assertChangedBy(lambda: self.client.post(
+            f"{reverse('message-list')}?session_pk={self.session.id}",
+            {'session': self.session.id, 'content': 'hi'}), status=201)
+        self.assertChangedBy(lambda: self.client.patch(self.url, {'end_time': '2026-10-16T12:00:00Z'}))
+        self.assertChangedBy(lambda: Participation.objects.filter(session=self.session).delete(), status=None)
+
+    def test_buffered_messages_bump_the_version(self):
+        buffer = MessageWriteBuffer(batch_size=10, flush_interval=60)
+        etag = self.etag()
+        buffer.append(self.session.id, self.user.id, 'hi')
+        self.assertEqual(self.etag(), etag)
+        buffer.flush()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_topic_edits_change_topics_and_sessions(self):
+        topics_url = reverse('topic-list')
+        topics_etag, session_etag = self.etag(topics_url), self.etag()
+        self.assertNotModified(topics_etag, topics_url)
+        self.topic.title = 'Renamed'
+        self.topic.save()
+        self.assertNotEqual(self.etag(topics_url), topics_etag)
+        self.assertNotEqual(self.etag(), session_etag)
+
+    def test_participants_follow_presence(self):
+        url = reverse('session-participants', args=[self.session.id])
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(etag, url)
+        presence.add(self.session.id, self.user.id, 'alice')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_unknown_session_has_no_validators(self):
+        response = self.client.get(reverse('session-detail', args=[self.session.id + 100]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+class BumpTest(TestCase):
+
+    def test_bump_creates_then_increments(self):
+        bump('a')
+        bump('a', 'b')
+        self.assertEqual(ResourceVersion.objects.get(key='a').version, 2)
+        self.assertEqual({key: version for key, (version, _) in lookup('a', 'b', session_key(999)).items()},
+                         {'a': 2, 'b': 1})
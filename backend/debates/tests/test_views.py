@@ -0,0 +1,135 @@
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from ..models import DebateSession, DebateTopic, Message, MessageReaction, Participation
+
+
+class SessionListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create_user(username='mod', password='testpass123', role='moderator')
+        cls.users = [User.objects.create_user(username=f'user{n}', password='testpass123') for n in range(3)]
+        cls.sessions = []
+        for n in range(5):
+            topic = DebateTopic.objects.create(title=f'Topic {n}', description='About it')
+            session = DebateSession.objects.create(topic=topic, moderator=cls.moderator)
+            for user in cls.users[:n % 3 + 1]:
+                Participation.objects.create(user=user, session=session)
+                Message.objects.bulk_create([Message(session=session, author=user, content='hi') for _ in range(n)])
+            cls.sessions.append(session)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.moderator)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_list_has_counts_not_collections(self):
+        sessions = {row['id']: row for row in self.get(reverse('session-list'))}
+        row = sessions[self.sessions[4].id]
+        self.assertEqual((row['participant_count'], row['message_count']), (2, 8))
+        self.assertEqual(row['topic']['title'], 'Topic 4')
+        self.assertEqual(row['moderator']['username'], 'mod')
+        self.assertNotIn('messages', row)
+        self.assertNotIn('participants', row)
+
+    def test_list_query_budget_does_not_grow_with_sessions(self):
+        url = reverse('session-list')
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+        self.assertEqual(len(queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.get(url, expand='participants')
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(len(rows[0]['participants']), rows[0]['participant_count'])
+
+    def test_sparse_fieldsets(self):
+        rows = self.get(reverse('session-list'), fields='id,message_count')
+        self.assertEqual(set(rows[0]), {'id', 'message_count'})
+        rows = self.get(reverse('session-list'), fields='id', expand='participants')
+        self.assertEqual(set(rows[0]), {'id'})
+        rows = self.get(reverse('session-list'), fields='id,participants', expand='participants')
+        self.assertEqual(set(rows[0]), {'id', 'participants'})
+
+    def test_detail_has_participants_but_no_messages(self):
+        session = self.sessions[2]
+        with CaptureQueriesContext(connection) as queries:
+            row = self.get(reverse('session-detail', args=[session.id]))
+        # Version lookup for the ETag, the session, its participants
+        self.assertEqual(len(queries), 3)
+        self.assertEqual([p['user']['username'] for p in row['participants']], ['user0', 'user1', 'user2'])
+        self.assertEqual(row['message_count'], 6)
+        self.assertNotIn('messages', row)
+
+    def test_create_reports_counts(self):
+        topic = DebateTopic.objects.create(title='New', description='New')
+        response = self.client.post(reverse('session-list'), {'topic_id': topic.id})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['participant_count'], response.data['message_count']), (0, 0))
+
+    def test_compact_detail_side_loads_participants(self):
+        session = self.sessions[1]
+        Participation.objects.filter(session=session, user=self.users[1]).update(is_muted=True)
+        with CaptureQueriesContext(connection) as queries:
+            row = self.get(reverse('session-detail', args=[session.id]), compact='true')
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(row['participants'], [
+            {'user_id': self.users[0].id, 'is_muted': False},
+            {'user_id': self.users[1].id, 'is_muted': True},
+        ])
+        self.assertEqual(row['users'][self.users[1].id]['username'], 'user1')
+
+
+class FastReadTest(TestCase):
+    """The values() fast path must render exactly what the serializers do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create_user(username='mod', password='testpass123', role='moderator')
+        cls.user = User.objects.create_user(username='alice', password='testpass123', email='a@example.com')
+        topic = DebateTopic.objects.create(title='Topic', description='About it')
+        cls.session = DebateSession.objects.create(topic=topic, moderator=cls.moderator)
+        DebateSession.objects.create(topic=topic, moderator=None)
+        Participation.objects.create(user=cls.user, session=cls.session)
+        messages = Message.objects.bulk_create([
+            Message(session=cls.session, author=author, content=f'm{n}')
+            for n, author in enumerate([cls.user, cls.moderator, cls.user])
+        ])
+        MessageReaction.objects.create(message=messages[0], emoji='👍', count=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.moderator)
+
+    def assertSameOutput(self, url, **params):
+        fast = self.client.get(url, params, HTTP_ACCEPT='application/json')
+        with override_settings(DEBATES={'FAST_READS': False}):
+            slow = self.client.get(url, params, HTTP_ACCEPT='application/json')
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(json.loads(fast.content), json.loads(slow.content))
+        return json.loads(fast.content)
+
+    def test_topics(self):
+        rows = self.assertSameOutput(reverse('topic-list'))
+        self.assertEqual(rows[0]['title'], 'Topic')
+
+    def test_sessions(self):
+        rows = self.assertSameOutput(reverse('session-list'))
+        self.assertEqual({row['moderator'] and row['moderator']['username'] for row in rows}, {'mod', None})
+        self.assertSameOutput(reverse('session-list'), fields='id,topic,message_count')
+
+    def test_messages(self):
+        page = self.assertSameOutput(reverse('message-list'), session_pk=self.session.id, limit=2)
+        self.assertEqual([m['content'] for m in page['results']], ['m1', 'm2'])
+        page = self.assertSameOutput(reverse('message-list'), session_pk=self.session.id)
+        self.assertEqual(page['results'][0]['reactions'], {'👍': 2})
@@ -0,0 +1,87 @@
+import logging
+import threading
+
+from .models import DebateTopic
+from .serializers import TOPIC_VALUES, topic_rows
+
+logger = logging.getLogger(__name__)
+
+
+class TopicCatalogue:
+    """
+    In-process copy of every topic in DebateTopicSerializer's representation,
+    tagged with the ``(version, modified)`` of ``topics`` it was read at.
+
+    A reader passes the current stamp (one indexed lookup, shared with the
+    ETag check) and gets the cached rows if it matches. Only one thread per
+    process rebuilds after a change or on a cold start; the others wait for
+    its result rather than all scanning the table at once. Writes through
+    DebateTopicViewSet patch the rows in place, so the writing process never
+    rebuilds; other processes see the new stamp and reload.
+    """
+
+    def __init__(self):
+        self._stamp = None
+        self._rows = []
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _cached(self, stamp):
+        with self._lock:
+            if self._stamp == stamp:
+                return self._rows, self._topics
+        return None
+
+    def _store(self, stamp, topics):
+        self._stamp = stamp
+        self._topics = topics
+        self._rows = [topics[pk] for pk in sorted(topics)]
+
+    def snapshot(self, stamp):
+        """``(rows, {id: row})`` as of ``stamp``, rebuilding if needed."""
+        found = self._cached(stamp)
+        if found is not None:
+            return found
+        with self._build_lock:
+            # Whoever held the lock may just have built it
+            found = self._cached(stamp)
+            if found is not None:
+                return found
+            rows = topic_rows(DebateTopic.objects.values(*TOPIC_VALUES))
+            logger.info(f"Loaded {len(rows)} topics at version {stamp[0]}")
+            with self._lock:
+                self._store(stamp, {row['id']: row for row in rows})
+                return self._rows, self._topics
+
+    def rows(self, stamp):
+        return self.snapshot(stamp)[0]
+
+    def get(self, stamp, topic_id):
+        return self.snapshot(stamp)[1].get(topic_id)
+
+    def write(self, before, after, topic_id, row=None):
+        """
+        Apply one change that moved ``topics`` from stamp ``before`` to
+        ``after``: store ``row`` for ``topic_id``, or remove it if ``row`` is
+        None. If the cached copy is not at ``before``, or something else
+        changed in between, it is dropped and rebuilt on the next read.
+        """
+        with self._lock:
+            if before is None or after is None or self._stamp != before or after[0] != before[0] + 1:
+                self._store(None, {})
+                return
+            # Replace rather than mutate: readers may still hold the old ones
+            topics = dict(self._topics)
+            if row is None:
+                topics.pop(topic_id, None)
+            else:
+                topics[topic_id] = dict(row)
+            self._store(after, topics)
+
+    def clear(self):
+        with self._lock:
+            self._store(None, {})
+
+
+topic_catalogue = TopicCatalogue()
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from channels.layers import get_channel_layer
+
+from .broadcast import publish
+from .coalesce import RoomTicker
+from .conf import debate_setting
+
+
+class TypingTracker:
+    """
+    Who is typing in each room.
+
+    Entries expire ``ttl`` seconds after the last ``typing_start`` from a user,
+    so a client that disconnects or never sends ``typing_stop`` drops out on
+    its own.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def start(self, room_id, user_id, username):
+        """Returns True if the user was not already typing."""
+        with self._lock:
+            typers = self._rooms.setdefault(str(room_id), {})
+            is_new = user_id not in typers
+            typers[user_id] = (username, time.monotonic() + self.ttl)
+            return is_new
+
+    def stop(self, room_id, user_id):
+        """Returns True if the user was typing."""
+        with self._lock:
+            typers = self._rooms.get(str(room_id))
+            if not typers or typers.pop(user_id, None) is None:
+                return False
+            if not typers:
+                del self._rooms[str(room_id)]
+            return True
+
+    def active(self, room_id):
+        """
+        Drop expired entries and return ``(typing_users, next_expiry)``, where
+        ``next_expiry`` is the monotonic time the next entry lapses, or None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            typers = self._rooms.get(str(room_id), {})
+            for user_id in [u for u, (_, expires) in typers.items() if expires <= now]:
+                del typers[user_id]
+            if not typers:
+                self._rooms.pop(str(room_id), None)
+            users = [{'user_id': u, 'username': name} for u, (name, _) in typers.items()]
+            next_expiry = min((expires for _, expires in typers.values()), default=None)
+        return users, next_expiry
+
+
+typing_tracker = TypingTracker(ttl=debate_setting('TYPING_TTL'))
+
+# Last typing_status sent to each room, to skip frames that change nothing
+_last_sent = {}
+
+
+async def emit_typing_status(room_id):
+    """Publish the room's current typers as one ``typing_status`` frame."""
+    users, next_expiry = typing_tracker.active(room_id)
+    user_ids = [u['user_id'] for u in users]
+    if _last_sent.get(room_id, []) != user_ids:
+        if user_ids:
+            _last_sent[room_id] = user_ids
+        else:
+            _last_sent.pop(room_id, None)
+        await publish(
+            get_channel_layer(),
+            room_id,
+            {'type': 'typing_status', 'typing_users': users},
+            typing_user_ids=user_ids,
+        )
+    if next_expiry is not None:
+        # Come back when the next entry lapses so it expires without typing_stop
+        typing_ticker.mark(room_id, delay=max(next_expiry - time.monotonic(), typing_ticker.interval))
+
+
+typing_ticker = RoomTicker(debate_setting('TYPING_TICK'), emit_typing_status)
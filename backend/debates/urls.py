@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DebateTopicViewSet, DebateSessionViewSet, MessageViewSet
+from .views import DebateTopicViewSet, DebateSessionViewSet, MessageViewSet, SearchViewSet
 
 router = DefaultRouter()
 router.register(r'topics', DebateTopicViewSet, basename='topic')
 router.register(r'sessions', DebateSessionViewSet, basename='session')
 router.register(r'messages', MessageViewSet, basename='message')
+router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,100 @@
+import functools
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import ResourceVersion
+
+# Version of the topic catalogue; sessions embed their topic, so it also
+# validates session representations
+TOPICS = 'topics'
+
+
+def session_key(session_id):
+    return f'session:{session_id}'
+
+
+def moderation_key(session_id):
+    # Moves only with a session's participants, for WebSocket processes to poll
+    return f'moderation:{session_id}'
+
+
+def bump(*keys):
+    """Advance the version of each key, starting unknown keys at 1."""
+    now = timezone.now()
+    for key in keys:
+        changes = {'version': F('version') + 1, 'modified': now}
+        if ResourceVersion.objects.filter(key=key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                ResourceVersion.objects.create(key=key, version=1, modified=now)
+        except IntegrityError:
+            # Created concurrently
+            ResourceVersion.objects.filter(key=key).update(**changes)
+
+
+def lookup(*keys):
+    """``{key: (version, modified)}`` for the keys that have a version, in one query."""
+    return {
+        key: (version, modified)
+        for key, version, modified in ResourceVersion.objects.filter(key__in=keys).values_list(
+            'key', 'version', 'modified')
+    }
+
+
+def request_lookup(request, *keys):
+    """``lookup`` remembered on a request, so validators and handlers share one query."""
+    known = request.__dict__.setdefault('_resource_versions', {})
+    missing = [key for key in keys if key not in known]
+    if missing:
+        found = lookup(*missing)
+        known.update((key, found.get(key)) for key in missing)
+    return {key: known[key] for key in keys if known[key] is not None}
+
+
+def version_validators(request, *keys):
+    """
+    ``(etag, last_modified)`` for a response built from the resources named by
+    ``keys``, or None if any of them has no version yet.
+    """
+    versions = request_lookup(request, *keys)
+    if len(versions) < len(keys):
+        return None
+    etag = 'W/"{}"'.format('-'.join(f'{key}.{versions[key][0]}' for key in keys))
+    return etag, max(modified for _, modified in versions.values())
+
+
+def conditional(validators):
+    """
+    Decorate a viewset handler to answer conditional GETs. ``validators(view,
+    request, **kwargs)`` returns ``(etag, last_modified)`` (either may be None)
+    or None to skip validation. A matching ``If-None-Match`` or
+    ``If-Modified-Since`` gets ``304 Not Modified`` without calling the
+    handler; other responses carry ``ETag`` and ``Last-Modified``.
+
+    The handler runs after authentication and permission checks, so those
+    still apply to a 304.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            found = validators(view, request, **kwargs)
+            if found is None:
+                return handler(view, request, *args, **kwargs)
+            etag, last_modified = found
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if etag:
+                    response.headers.setdefault('ETag', quote_etag(etag))
+                if timestamp is not None:
+                    response.headers.setdefault('Last-Modified', http_date(timestamp))
+            return response
+        return wrapper
+    return decorator
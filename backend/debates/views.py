@@ -1,19 +1,127 @@
+import uuid
+
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import DebateTopic, DebateSession, Message, Participation
-from .serializers import DebateTopicSerializer, DebateSessionSerializer, MessageSerializer
+from .conf import debate_setting
+from .serializers import (
+    COMPACT_USER_FIELDS, MESSAGE_VALUES, SESSION_VALUES, TOPIC_VALUES, DebateTopicSerializer,
+    DebateSessionSerializer, DebateSessionDetailSerializer, MessageSerializer, SparseFieldsetMixin,
+    compact_messages, compact_user, message_rows, request_list_param, session_rows, topic_rows, wants_compact,
+)
+from .moderation import notify_moderation
+from .pagination import MessageCursorPagination, SearchPagination
+from .presence import presence
+from .search import parse_terms, search_backend
+from .topic_cache import topic_catalogue
+from .versions import TOPICS, conditional, lookup, request_lookup, session_key, version_validators
 from core.permissions import IsSessionModerator, CanPostMessage, IsModerator
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 
 User = get_user_model()
 
-class DebateTopicViewSet(viewsets.ModelViewSet):
+
+def related_count(model, field='session'):
+    """Correlated ``COUNT(*)`` of the ``model`` rows pointing at the outer row."""
+    counts = (model.objects.filter(**{field: OuterRef('pk')}).order_by()
+              .values(field).annotate(count=Count('*')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+# Presence lives in each process's memory, so its ETags name the process
+PROCESS_TAG = uuid.uuid4().hex[:12]
+
+
+def topics_validators(view, request, **kwargs):
+    return version_validators(request, TOPICS)
+
+
+def session_validators(view, request, pk=None, **kwargs):
+    return version_validators(request, session_key(pk), TOPICS)
+
+
+def presence_validators(view, request, pk=None, **kwargs):
+    return f'W/"presence.{PROCESS_TAG}.{pk}.{presence.version(pk)}"', None
+
+
+class ValuesListMixin:
+    """Serves ``list`` from ``values()`` rows through ``row_builder`` instead of the serializer."""
+    values_fields = ()
+    # Turns values() rows into the serializer's representation
+    row_builder = None
+
+    def use_fast_path(self):
+        return debate_setting('FAST_READS')
+
+    def fast_rows(self, rows):
+        rows = self.row_builder(rows)
+        only = request_list_param(self.request, 'fields')
+        if only and issubclass(self.get_serializer_class(), SparseFieldsetMixin):
+            rows = [{name: value for name, value in row.items() if name in only} for row in rows]
+        return rows
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_path():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*self.values_fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_rows(page))
+        return Response(self.fast_rows(list(queryset)))
+
+
+class DebateTopicViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = DebateTopic.objects.all()
     serializer_class = DebateTopicSerializer
+    values_fields = TOPIC_VALUES
+    row_builder = staticmethod(topic_rows)
+
+    def catalogue_stamp(self, request=None):
+        if request is not None:
+            return request_lookup(request, TOPICS).get(TOPICS)
+        return lookup(TOPICS).get(TOPICS)
+
+    @conditional(topics_validators)
+    def list(self, request, *args, **kwargs):
+        stamp = self.catalogue_stamp(request)
+        if not self.use_fast_path() or stamp is None:
+            return super().list(request, *args, **kwargs)
+        return Response(topic_catalogue.rows(stamp))
+
+    @conditional(topics_validators)
+    def retrieve(self, request, *args, **kwargs):
+        stamp = self.catalogue_stamp(request)
+        if not self.use_fast_path() or stamp is None or not str(kwargs.get('pk')).isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        row = topic_catalogue.get(stamp, int(kwargs['pk']))
+        if row is None:
+            raise Http404
+        return Response(row)
+
+    # Writes patch this process's catalogue instead of discarding it
+    def perform_create(self, serializer):
+        before = self.catalogue_stamp()
+        super().perform_create(serializer)
+        topic_catalogue.write(before, self.catalogue_stamp(), serializer.instance.pk, serializer.data)
+
+    def perform_update(self, serializer):
+        before = self.catalogue_stamp()
+        super().perform_update(serializer)
+        topic_catalogue.write(before, self.catalogue_stamp(), serializer.instance.pk, serializer.data)
+
+    def perform_destroy(self, instance):
+        topic_id = instance.pk
+        before = self.catalogue_stamp()
+        super().perform_destroy(instance)
+        topic_catalogue.write(before, self.catalogue_stamp(), topic_id)
     
     def get_permissions(self):
         """
@@ -25,9 +133,32 @@ class DebateTopicViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-class DebateSessionViewSet(viewsets.ModelViewSet):
+class DebateSessionViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = DebateSession.objects.all()
     serializer_class = DebateSessionSerializer
+    values_fields = SESSION_VALUES
+    row_builder = staticmethod(session_rows)
+
+    def use_fast_path(self):
+        # Expanded participants are nested; leave those to the serializer
+        return super().use_fast_path() and 'participants' not in request_list_param(self.request, 'expand')
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve' and not wants_compact(self.request):
+            return DebateSessionDetailSerializer
+        return DebateSessionSerializer
+
+    def get_queryset(self):
+        # One query for any number of sessions: counts are subqueries, not nested rows
+        queryset = self.queryset.select_related('topic', 'moderator').annotate(
+            participant_count=related_count(Participation),
+            message_count=related_count(Message),
+        )
+        if self.get_serializer_class() is DebateSessionDetailSerializer or \
+                'participants' in request_list_param(self.request, 'expand'):
+            queryset = queryset.prefetch_related(
+                Prefetch('participation_set', queryset=Participation.objects.select_related('user')))
+        return queryset
     
     def get_permissions(self):
         """
@@ -39,15 +170,30 @@ class DebateSessionViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    @conditional(session_validators)
+    def retrieve(self, request, *args, **kwargs):
+        if not wants_compact(request):
+            return super().retrieve(request, *args, **kwargs)
+        # Participants as user ids, with each user once in a users map
+        session = self.get_object()
+        data = self.get_serializer(session).data
+        only = request_list_param(request, 'fields')
+        if not only or 'participants' in only:
+            rows = Participation.objects.filter(session=session).values(
+                'user_id', 'is_muted', *(f'user__{name}' for name in COMPACT_USER_FIELDS[1:]))
+            data['participants'] = [{'user_id': row['user_id'], 'is_muted': row['is_muted']} for row in rows]
+            data['users'] = {row['user_id']: compact_user(row, 'user__') for row in rows}
+        return Response(data)
+
     def perform_create(self, serializer):
         """Set the moderator as the current user when creating a session"""
         serializer.save(moderator=self.request.user)
 
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    @conditional(presence_validators)
     def participants(self, request, pk=None):
-        """Get current participants from cache (real-time WebSocket participants)."""
-        cache_key = f'debate_participants_{pk}'
-        participants = cache.get(cache_key, [])
+        """Get current participants from the presence store (real-time WebSocket participants)."""
+        participants = presence.members(pk)
         return Response({
             'participants': participants,
             'count': len(participants)
@@ -73,6 +219,7 @@ class DebateSessionViewSet(viewsets.ModelViewSet):
         participation, created = Participation.objects.get_or_create(user=user, session=session)
         participation.is_muted = True
         participation.save()
+        notify_moderation(session.id, user.id, 'muted')
         return Response({'status': f'user {user.username} muted'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[IsSessionModerator])
@@ -83,6 +230,7 @@ class DebateSessionViewSet(viewsets.ModelViewSet):
         participation, created = Participation.objects.get_or_create(user=user, session=session)
         participation.is_muted = False
         participation.save()
+        notify_moderation(session.id, user.id, 'unmuted')
         return Response({'status': f'user {user.username} unmuted'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[IsSessionModerator])
@@ -91,11 +239,15 @@ class DebateSessionViewSet(viewsets.ModelViewSet):
         user_id = request.data.get('user_id')
         user = get_object_or_404(User, id=user_id)
         Participation.objects.filter(user=user, session=session).delete()
+        notify_moderation(session.id, user.id, 'removed')
         return Response({'status': f'user {user.username} removed'}, status=status.HTTP_200_OK)
 
-class MessageViewSet(viewsets.ModelViewSet):
-    queryset = Message.objects.all()
+class MessageViewSet(ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Message.objects.select_related('author').prefetch_related('reactions')
     serializer_class = MessageSerializer
+    values_fields = MESSAGE_VALUES
+    row_builder = staticmethod(message_rows)
+    pagination_class = MessageCursorPagination
     http_method_names = ['get', 'post', 'head', 'options']
 
     def get_permissions(self):
@@ -115,7 +267,59 @@ class MessageViewSet(viewsets.ModelViewSet):
             return self.queryset.filter(session_id=session_pk)
         return self.queryset.none() # Don't list all messages from all sessions
 
+    def list(self, request, *args, **kwargs):
+        if not wants_compact(request):
+            return super().list(request, *args, **kwargs)
+        # Plain rows instead of model instances and nested serializers
+        queryset = self.get_queryset().prefetch_related(None).values(*MESSAGE_VALUES)
+        messages, users = compact_messages(self.paginate_queryset(queryset))
+        return self.paginator.get_paginated_response(messages, users=users)
+
     def perform_create(self, serializer):
         session_pk = self.request.query_params.get('session_pk')
         session = get_object_or_404(DebateSession, pk=session_pk)
-        serializer.save(author=self.request.user, session=session)
\ No newline at end of file
+        serializer.save(author=self.request.user, session=session)
+
+
+class SearchViewSet(viewsets.GenericViewSet):
+    """Ranked full-text search over messages and topics; see debates.search for the ``q`` syntax."""
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def search(self, queryset):
+        text = self.request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'This parameter is required.'})
+        if not parse_terms(text):
+            raise ValidationError({'q': 'Expected at least one word to search for.'})
+        return search_backend().search(queryset, text)
+
+    def message_filters(self):
+        params = self.request.query_params
+        filters = {}
+        for name, lookup_name in (('session', 'session_id'), ('author', 'author_id')):
+            if params.get(name):
+                if not params[name].isdigit():
+                    raise ValidationError({name: 'Expected an id.'})
+                filters[lookup_name] = int(params[name])
+        for name, lookup_name in (('since', 'timestamp__gte'), ('until', 'timestamp__lt')):
+            if params.get(name):
+                value = parse_datetime(params[name])
+                if value is None:
+                    raise ValidationError({name: 'Expected an ISO 8601 date and time.'})
+                filters[lookup_name] = value
+        return filters
+
+    @action(detail=False)
+    def messages(self, request):
+        """Messages matching ``q``, optionally within a ``session``, by an ``author`` and ``since``/``until`` a time."""
+        queryset = self.search(Message.objects.filter(**self.message_filters()))
+        rows = self.paginate_queryset(queryset.values(*MESSAGE_VALUES, 'score'))
+        results = [dict(message, score=row['score']) for message, row in zip(message_rows(rows), rows)]
+        return self.get_paginated_response(results)
+
+    @action(detail=False)
+    def topics(self, request):
+        """Topics whose title or description match ``q``."""
+        rows = self.paginate_queryset(self.search(DebateTopic.objects.all()).values(*TOPIC_VALUES, 'score'))
+        return self.get_paginated_response(topic_rows(rows))
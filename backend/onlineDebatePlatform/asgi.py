@@ -2,7 +2,6 @@ import os
 import django
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 
 # Set up Django settings before importing routing
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlineDebatePlatform.settings')
@@ -10,12 +9,16 @@ django.setup()
 
 # Import routing after Django is set up
 import debates.routing
+from users.middleware import JWTAuthMiddleware
+from core.monitor import LoopMonitorMiddleware
 
-application = ProtocolTypeRouter({
+# The monitor reports event loop lag and executor saturation (see core/monitor.py)
+application = LoopMonitorMiddleware(ProtocolTypeRouter({
     "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    # JWT-only authentication: no Django session lookup on connect
+    "websocket": JWTAuthMiddleware(
         URLRouter(
             debates.routing.websocket_urlpatterns
         )
     ),
-}) 
\ No newline at end of file
+}))
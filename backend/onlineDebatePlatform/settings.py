@@ -66,6 +66,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -158,6 +159,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # Django REST Framework
+# 'production' serves JSON only, through orjson when it is installed; the
+# browsable API is for development
+API_RENDERER_PROFILES = {
+    'development': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'production': (
+        'core.renderers.FastJSONRenderer',
+    ),
+}
+API_RENDERER_PROFILE = os.getenv('API_RENDERER_PROFILE', 'development' if DEBUG else 'production')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -165,10 +179,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ),
+    'DEFAULT_RENDERER_CLASSES': API_RENDERER_PROFILES[API_RENDERER_PROFILE],
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -200,6 +211,22 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Users resolved by the WebSocket JWT middleware are cached in-process
+WS_AUTH_USER_CACHE_SIZE = 10000
+WS_AUTH_USER_CACHE_TTL = 60  # seconds
+
+# ASGI server health (core/monitor.py). ASGI_DEFAULT_EXECUTOR_THREADS sizes
+# only the event loop's default executor (thread_sensitive=False calls); unset
+# keeps Python's default. Thread-sensitive calls, which include every
+# database_sync_to_async, always share asgiref's single thread.
+ASGI_DEFAULT_EXECUTOR_THREADS = int(os.getenv('ASGI_DEFAULT_EXECUTOR_THREADS', 0)) or None
+ASGI_MONITOR_INTERVAL = 1.0  # seconds between samples
+ASGI_LAG_WARNING = 0.1  # seconds of loop lag before warning
+ASGI_QUEUE_WARNING = 10  # queued sync calls before warning
+
+# Clients allowed to scrape /internal/metrics/ (Prometheus text format)
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     f"http://localhost:{FRONTEND_PORT}",
@@ -225,11 +252,31 @@ SWAGGER_SETTINGS = {
     }
 }
 
-# Channels settings (using InMemory for development)
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
+# Channels settings (using InMemory for development). With CHANNEL_LAYER=unix,
+# as set by `startws --workers N --affinity`, Daphne worker processes on this host share
+# groups through Unix sockets in CHANNEL_LAYER_PATH.
+if os.getenv('CHANNEL_LAYER') == 'unix':
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "core.layers.UnixSocketChannelLayer",
+            "CONFIG": {
+                "path": os.getenv('CHANNEL_LAYER_PATH'),
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# Real-time debate tuning (see debates/conf.py for all options and defaults)
+DEBATES = {
+    'MESSAGE_BUFFER_SIZE': int(os.getenv('DEBATES_MESSAGE_BUFFER_SIZE', 100)),
+    'MESSAGE_FLUSH_INTERVAL': float(os.getenv('DEBATES_MESSAGE_FLUSH_INTERVAL', 1.0)),
+    'TYPING_TICK': float(os.getenv('DEBATES_TYPING_TICK', 0.5)),
+    'REACTION_TICK': float(os.getenv('DEBATES_REACTION_TICK', 1.0)),
 }
 
 # Logging configuration
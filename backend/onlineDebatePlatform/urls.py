@@ -7,6 +7,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from users.jwt_views import CustomTokenObtainPairView
+from core.views import metrics
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -25,6 +26,9 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    # Prometheus scrape target, loopback only (METRICS_ALLOWED_IPS)
+    path('internal/metrics/', metrics, name='metrics'),
+
     # API docs
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
@@ -6,59 +6,53 @@ Run this from the backend directory with venv activated
 import os
 import sys
 import django
-from django.core.cache import cache
 
 # Setup Django environment
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlineDebatePlatform.settings')
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 django.setup()
 
+from debates.presence import presence
+
 def test_participant_tracking():
     """Test the participant tracking functionality"""
     debate_id = 1
-    cache_key = f'debate_participants_{debate_id}'
     
     print("🧪 Testing Participant Tracking")
     print("=" * 40)
     
     # Clear any existing data
-    cache.delete(cache_key)
+    presence.clear(debate_id)
     print("✅ Cleared existing participant data")
     
-    # Simulate adding participants
-    participants = []
-    
     # Add first user
-    user1 = {'id': 1, 'username': 'user1', 'is_online': True}
-    participants.append(user1)
-    cache.set(cache_key, participants, 3600)
-    print(f"✅ Added {user1['username']}")
+    presence.add(debate_id, 1, 'user1')
+    print("✅ Added user1")
     
-    # Add second user
-    user2 = {'id': 2, 'username': 'user2', 'is_online': True}
-    participants.append(user2)
-    cache.set(cache_key, participants, 3600)
-    print(f"✅ Added {user2['username']}")
+    # Add second user, twice (two open tabs)
+    presence.add(debate_id, 2, 'user2')
+    presence.add(debate_id, 2, 'user2')
+    print("✅ Added user2 (2 connections)")
     
     # Retrieve participants
-    cached_participants = cache.get(cache_key, [])
-    print(f"\n📋 Current participants ({len(cached_participants)}):")
+    cached_participants = presence.members(debate_id)
+    print(f"\n📋 Current participants ({presence.count(debate_id)}):")
     for p in cached_participants:
         print(f"  - {p['username']} (ID: {p['id']})")
     
-    # Remove first user
-    participants = [p for p in participants if p['id'] != 1]
-    cache.set(cache_key, participants, 3600)
-    print(f"\n❌ Removed user1")
+    # Remove first user and one of user2's connections
+    presence.remove(debate_id, 1)
+    presence.remove(debate_id, 2)
+    print(f"\n❌ Removed user1 and one user2 connection")
     
     # Check final state
-    final_participants = cache.get(cache_key, [])
+    final_participants = presence.members(debate_id)
     print(f"\n📋 Final participants ({len(final_participants)}):")
     for p in final_participants:
         print(f"  - {p['username']} (ID: {p['id']})")
     
     # Clean up
-    cache.delete(cache_key)
+    presence.clear(debate_id)
     print(f"\n🧹 Cleaned up test data")
     print("✅ Test completed successfully!")
 
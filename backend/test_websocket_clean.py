@@ -36,10 +36,8 @@ class SimpleWebSocketClient:
         self.connected = False
         
     def _generate_key(self):
-        """Generate WebSocket key for handshake."""
-        import random
-        key = ''.join(chr(random.randint(0, 255)) for _ in range(16))
-        return base64.b64encode(key.encode()).decode()
+        """Generate WebSocket key for handshake (16 random bytes, base64-encoded)."""
+        return base64.b64encode(os.urandom(16)).decode()
         
     def _create_handshake(self, key):
         """Create WebSocket handshake request."""
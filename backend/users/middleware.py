@@ -0,0 +1,76 @@
+import logging
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.metrics import DB_CALL_SECONDS
+from core.ttlcache import TTLCache
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# Users resolved from WebSocket tokens, keyed by id as a string. Bounded and short-lived so
+# a reconnect storm after a deploy is served from memory.
+user_cache = TTLCache(
+    maxsize=getattr(settings, 'WS_AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'WS_AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def get_token_from_scope(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    values = query.get('token')
+    return values[0] if values else None
+
+
+def fetch_user(user_id):
+    return User.objects.filter(id=user_id, is_active=True).first()
+
+
+async def get_user_for_token(raw_token):
+    """Validate an access token and resolve its user, or return AnonymousUser."""
+    try:
+        user_id = AccessToken(raw_token)[api_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError) as e:
+        logger.error(f"Token validation failed: {e}")
+        return AnonymousUser()
+
+    user = user_cache.get(str(user_id))
+    if user is None:
+        with DB_CALL_SECONDS.time(call='fetch_user'):
+            user = await database_sync_to_async(fetch_user)(user_id)
+        if user is None:
+            logger.error(f"User with id {user_id} does not exist")
+            return AnonymousUser()
+        user_cache.set(str(user_id), user)
+    return user
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections from the ``token`` query parameter.
+
+    Replaces AuthMiddlewareStack, which looked up a Django session we never use.
+    The token is validated once here and ``scope['user']`` is set for consumers.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        token = get_token_from_scope(scope)
+        scope['user'] = await get_user_for_token(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.pop(str(instance.pk))
@@ -4,6 +4,7 @@ import { useEffect, useRef, useState, useCallback } from 'react';
 export interface WebSocketMessage {
   type: string;
   message?: string;
+  message_id?: string;
   session_id?: number;
   user_id?: number;
   username?: string;
@@ -11,7 +12,16 @@ export interface WebSocketMessage {
   emoji_reactions?: { [emoji: string]: number };
   image_url?: string;
   participants?: any[];
+  presence_version?: number;
+  count?: number;
   typing_users?: any[];
+  reactions?: { [messageId: string]: { [emoji: string]: number } };
+  seq?: number;
+  epoch?: string;
+  messages?: WebSocketMessage[];
+  users?: { [userId: string]: string };
+  has_more?: boolean;
+  cursor?: string;
 }
 
 export interface Participant {
@@ -52,6 +62,11 @@ export const useWebSocket = ({
   }, [participants]);
   const [typingUsers, setTypingUsers] = useState<TypingUser[]>([]);
   const wsRef = useRef<WebSocket | null>(null);
+  const presenceVersionRef = useRef(0);
+  // Replay position, sent back on reconnect so the server can fill the gap
+  const replayRef = useRef<{ epoch: string | null; seq: number; lastMessageId: string | null }>({
+    epoch: null, seq: 0, lastMessageId: null
+  });
   const isConnectingRef = useRef(false);
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const reconnectAttemptsRef = useRef(0);
@@ -96,7 +111,12 @@ export const useWebSocket = ({
     console.log('🔌 Attempting WebSocket connection to:', `${wsBaseUrl}/ws/debates/${sessionId}/?token=${token.substring(0, 20)}...`);
     console.log('🔑 Using token:', `${token.substring(0, 20)}...`);
     
-    const ws = new WebSocket(`${wsBaseUrl}/ws/debates/${sessionId}/?token=${token}`);
+    const replay = replayRef.current;
+    const replayQuery = replay.epoch
+      ? `&epoch=${replay.epoch}&last_seq=${replay.seq}` +
+        (replay.lastMessageId ? `&last_message_id=${replay.lastMessageId}` : '')
+      : '';
+    const ws = new WebSocket(`${wsBaseUrl}/ws/debates/${sessionId}/?token=${token}${replayQuery}`);
 
     ws.onopen = () => {
       console.log('✅ WebSocket connected successfully');
@@ -110,30 +130,51 @@ export const useWebSocket = ({
       try {
         const data: WebSocketMessage = JSON.parse(event.data);
         console.log('📨 WebSocket message received:', data.type, data);
-        setMessages(prev => [...prev, data]);        // Handle different message types
         if (data.type === 'connection_established') {
-          console.log('✅ Connection established, participants:', data.participants);
-          if (data.participants) {
-            console.log('🔄 Setting participants from connection_established:', data.participants.length, 'participants');
-            console.log('🔄 Participant names:', data.participants.map(p => p.username));
-            setParticipants(data.participants);
-            onParticipantsUpdate?.(data.participants);
+          if (data.epoch !== replayRef.current.epoch) {
+            // New server process: sequence numbers restart
+            replayRef.current = { ...replayRef.current, epoch: data.epoch ?? null, seq: data.seq ?? 0 };
           }
-        } else if (data.type === 'participant_list' || data.type === 'participant_update') {
-          console.log('📋 Received participant list/update:', data.participants);
+        } else if (data.seq !== undefined) {
+          // Replayed frames may overlap with live ones
+          if (data.seq <= replayRef.current.seq) {
+            return;
+          }
+          replayRef.current.seq = data.seq;
+        }
+        if (data.type === 'message' && data.message_id) {
+          replayRef.current.lastMessageId = data.message_id;
+        } else if (data.type === 'history' && data.messages?.length) {
+          replayRef.current.lastMessageId = data.messages[data.messages.length - 1].message_id ?? null;
+        }
+        setMessages(prev => [...prev, data]);        // Handle different message types
+        if (data.type === 'connection_established' || data.type === 'participant_list') {
+          // Full snapshot: replaces local state and resets the presence version
+          console.log('📋 Received participant snapshot:', data.participants);
           if (data.participants) {
-            console.log('🔄 Setting participants from participant_list/update:', data.participants.length, 'participants');
-            console.log('🔄 Participant names:', data.participants.map(p => p.username));
+            presenceVersionRef.current = data.presence_version ?? 0;
             setParticipants(data.participants);
             onParticipantsUpdate?.(data.participants);
           }
         } else if (data.type === 'user_joined' || data.type === 'user_left') {
-          console.log('👋 User activity:', data.username, data.type, 'participants:', data.participants);
-          if (data.participants) {
-            console.log('🔄 Updating participants after user activity:', data.participants.length, 'participants');
-            console.log('🔄 Participant names:', data.participants.map(p => p.username));
-            setParticipants(data.participants);
-            onParticipantsUpdate?.(data.participants);
+          console.log('👋 User activity:', data.username, data.type, 'version:', data.presence_version);
+          const version = data.presence_version ?? 0;
+          if (version <= presenceVersionRef.current) {
+            // Already covered by the snapshot we hold
+          } else if (version === presenceVersionRef.current + 1) {
+            presenceVersionRef.current = version;
+            setParticipants(prev => {
+              const others = prev.filter(p => p.id !== data.user_id);
+              const next = data.type === 'user_joined'
+                ? [...others, { id: data.user_id!, username: data.username!, is_online: true }]
+                : others;
+              onParticipantsUpdate?.(next);
+              return next;
+            });
+          } else {
+            // Missed at least one delta: ask the server for a fresh snapshot
+            console.log('🔄 Presence version gap, requesting participant snapshot');
+            ws.send(JSON.stringify({ type: 'get_participants' }));
           }
         } else if (data.type === 'typing_status') {
           if (data.typing_users) {
@@ -225,10 +266,16 @@ export const useWebSocket = ({
     }
   }, [sessionId]);
 
-  const sendReaction = useCallback((messageId: number, emoji: string) => {
+  const loadOlderMessages = useCallback((before: string, limit: number = 50) => {
+    if (wsRef.current?.readyState === WebSocket.OPEN) {
+      wsRef.current.send(JSON.stringify({ type: 'get_history', before, limit }));
+    }
+  }, []);
+
+  const sendReaction = useCallback((messageId: string, emoji: string) => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
       const reactionData = {
-        type: 'message_reaction',
+        type: 'reaction',
         message_id: messageId,
         emoji,
         session_id: sessionId
@@ -267,6 +314,7 @@ export const useWebSocket = ({
     sendTyping,
     sendReaction,
     sendMessageWithImage,
+    loadOlderMessages,
     connect,
     disconnect
   };
@@ -31,6 +31,7 @@ interface User {
 
 interface Message {
   id: number;
+  uuid?: string;
   author: User;
   content: string;
   timestamp: string;
@@ -88,6 +89,7 @@ const DebateDetailPage = () => {
 
           const newMessage: Message = {
             id: Date.now() + Math.random(), // Ensure unique ID
+            uuid: message.message_id,
             author: { 
               id: message.user_id || 0, 
               username: authorUsername
@@ -113,6 +115,44 @@ const DebateDetailPage = () => {
             ...prevSession,
             messages: [...prevSession.messages, newMessage]          };
         });
+      } else if (message.type === 'history' && message.messages) {
+        // Missed or older messages, merged by uuid; authors come from the users table
+        const missed = message.messages;
+        const users = message.users || {};
+        setSession(prevSession => {
+          if (!prevSession) return null;
+          const known = new Set(prevSession.messages.map(msg => msg.uuid));
+          const added: Message[] = missed
+            .filter(m => m.message_id && !known.has(m.message_id))
+            .map(m => ({
+              id: Date.now() + Math.random(),
+              uuid: m.message_id,
+              author: { id: m.user_id || 0, username: users[String(m.user_id)] || m.username || 'Unknown' },
+              content: m.message || '',
+              timestamp: m.timestamp || new Date().toISOString(),
+              likes: 0,
+              isLiked: false,
+              reactions: m.emoji_reactions || {},
+              imageUrl: m.image_url
+            }));
+          if (!added.length) return prevSession;
+          const merged = [...prevSession.messages, ...added].sort(
+            (a, b) => new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime()
+          );
+          return { ...prevSession, messages: merged };
+        });
+      } else if (message.type === 'reaction_counts' && message.reactions) {
+        // Aggregated totals replace the optimistic counts
+        const totals = message.reactions;
+        setSession(prevSession => {
+          if (!prevSession) return null;
+          return {
+            ...prevSession,
+            messages: prevSession.messages.map(msg =>
+              msg.uuid && totals[msg.uuid] ? { ...msg, reactions: totals[msg.uuid] } : msg
+            ),
+          };
+        });
       }
     },
     onParticipantsUpdate: (newParticipants: User[]) => {
@@ -139,10 +179,10 @@ const DebateDetailPage = () => {
             getSessionMessages(id)
           ]);
           
-          // Merge session data with message history
+          // Merge session data with the newest page of message history
           const sessionWithMessages = {
             ...sessionData,
-            messages: messagesData || sessionData.messages || []
+            messages: messagesData?.results || []
           };
           
           setSession(sessionWithMessages);
@@ -222,14 +262,15 @@ const DebateDetailPage = () => {
     setShowEmojiPicker(false);
   };
 
-  const handleReaction = (messageId: number, emoji: string) => {
+  const handleReaction = (message: Message, emoji: string) => {
+    if (!message.uuid) return;
     // Optimistic UI update
     setSession(prev => {
       if (!prev) return null;
       return {
         ...prev,
         messages: prev.messages.map(msg => {
-          if (msg.id === messageId) {
+          if (msg.id === message.id) {
             const newReactions = { ...(msg.reactions || {}) };
             newReactions[emoji] = (newReactions[emoji] || 0) + 1;
             return { ...msg, reactions: newReactions };
@@ -238,7 +279,7 @@ const DebateDetailPage = () => {
         }),
       };
     });
-    sendReaction(messageId, emoji);
+    sendReaction(message.uuid, emoji);
   };
 
   const handleTypingStop = () => {
@@ -412,7 +453,7 @@ const DebateDetailPage = () => {
                             {Object.entries(message.reactions).map(([emoji, count]) => (
                               <button
                                 key={emoji}
-                                onClick={() => handleReaction(message.id, emoji)}
+                                onClick={() => handleReaction(message, emoji)}
                                 className="flex items-center gap-1 px-2 py-1 bg-gray-200 dark:bg-gray-700 rounded-full text-xs hover:bg-gray-300 dark:hover:bg-gray-600 transition-colors"
                               >
                                 <span>{emoji}</span>
@@ -425,20 +466,20 @@ const DebateDetailPage = () => {
                         {/* Message Actions */}
                         <div className="flex items-center gap-2 mt-2 opacity-0 group-hover:opacity-100 transition-opacity">
                           <button 
-                            onClick={() => handleReaction(message.id, '👍')}
+                            onClick={() => handleReaction(message, '👍')}
                             className="flex items-center gap-1 text-xs text-gray-500 hover:text-primary-600 dark:text-gray-400 dark:hover:text-primary-400"
                           >
                             <HandThumbUpIcon className="w-3 h-3" />
                             <span>{message.likes || 0}</span>
                           </button>
                           <button 
-                            onClick={() => handleReaction(message.id, '❤️')}
+                            onClick={() => handleReaction(message, '❤️')}
                             className="flex items-center gap-1 text-xs text-gray-500 hover:text-red-600 dark:text-gray-400 dark:hover:text-red-400"
                           >
                             <HeartIcon className="w-3 h-3" />
                           </button>
                           <button 
-                            onClick={() => handleReaction(message.id, '😊')}
+                            onClick={() => handleReaction(message, '😊')}
                             className="flex items-center gap-1 text-xs text-gray-500 hover:text-yellow-600 dark:text-gray-400 dark:hover:text-yellow-400"
                           >
                             <FaceSmileIcon className="w-3 h-3" />
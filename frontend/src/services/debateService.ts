@@ -40,8 +40,9 @@ export const getSessionParticipants = async (sessionId: string) => {
   return response.data;
 }
 
-export const getSessionMessages = async (sessionId: string) => {
-  const response = await api.get(`/debates/messages/?session_pk=${sessionId}`);
+// One page of messages, oldest first; pass a page's `previous` or `next` link to move from it
+export const getSessionMessages = async (sessionId: string, pageUrl?: string) => {
+  const response = await api.get(pageUrl || `/debates/messages/?session_pk=${sessionId}`);
   return response.data;
 }
 